@@ -12,11 +12,14 @@ import time
 from datetime import datetime
 
 from app.llms.agents.chatbot.aggregator_agent import create_aggregator_agent
-from app.llms.agents.chatbot.ingestion_pipeline import ingest_directory
 from app.llms.agents.chatbot.memory_manager import memory_manager
+from app.services.ingestion_job_service import ingestion_job_service
+from app.services.search_cache_service import search_cache_service
+from app.services.searxng_service import searxng_service
 from app.database.mysql_config import get_db
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.exceptions import IngestionJobConflictException, IngestionJobLimitException
 
 router = APIRouter(prefix="", tags=["chatbot"])
 
@@ -59,6 +62,26 @@ class IngestionResponse(BaseModel):
     success: bool
     message: str
     processed_files: int
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+
+class IngestionJobStatus(BaseModel):
+    job_id: str
+    directory_path: str
+    status: str
+    cancel_requested: bool
+    files_total: int
+    files_processed: int
+    files_failed: int
+    chunks_processed: int
+    current_file: Optional[str] = None
+    elapsed_seconds: float
+    files_per_second: float
+    chunks_per_second: float
+    errors: List[str]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 
 async def generate_streaming_response(request: ChatCompletionRequest, db: Session) -> AsyncGenerator[str, None]:
@@ -169,30 +192,59 @@ async def chat_completions(request: ChatCompletionRequest, db: Session = Depends
     )
 
 
-@router.post("/ingest", response_model=IngestionResponse)
-def ingest_documents(request: IngestionRequest, db: Session = Depends(get_db)):
+@router.post("/ingest", response_model=IngestionResponse, status_code=202)
+def ingest_documents(request: IngestionRequest):
     """
-    Endpoint untuk menginjeksi dokumen ke dalam sistem RAG
+    Endpoint untuk menginjeksi dokumen ke dalam sistem RAG.
+    Ingestion berjalan sebagai job di background, pantau melalui GET /ingest/{job_id}
     """
     try:
-        success = ingest_directory(request.directory_path, db)
-
-        if success:
-            return IngestionResponse(
-                success=True,
-                message=f"Successfully ingested documents from {request.directory_path}",
-                processed_files=0  # Jumlah file yang diproses akan ditentukan dalam fungsi sebenarnya
-            )
-        else:
-            return IngestionResponse(
-                success=False,
-                message=f"Failed to ingest documents from {request.directory_path}",
-                processed_files=0
-            )
+        job = ingestion_job_service.submit(request.directory_path)
+        return IngestionResponse(
+            success=True,
+            message=f"Ingestion job started for {request.directory_path}",
+            processed_files=0,
+            job_id=job.job_id,
+            status=job.status
+        )
+    except IngestionJobConflictException as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IngestionJobLimitException as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during ingestion: {str(e)}")
 
 
+@router.get("/ingest", response_model=List[IngestionJobStatus])
+def list_ingestion_jobs():
+    """
+    Endpoint untuk melihat daftar job ingestion
+    """
+    return [IngestionJobStatus(**job.to_dict()) for job in ingestion_job_service.list_jobs()]
+
+
+@router.get("/ingest/{job_id}", response_model=IngestionJobStatus)
+def get_ingestion_job(job_id: str):
+    """
+    Endpoint untuk melihat status dan progres job ingestion
+    """
+    job = ingestion_job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return IngestionJobStatus(**job.to_dict())
+
+
+@router.post("/ingest/{job_id}/cancel", response_model=IngestionJobStatus)
+def cancel_ingestion_job(job_id: str):
+    """
+    Endpoint untuk membatalkan job ingestion yang masih berjalan
+    """
+    job = ingestion_job_service.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return IngestionJobStatus(**job.to_dict())
+
+
 @router.get("/session/{session_id}")
 def get_session_context(session_id: str, db: Session = Depends(get_db)):
     """
@@ -214,7 +266,20 @@ def health_check():
     """
     Endpoint untuk mengecek kesehatan layanan
     """
-    return {"status": "healthy", "service": "Multi Agent RAG Chatbot"}
+    searxng_health = searxng_service.get_health()
+    return {
+        "status": "healthy" if searxng_health["status"] == "healthy" else "degraded",
+        "service": "Multi Agent RAG Chatbot",
+        "searxng": searxng_health,
+    }
+
+
+@router.get("/search-cache/stats")
+def search_cache_stats():
+    """
+    Endpoint untuk melihat metrik cache hasil SearXNG (hit, miss, refresh)
+    """
+    return search_cache_service.get_stats()
 
 
 # Tambahkan endpoint lain sesuai kebutuhan
\ No newline at end of file
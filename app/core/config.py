@@ -41,6 +41,50 @@ class MultiAgentRAGSettings(BaseSettings):
 
     # Konfigurasi SearXNG
     searxng_base_url: str  # Dibaca dari SEARXNG_BASE_URL di .env
+    searxng_base_urls: str = ""  # Beberapa instance SearXNG dipisah koma, kosong = SEARXNG_BASE_URL (SEARXNG_BASE_URLS)
+    searxng_timeout: float = 10.0  # Batas waktu baca/tulis request async (SEARXNG_TIMEOUT)
+    searxng_connect_timeout: float = 3.0  # Batas waktu membuka koneksi (SEARXNG_CONNECT_TIMEOUT)
+    searxng_max_connections: int = 20  # Jumlah koneksi maksimum di pool (SEARXNG_MAX_CONNECTIONS)
+    searxng_max_keepalive_connections: int = 10  # Koneksi idle yang dipertahankan (SEARXNG_MAX_KEEPALIVE_CONNECTIONS)
+    searxng_breaker_failure_threshold: int = 3  # Kegagalan berturut-turut sebelum circuit open (SEARXNG_BREAKER_FAILURE_THRESHOLD)
+    searxng_breaker_reset_timeout: float = 30.0  # Detik circuit open sebelum dicoba lagi (SEARXNG_BREAKER_RESET_TIMEOUT)
+    searxng_hedge_percentile: float = 0.9  # Persentil latensi sebelum request hedge dikirim (SEARXNG_HEDGE_PERCENTILE)
+    searxng_hedge_default_delay: float = 1.0  # Jeda hedge saat sampel latensi belum cukup (SEARXNG_HEDGE_DEFAULT_DELAY)
+    searxng_hedge_min_delay: float = 0.2  # Jeda hedge minimum dalam detik (SEARXNG_HEDGE_MIN_DELAY)
+    searxng_hedge_min_samples: int = 10  # Sampel latensi minimum sebelum persentil dipakai (SEARXNG_HEDGE_MIN_SAMPLES)
+    searxng_latency_window: int = 200  # Jumlah latensi terakhir yang disimpan per endpoint (SEARXNG_LATENCY_WINDOW)
+    search_cache_enabled: bool = True  # Cache hasil SearXNG di Redis (SEARCH_CACHE_ENABLED)
+    search_cache_ttl: int = 3600  # Detik hasil dianggap segar (SEARCH_CACHE_TTL)
+    search_cache_stale_ttl: int = 86400  # Detik hasil basi masih dipakai sambil di-refresh (SEARCH_CACHE_STALE_TTL)
+    search_cache_refresh_lock_seconds: int = 30  # Umur lock refresh background (SEARCH_CACHE_REFRESH_LOCK_SECONDS)
+    search_cache_prefix: str = "searxng"  # Prefix key Redis (SEARCH_CACHE_PREFIX)
+    search_keyword_similarity_threshold: float = 0.5  # Di bawah nilai ini kata kunci dicari ulang (SEARCH_KEYWORD_SIMILARITY_THRESHOLD)
+    search_evaluation_enabled: bool = False  # Evaluasi hasil pencarian lewat sequential thinking (SEARCH_EVALUATION_ENABLED)
+    search_results_top_n: int = 5  # Hasil web yang diteruskan ke aggregator setelah dedup + re-rank (SEARCH_RESULTS_TOP_N)
+    search_near_duplicate_threshold: float = 0.7  # Jaccard shingle minimum agar snippet dianggap duplikat (SEARCH_NEAR_DUPLICATE_THRESHOLD)
+    search_rerank_enabled: bool = True  # Urutkan ulang hasil web dengan embedding (SEARCH_RERANK_ENABLED)
+
+    # Konfigurasi Pengambilan Halaman Web
+    web_fetch_enabled: bool = False  # Ambil halaman hasil pencarian dan cari passage relevan (WEB_FETCH_ENABLED)
+    web_fetch_top_n: int = 5  # Jumlah URL teratas yang diambil (WEB_FETCH_TOP_N)
+    web_fetch_max_concurrency: int = 8  # Request halaman bersamaan secara global (WEB_FETCH_MAX_CONCURRENCY)
+    web_fetch_per_host_limit: int = 2  # Request bersamaan per host (WEB_FETCH_PER_HOST_LIMIT)
+    web_fetch_timeout: float = 8.0  # Batas waktu per halaman dalam detik (WEB_FETCH_TIMEOUT)
+    web_fetch_max_bytes: int = 2_000_000  # Ukuran body maksimum per halaman (WEB_FETCH_MAX_BYTES)
+    web_fetch_cache_dir: str = "data/web_cache/"  # Direktori cache halaman (WEB_FETCH_CACHE_DIR)
+    web_fetch_cache_ttl: float = 86400.0  # Umur cache halaman dalam detik (WEB_FETCH_CACHE_TTL)
+    web_fetch_chunk_size: int = 800  # Ukuran passage dalam karakter (WEB_FETCH_CHUNK_SIZE)
+    web_fetch_chunk_overlap: int = 100  # Overlap passage dalam karakter (WEB_FETCH_CHUNK_OVERLAP)
+    web_fetch_top_k: int = 5  # Jumlah passage yang dikembalikan (WEB_FETCH_TOP_K)
+
+    # Konfigurasi Search Memory
+    search_memory_ttl: int = 604800  # Masa berlaku entri search_memory dalam detik (SEARCH_MEMORY_TTL)
+    search_memory_time_sensitive_ttl: int = 86400  # Masa berlaku untuk query sensitif waktu (SEARCH_MEMORY_TIME_SENSITIVE_TTL)
+    search_memory_decay_weight: float = 0.1  # Penalti similarity maksimum saat entri hampir kedaluwarsa (SEARCH_MEMORY_DECAY_WEIGHT)
+    search_memory_maintenance_interval: float = 3600.0  # Interval purge + compaction, 0 untuk menonaktifkan (SEARCH_MEMORY_MAINTENANCE_INTERVAL)
+    search_memory_dedup_enabled: bool = True  # Gabungkan ringkasan yang hampir sama saat disimpan (SEARCH_MEMORY_DEDUP_ENABLED)
+    search_memory_dedup_similarity: float = 0.9  # Similarity COSINE minimum agar dianggap duplikat (SEARCH_MEMORY_DEDUP_SIMILARITY)
+    search_memory_reuse_similarity: float = 0.5  # Similarity minimum agar hasil search_memory dipakai ulang (SEARCH_MEMORY_REUSE_SIMILARITY)
 
     # Konfigurasi RAG
     chunk_size: int  # Dibaca dari CHUNK_SIZE di .env
@@ -50,6 +94,44 @@ class MultiAgentRAGSettings(BaseSettings):
     query_fusion_top_k: int  # Dibaca dari QUERY_FUSION_TOP_K di .env
     query_fusion_num_queries: int  # Dibaca dari QUERY_FUSION_NUM_QUERIES di .env
 
+    # Konfigurasi Ingestion
+    ingest_batch_size: int = 64  # Dibaca dari INGEST_BATCH_SIZE di .env
+    ingest_max_concurrent_jobs: int = 2  # Dibaca dari INGEST_MAX_CONCURRENT_JOBS di .env
+    ingest_job_history_size: int = 100  # Dibaca dari INGEST_JOB_HISTORY_SIZE di .env
+    ingest_metadata_batch_size: int = 100  # Dokumen per commit metadata MySQL (INGEST_METADATA_BATCH_SIZE)
+    ingest_generation_grace_seconds: float = 15.0  # Jeda sebelum generasi lama dihapus (INGEST_GENERATION_GRACE_SECONDS)
+    ingest_document_lock_timeout: float = 600.0  # Batas tunggu dokumen yang sedang di-ingest run lain (INGEST_DOCUMENT_LOCK_TIMEOUT)
+    milvus_generation_cache_ttl: float = 5.0  # Umur cache generasi aktif di pencarian (MILVUS_GENERATION_CACHE_TTL)
+    milvus_search_overfetch: int = 2  # Pengali top_k saat mencari sebelum disaring generasinya (MILVUS_SEARCH_OVERFETCH)
+    embedding_cache_enabled: bool = True  # Dibaca dari EMBEDDING_CACHE_ENABLED di .env
+    embedding_cache_dir: str = "data/embedding_cache/"  # Dibaca dari EMBEDDING_CACHE_DIR di .env
+    text_cleaning_enabled: bool = True  # Dibaca dari TEXT_CLEANING_ENABLED di .env
+    text_cleaning_rules: str = "x_runs,repeated_symbols,symbol_lines,figure_placeholders,html_tags,blank_lines"  # TEXT_CLEANING_RULES
+    text_cleaning_min_length: int = 10  # Chunk bersih sepanjang ini atau kurang tidak di-embed (TEXT_CLEANING_MIN_LENGTH)
+    text_cleaning_workers: int = 2  # Worker process pembersihan, 0 = di process yang sama (TEXT_CLEANING_WORKERS)
+    pdf_extract_workers: int = 4  # Jumlah worker process ekstraksi PDF (PDF_EXTRACT_WORKERS)
+    pdf_parallel_min_pages: int = 16  # PDF dengan halaman lebih sedikit diekstrak tanpa worker (PDF_PARALLEL_MIN_PAGES)
+
+    # Konfigurasi Bulk Load Milvus
+    milvus_bulk_mode: str = "local"  # local atau remote (MILVUS_BULK_MODE)
+    milvus_bulk_local_path: str = "data/bulk_load/"  # Staging file Parquet (MILVUS_BULK_LOCAL_PATH)
+    milvus_bulk_insert_batch_size: int = 10000  # Baris per insert pada mode local (MILVUS_BULK_INSERT_BATCH_SIZE)
+    milvus_bulk_import_timeout: float = 3600.0  # Batas tunggu bulk import mode remote (MILVUS_BULK_IMPORT_TIMEOUT)
+    milvus_bulk_remote_path: str = "bulk_data"  # Prefix object di bucket Milvus (MILVUS_BULK_REMOTE_PATH)
+    milvus_bulk_minio_endpoint: str = "localhost:9000"  # Dibaca dari MILVUS_BULK_MINIO_ENDPOINT di .env
+    milvus_bulk_minio_access_key: str = "minioadmin"  # Dibaca dari MILVUS_BULK_MINIO_ACCESS_KEY di .env
+    milvus_bulk_minio_secret_key: str = "minioadmin"  # Dibaca dari MILVUS_BULK_MINIO_SECRET_KEY di .env
+    milvus_bulk_minio_bucket: str = "a-bucket"  # Bucket yang dipakai Milvus (MILVUS_BULK_MINIO_BUCKET)
+    milvus_bulk_minio_secure: bool = False  # Dibaca dari MILVUS_BULK_MINIO_SECURE di .env
+
+    # Konfigurasi Watch Mode Knowledge Base
+    kb_watch_enabled: bool = False  # Dibaca dari KB_WATCH_ENABLED di .env
+    kb_watch_directory: str = "data/knowledge_base/"  # Dibaca dari KB_WATCH_DIRECTORY di .env
+    kb_watch_backend: str = "auto"  # auto, inotify, atau polling (KB_WATCH_BACKEND)
+    kb_watch_debounce_seconds: float = 2.0  # Dibaca dari KB_WATCH_DEBOUNCE_SECONDS di .env
+    kb_watch_poll_interval: float = 5.0  # Dibaca dari KB_WATCH_POLL_INTERVAL di .env
+    kb_watch_initial_sync: bool = True  # Dibaca dari KB_WATCH_INITIAL_SYNC di .env
+
     # Konfigurasi API
     api_host: str  # Dibaca dari API_HOST di .env
     api_port: int  # Dibaca dari API_PORT di .env
@@ -64,6 +146,15 @@ class MultiAgentRAGSettings(BaseSettings):
     mcp_server_url: str  # Dibaca dari MCP_SERVER_URL di .env
     mcp_max_retries: int  # Dibaca dari MCP_MAX_RETRIES di .env
     mcp_retry_delay: float  # Dibaca dari MCP_RETRY_DELAY di .env
+    mcp_lms_pool_size: int = 2  # Jumlah session ke FastMCP server (MCP_LMS_POOL_SIZE)
+    mcp_lms_transport: str = "streamable-http"  # "streamable-http" (/mcp) atau "sse" (/sse) (MCP_LMS_TRANSPORT)
+    mcp_thinking_pool_size: int = 2  # Jumlah proses npx sequential thinking (MCP_THINKING_POOL_SIZE)
+    mcp_connect_timeout: float = 60.0  # Batas tunggu session pertama siap (MCP_CONNECT_TIMEOUT)
+    mcp_health_check_interval: float = 30.0  # Interval ping session, 0 untuk menonaktifkan (MCP_HEALTH_CHECK_INTERVAL)
+    mcp_health_check_timeout: float = 5.0  # Batas tunggu jawaban ping (MCP_HEALTH_CHECK_TIMEOUT)
+    mcp_disconnect_timeout: float = 5.0  # Batas tunggu session ditutup sebelum task-nya dibatalkan (MCP_DISCONNECT_TIMEOUT)
+    sequential_thinking_backend: str = "local"  # "local" (in-process) atau "mcp" (proses npx) (SEQUENTIAL_THINKING_BACKEND)
+    sequential_thinking_max_history: int = 1000  # Batas riwayat thought backend local (SEQUENTIAL_THINKING_MAX_HISTORY)
 
     # Server LLM tambahan (untuk kompatibilitas dengan .env yang ada)
     llm_api_server: Optional[str] = None  # Dibaca dari LLM_API_SERVER di .env
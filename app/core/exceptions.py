@@ -20,4 +20,24 @@ class DatabaseException(BaseOriensSpaceException):
 
 class DocumentProcessingException(BaseOriensSpaceException):
     """Exception untuk error terkait pemrosesan dokumen"""
-    pass
\ No newline at end of file
+    pass
+
+
+class IngestionCancelledException(DocumentProcessingException):
+    """Exception saat proses ingestion dibatalkan"""
+    pass
+
+
+class IngestionJobLimitException(BaseOriensSpaceException):
+    """Exception saat jumlah job ingestion aktif sudah mencapai batas"""
+    pass
+
+
+class IngestionJobConflictException(BaseOriensSpaceException):
+    """Exception saat direktori yang diminta sudah ditangani job ingestion lain yang masih aktif"""
+    pass
+
+
+class DocumentLockTimeoutException(DocumentProcessingException):
+    """Exception saat lock ingestion sebuah dokumen tidak didapat dalam batas waktu"""
+    pass
@@ -0,0 +1,382 @@
+"""
+Bulk load knowledge base ke Milvus untuk korpus besar
+Chunk dan embedding ditulis ke file Parquet kolumnar lalu dimuat sekaligus,
+menggantikan insert per batch kecil saat bootstrap ratusan ribu chunk.
+
+Penggunaan:
+    python -m app.llms.agents.chatbot.bulk_loader data/knowledge_base/
+    python -m app.llms.agents.chatbot.bulk_loader data/knowledge_base/ --mode remote
+    python -m app.llms.agents.chatbot.bulk_loader data/knowledge_base/ --compare
+"""
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from pymilvus import BulkInsertState, Collection, CollectionSchema, utility
+from pymilvus.bulk_writer import BulkFileType, LocalBulkWriter, RemoteBulkWriter
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.milvus_config import milvus_collection
+from app.database.mysql_config import SessionLocal
+from app.llms.agents.chatbot.ingestion_pipeline import (
+    DocumentMetadataBatch,
+    create_chunker,
+    delete_vectors_from_milvus,
+    embed_chunks,
+    is_document_unchanged,
+    is_supported_file,
+    iter_batches,
+    iter_cleaned_batches,
+    material_id_for_path,
+    sweep_retired_generations,
+)
+
+logger = logging.getLogger(__name__)
+
+# Mode bulk load
+BULK_MODE_LOCAL = "local"    # File Parquet lokal, dimuat lewat insert kolumnar berukuran besar
+BULK_MODE_REMOTE = "remote"  # File Parquet di object storage Milvus, dimuat lewat do_bulk_insert
+
+# Parameter index koleksi sementara untuk perbandingan throughput (sama dengan milvus_config)
+BENCHMARK_INDEX_PARAMS = {
+    "index_type": "HNSW",
+    "metric_type": "COSINE",
+    "params": {"M": 8, "efConstruction": 64}
+}
+
+
+@dataclass
+class BulkDocument:
+    """Dokumen yang akan dimuat beserta generasi barunya"""
+    file_path: str
+    material_id: str
+    doc_name: str
+    generation: int
+    file_size: int = 0
+    file_mtime_ns: int = 0
+    content_hash: Optional[str] = None
+    summary: str = ""
+    pages: int = 0
+    chunk_count: int = 0
+
+
+@dataclass
+class BulkLoadStats:
+    """Statistik satu kali bulk load"""
+    mode: str
+    documents: int = 0
+    rows: int = 0
+    prepare_seconds: float = 0.0
+    load_seconds: float = 0.0
+    files: List[List[str]] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.load_seconds if self.load_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "documents": self.documents,
+            "rows": self.rows,
+            "prepare_seconds": round(self.prepare_seconds, 3),
+            "load_seconds": round(self.load_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def find_documents(files: List[Path], metadata_batch: DocumentMetadataBatch,
+                   force: bool = False) -> List[BulkDocument]:
+    """Kumpulkan file yang berubah (atau semua file jika force) beserta generasi barunya"""
+    documents = []
+    for file_path in files:
+        file_path_str = str(file_path)
+        material_id = material_id_for_path(file_path_str)
+        existing_doc = metadata_batch.get(material_id)
+        active_generation = (existing_doc.active_generation or 0) if existing_doc else 0
+
+        if not force and is_document_unchanged(metadata_batch.db, existing_doc, file_path_str,
+                                               metadata_batch=metadata_batch):
+            continue
+
+        # Stat diambil sebelum file dibaca, sama seperti checkpoint ingest_document
+        stat = file_path.stat()
+        documents.append(BulkDocument(
+            file_path=file_path_str,
+            material_id=material_id,
+            doc_name=file_path.name,
+            generation=active_generation + 1,
+            file_size=stat.st_size,
+            file_mtime_ns=stat.st_mtime_ns
+        ))
+    return documents
+
+
+def list_supported_files(directory_path: str) -> List[Path]:
+    """Semua file yang didukung pipeline di direktori, terurut"""
+    return [
+        file_path for file_path in sorted(Path(directory_path).glob("**/*"))
+        if file_path.is_file() and is_supported_file(file_path.name)
+    ]
+
+
+def open_metadata_batch(db: Session, files: List[Path]) -> DocumentMetadataBatch:
+    """Prefetch row Document untuk semua file sekaligus"""
+    return DocumentMetadataBatch(db, [material_id_for_path(str(file_path)) for file_path in files])
+
+
+def iter_embedded_rows(documents: List[BulkDocument]) -> Iterator[Dict]:
+    """Chunk dan embed dokumen, hasilkan baris sesuai skema koleksi (tanpa id)"""
+    for document in documents:
+        chunker = create_chunker(
+            document.file_path,
+            material_id=document.material_id,
+            doc_name=document.doc_name,
+            generation=document.generation
+        )
+        batches = iter_batches(chunker.iter_chunks(), settings.ingest_batch_size)
+        for _, batch in iter_cleaned_batches(batches):
+            for embedded in embed_chunks(batch):
+                yield {
+                    "text": embedded["text"],
+                    "vector": embedded["embedding"],
+                    "metadata": embedded["metadata"],
+                }
+
+        document.content_hash = chunker.content_hash
+        document.summary = chunker.summary
+        document.pages = chunker.section_count
+        document.chunk_count = chunker.chunk_count
+
+
+def create_bulk_writer(schema: CollectionSchema, mode: str, local_path: str):
+    """Buat writer Parquet untuk mode bulk load yang dipilih"""
+    if mode == BULK_MODE_REMOTE:
+        connect_param = RemoteBulkWriter.S3ConnectParam(
+            endpoint=settings.milvus_bulk_minio_endpoint,
+            access_key=settings.milvus_bulk_minio_access_key,
+            secret_key=settings.milvus_bulk_minio_secret_key,
+            bucket_name=settings.milvus_bulk_minio_bucket,
+            secure=settings.milvus_bulk_minio_secure,
+        )
+        return RemoteBulkWriter(
+            schema=schema,
+            remote_path=settings.milvus_bulk_remote_path,
+            connect_param=connect_param,
+            file_type=BulkFileType.PARQUET,
+        )
+
+    return LocalBulkWriter(
+        schema=schema,
+        local_path=local_path,
+        file_type=BulkFileType.PARQUET,
+    )
+
+
+def write_rows(writer, rows: Iterator[Dict]) -> int:
+    """Tulis semua baris ke writer dan kembalikan jumlahnya"""
+    count = 0
+    for row in rows:
+        writer.append_row(row)
+        count += 1
+    writer.commit()
+    return count
+
+
+def import_remote_files(collection_name: str, batch_files: List[List[str]]) -> int:
+    """Muat file di object storage lewat Milvus bulk import dan tunggu sampai selesai"""
+    task_ids = [utility.do_bulk_insert(collection_name=collection_name, files=files) for files in batch_files]
+    deadline = time.monotonic() + settings.milvus_bulk_import_timeout
+    imported_rows = 0
+
+    pending = list(task_ids)
+    while pending:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Bulk import tasks {pending} did not finish in time")
+
+        for task_id in list(pending):
+            state = utility.get_bulk_insert_state(task_id=task_id)
+            if state.state == BulkInsertState.ImportCompleted:
+                imported_rows += state.row_count
+                pending.remove(task_id)
+            elif state.state in (BulkInsertState.ImportFailed, BulkInsertState.ImportFailedAndCleaned):
+                raise RuntimeError(f"Bulk import task {task_id} failed: {state.failed_reason}")
+        if pending:
+            time.sleep(2)
+
+    return imported_rows
+
+
+def import_local_files(collection: Collection, batch_files: List[List[str]]) -> int:
+    """
+    Padanan lokal bulk import untuk server yang tidak berbagi storage dengan
+    proses ini: file Parquet dibaca per batch kolom dan dimasukkan dengan
+    insert berukuran besar.
+    """
+    import pyarrow.parquet as pq
+
+    imported_rows = 0
+    for files in batch_files:
+        for file_path in files:
+            parquet_file = pq.ParquetFile(file_path)
+            for record_batch in parquet_file.iter_batches(batch_size=settings.milvus_bulk_insert_batch_size):
+                columns = record_batch.to_pydict()
+                metadatas = [
+                    json.loads(metadata) if isinstance(metadata, str) else metadata
+                    for metadata in columns["metadata"]
+                ]
+                collection.insert([columns["text"], columns["vector"], metadatas])
+                imported_rows += record_batch.num_rows
+    collection.flush()
+    return imported_rows
+
+
+def load_rows(collection: Collection, rows: Iterator[Dict], mode: str, stats: BulkLoadStats):
+    """Tulis baris ke file Parquet lalu muat ke koleksi"""
+    local_path = tempfile.mkdtemp(prefix="bulk_", dir=settings.milvus_bulk_local_path)
+    try:
+        writer = create_bulk_writer(collection.schema, mode, local_path)
+
+        start = time.monotonic()
+        stats.rows = write_rows(writer, rows)
+        stats.prepare_seconds = time.monotonic() - start
+        stats.files = writer.batch_files
+
+        start = time.monotonic()
+        if mode == BULK_MODE_REMOTE:
+            imported = import_remote_files(collection.name, stats.files)
+        else:
+            imported = import_local_files(collection, stats.files)
+        stats.load_seconds = time.monotonic() - start
+
+        if imported != stats.rows:
+            raise RuntimeError(f"Imported {imported} rows but wrote {stats.rows}")
+    finally:
+        shutil.rmtree(local_path, ignore_errors=True)
+
+
+def bulk_load_directory(directory_path: str = "data/knowledge_base/", db: Session = None,
+                        mode: str = None, force: bool = False) -> BulkLoadStats:
+    """
+    Bulk load semua dokumen yang berubah di direktori. Setiap dokumen ditulis
+    sebagai generasi baru, generasi aktif di MySQL baru dipindah setelah
+    import selesai (sama seperti ingest_document).
+    """
+    mode = mode or settings.milvus_bulk_mode
+    Path(settings.milvus_bulk_local_path).mkdir(parents=True, exist_ok=True)
+    stats = BulkLoadStats(mode=mode)
+    # Selesaikan penghapusan generasi lama yang tertunda dari run sebelumnya
+    sweep_retired_generations(db)
+
+    files = list_supported_files(directory_path)
+    with open_metadata_batch(db, files) as metadata_batch:
+        documents = find_documents(files, metadata_batch, force=force)
+        metadata_batch.flush()
+        stats.documents = len(documents)
+        logger.info(f"Bulk loading {len(documents)} documents from {directory_path} using {mode} mode")
+        if not documents:
+            return stats
+
+        # Buang sisa generasi yang belum pernah aktif dari ingestion yang gagal
+        for document in documents:
+            delete_vectors_from_milvus(document.material_id, after_generation=document.generation - 1)
+
+        load_rows(milvus_collection, iter_embedded_rows(documents), mode, stats)
+
+        # Swap generasi semua dokumen dalam transaksi berukuran INGEST_METADATA_BATCH_SIZE
+        for document in documents:
+            metadata_batch.upsert(
+                document.material_id, document.file_path, document.content_hash,
+                content=document.summary, pages=document.pages,
+                active_generation=document.generation,
+                file_size=document.file_size, file_mtime_ns=document.file_mtime_ns
+            )
+        metadata_batch.flush()
+
+    logger.info(f"Bulk load finished: {stats.to_dict()}")
+    return stats
+
+
+def compare_insert_paths(directory_path: str = "data/knowledge_base/", db: Session = None,
+                         mode: str = None) -> Dict[str, Dict]:
+    """
+    Bandingkan throughput insert per batch (store_in_milvus) dengan bulk load
+    untuk chunk yang sama, memakai koleksi sementara agar data asli tidak berubah.
+    Embedding diambil dari EmbeddingStore sehingga yang diukur hanya tahap penyimpanan.
+    """
+    mode = mode or settings.milvus_bulk_mode
+    Path(settings.milvus_bulk_local_path).mkdir(parents=True, exist_ok=True)
+
+    files = list_supported_files(directory_path)
+    with open_metadata_batch(db, files) as metadata_batch:
+        documents = find_documents(files, metadata_batch, force=True)
+    rows = list(iter_embedded_rows(documents))
+    logger.info(f"Comparing insert paths with {len(rows)} chunks from {len(documents)} documents")
+
+    benchmark_name = f"{milvus_collection.name}_bulk_benchmark"
+    results = {}
+
+    for path in ("row_insert", f"bulk_{mode}"):
+        if utility.has_collection(benchmark_name):
+            utility.drop_collection(benchmark_name)
+        collection = Collection(name=benchmark_name, schema=milvus_collection.schema)
+        collection.create_index(field_name="vector", index_params=BENCHMARK_INDEX_PARAMS)
+
+        try:
+            if path == "row_insert":
+                start = time.monotonic()
+                for batch in iter_batches(rows, settings.ingest_batch_size):
+                    collection.insert([
+                        [row["text"] for row in batch],
+                        [row["vector"] for row in batch],
+                        [row["metadata"] for row in batch],
+                    ])
+                collection.flush()
+                elapsed = time.monotonic() - start
+                results[path] = {
+                    "rows": len(rows),
+                    "load_seconds": round(elapsed, 3),
+                    "rows_per_second": round(len(rows) / elapsed, 1) if elapsed > 0 else 0.0,
+                }
+            else:
+                stats = BulkLoadStats(mode=mode)
+                load_rows(collection, iter(rows), mode, stats)
+                results[path] = stats.to_dict()
+        finally:
+            utility.drop_collection(benchmark_name)
+
+    return results
+
+
+def main():
+    """Entry point CLI bulk load"""
+    parser = argparse.ArgumentParser(description="Bulk load knowledge base ke Milvus")
+    parser.add_argument("directory", nargs="?", default="data/knowledge_base/", help="Direktori knowledge base")
+    parser.add_argument("--mode", choices=[BULK_MODE_LOCAL, BULK_MODE_REMOTE], default=None,
+                        help="Mode bulk load (default: MILVUS_BULK_MODE)")
+    parser.add_argument("--force", action="store_true", help="Muat ulang semua dokumen walaupun tidak berubah")
+    parser.add_argument("--compare", action="store_true",
+                        help="Bandingkan throughput insert per batch dengan bulk load di koleksi sementara")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        if args.compare:
+            result = compare_insert_paths(args.directory, db, mode=args.mode)
+        else:
+            result = bulk_load_directory(args.directory, db, mode=args.mode, force=args.force).to_dict()
+        print(json.dumps(result, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 """
 Ingestion Pipeline untuk Multi Agent RAG
 """
+import codecs
 import hashlib
+import multiprocessing
 import os
-from typing import List, Optional
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from llama_index.core import SimpleDirectoryReader
@@ -11,107 +20,837 @@ from llama_index.embeddings.ollama import OllamaEmbedding
 from app.database.milvus_config import milvus_collection
 from app.models import DocumentChunk, DocumentMetadata
 from app.core.config import settings
+from app.core.exceptions import DocumentLockTimeoutException, IngestionCancelledException
+from app.database.mysql_config import SessionLocal
 from sqlalchemy.orm import Session
-from app.models.database_schema import Document
+from app.models.database_schema import Document, IngestionCheckpoint
+from app.services.embedding_store import get_embedding_store
+from app.utils.pdf_pages import iter_pdf_pages
+from app.utils.text_cleaning import TextCleaner, clean_texts
 from sqlalchemy.sql import func
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Ekstensi file yang diproses oleh pipeline
+SUPPORTED_EXTENSIONS = (".md", ".pdf")
+
+# Ukuran buffer saat menghitung hash file (byte)
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Ukuran blok baca file saat streaming (byte)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Panjang ringkasan dokumen yang disimpan di MySQL (karakter)
+SUMMARY_LENGTH = 500
+
+# Separator untuk memecah section yang lebih panjang dari chunk_size
+SECTION_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+# Heading markdown: "## Judul"
+MARKDOWN_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)[\s#]*$")
+
+# Penanda struktur peraturan beserta levelnya dalam hierarki section
+STRUCTURE_LEVELS = [
+    (re.compile(r"^BAB\s+[IVXLCDM]+\b"), 1),
+    (re.compile(r"^Bagian\s+(Ke\w+|\d+)\b", re.IGNORECASE), 2),
+    (re.compile(r"^Paragraf\s+\d+\b"), 3),
+    (re.compile(r"^Pasal\s+\d+[A-Z]?\b"), 4),
+]
+
+# Baris biasa (tanpa '#') hanya dianggap heading jika berisi penanda struktur saja
+PLAIN_HEADING_PATTERN = re.compile(
+    r"^(BAB\s+[IVXLCDM]+(\s+[^a-z]*)?|Bagian\s+Ke\w+|Paragraf\s+\d+|Pasal\s+\d+[A-Z]?)$"
+)
+
+# Panjang maksimal judul heading yang disimpan di metadata
+MAX_HEADING_TITLE_LENGTH = 120
+
+# Status checkpoint ingestion
+CHECKPOINT_IN_PROGRESS = "in_progress"
+CHECKPOINT_COMPLETED = "completed"
+
+# Jumlah material_id per query saat prefetch row Document
+METADATA_PREFETCH_SIZE = 1000
+
+# Jumlah pesan error terakhir yang disimpan di IngestionProgress
+MAX_PROGRESS_ERRORS = 50
+
+_embed_model = None
+_text_cleaner = None
+_worker_executor = None
+_worker_lock = threading.Lock()
+_document_locks: Dict[str, threading.Lock] = {}
+_document_lock_users: Dict[str, int] = {}
+_document_locks_guard = threading.Lock()
+
+
+class IngestionProgress:
+    """
+    Progres ingestion yang diperbarui oleh pipeline dan bisa dibaca dari thread lain.
+    Juga membawa sinyal pembatalan yang dicek di antara file dan batch.
+    """
+
+    def __init__(self):
+        self.files_total = 0
+        self.files_processed = 0
+        self.files_failed = 0
+        self.chunks_processed = 0
+        self.current_file: Optional[str] = None
+        self.errors: List[str] = []
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Minta pipeline berhenti di titik aman berikutnya"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Hentikan ingestion jika pembatalan sudah diminta"""
+        if self._cancel_event.is_set():
+            raise IngestionCancelledException("Ingestion cancelled")
+
+    def add_error(self, message: str):
+        """Catat pesan error, hanya menyimpan beberapa error terakhir"""
+        self.errors.append(message)
+        del self.errors[:-MAX_PROGRESS_ERRORS]
+
 
 def calculate_file_hash(file_path: str) -> str:
     """Calculate SHA-256 hash of a file"""
     hash_sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        # Read the file in chunks to handle large files
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_sha256.update(chunk)
+    # Baca langsung ke buffer besar yang dipakai ulang, tanpa buffering dan salinan tambahan
+    buffer = bytearray(HASH_BLOCK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            hash_sha256.update(view[:size])
     return hash_sha256.hexdigest()
 
 
+def is_document_unchanged(db: Session, doc: Optional[Document], file_path: str,
+                          metadata_batch: Optional["DocumentMetadataBatch"] = None) -> bool:
+    """
+    Cek apakah file sama dengan versi yang sudah di-ingest.
+    Jika ukuran dan mtime sama dengan yang tercatat, file tidak dibaca sama
+    sekali. Jika berbeda, hash dihitung ulang; bila isinya ternyata sama
+    (misalnya file hanya di-touch), stat baru dicatat untuk run berikutnya.
+    """
+    if not doc or not doc.content_hash:
+        return False
+
+    stat = os.stat(file_path)
+    if doc.file_size == stat.st_size and doc.file_mtime_ns == stat.st_mtime_ns:
+        return True
+
+    current_hash = calculate_file_hash(file_path)
+    logger.info(f"Calculated hash for {file_path}: {current_hash}")
+    if doc.content_hash != current_hash:
+        logger.info(f"Old hash: {doc.content_hash}, New hash: {current_hash}")
+        return False
+
+    doc.file_size = stat.st_size
+    doc.file_mtime_ns = stat.st_mtime_ns
+    if metadata_batch:
+        metadata_batch.mark_dirty()
+    else:
+        db.commit()
+    return True
+
+
+def material_id_for_path(file_path: str) -> str:
+    """material_id dokumen diturunkan dari path file"""
+    return str(hashlib.md5(file_path.encode()).hexdigest())
+
+
+def is_supported_file(file_path: str) -> bool:
+    """Cek apakah file bisa diproses oleh pipeline"""
+    return file_path.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
 def get_existing_document(db: Session, material_id: str) -> Optional[Document]:
     """Get existing document from MySQL by material_id"""
     return db.query(Document).filter(Document.id == material_id).first()
 
 
-def delete_vectors_from_milvus(material_id: str):
-    """Delete existing vectors from Milvus by material_id"""
+def get_checkpoint(db: Session, material_id: str) -> Optional[IngestionCheckpoint]:
+    """Get ingestion checkpoint from MySQL by material_id"""
+    return db.query(IngestionCheckpoint).filter(IngestionCheckpoint.id == material_id).first()
+
+
+def is_resumable(checkpoint: Optional[IngestionCheckpoint], file_path: str) -> bool:
+    """
+    Checkpoint bisa dilanjutkan jika masih in_progress dan file belum berubah
+    sejak checkpoint dibuat (dibandingkan lewat ukuran dan mtime).
+    """
+    if not checkpoint or checkpoint.status != CHECKPOINT_IN_PROGRESS:
+        return False
+    stat = os.stat(file_path)
+    return checkpoint.file_size == stat.st_size and checkpoint.file_mtime_ns == stat.st_mtime_ns
+
+
+def start_checkpoint(db: Session, material_id: str, file_path: str, generation: int,
+                     checkpoint: Optional[IngestionCheckpoint] = None) -> IngestionCheckpoint:
+    """Buat (atau reset) checkpoint untuk ingestion generasi baru dari awal"""
+    stat = os.stat(file_path)
+    if checkpoint is None:
+        checkpoint = IngestionCheckpoint(id=material_id)
+        db.add(checkpoint)
+
+    checkpoint.file_path = file_path
+    checkpoint.file_size = stat.st_size
+    checkpoint.file_mtime_ns = stat.st_mtime_ns
+    checkpoint.content_hash = None
+    checkpoint.status = CHECKPOINT_IN_PROGRESS
+    checkpoint.generation = generation
+    checkpoint.batches_committed = 0
+    checkpoint.chunks_committed = 0
+    db.commit()
+    return checkpoint
+
+
+def commit_checkpoint_batch(db: Session, checkpoint: IngestionCheckpoint, chunk_count: int):
+    """Catat satu batch yang sudah tersimpan di Milvus"""
+    checkpoint.batches_committed = (checkpoint.batches_committed or 0) + 1
+    checkpoint.chunks_committed = (checkpoint.chunks_committed or 0) + chunk_count
+    db.commit()
+
+
+def chunk_generation(metadata: Optional[dict]) -> int:
+    """Generasi sebuah chunk, chunk lama tanpa field generation dianggap generasi 0"""
+    return int((metadata or {}).get("generation", 0) or 0)
+
+
+def delete_vectors_from_milvus(material_id: str, min_chunk_index: Optional[int] = None,
+                               generation: Optional[int] = None,
+                               before_generation: Optional[int] = None,
+                               after_generation: Optional[int] = None):
+    """
+    Delete existing vectors from Milvus by material_id.
+    Jika min_chunk_index diberikan, hanya chunk dengan chunk_index >= nilai tersebut yang dihapus.
+    generation / before_generation / after_generation membatasi penghapusan ke
+    generasi tertentu, generasi yang lebih lama, atau generasi yang lebih baru.
+    """
     # Search for entities with the material_id in metadata
     search_expr = f'metadata["material_id"] == "{material_id}"'
+    if min_chunk_index is not None:
+        search_expr += f' and metadata["chunk_index"] >= {min_chunk_index}'
     results = milvus_collection.query(
         expr=search_expr,
-        output_fields=["id"]
+        output_fields=["id", "metadata"]
     )
-    
-    # Extract IDs to delete
-    ids_to_delete = [result["id"] for result in results]
-    
+
+    # Filter generasi dilakukan di sini karena chunk lama tidak punya field generation
+    ids_to_delete = []
+    for result in results:
+        chunk_gen = chunk_generation(result.get("metadata"))
+        if generation is not None and chunk_gen != generation:
+            continue
+        if before_generation is not None and chunk_gen >= before_generation:
+            continue
+        if after_generation is not None and chunk_gen <= after_generation:
+            continue
+        ids_to_delete.append(result["id"])
+
     if ids_to_delete:
         # Delete the vectors
         milvus_collection.delete(expr=f"id in {ids_to_delete}")
         logger.info(f"Deleted {len(ids_to_delete)} vectors for material_id: {material_id}")
 
 
-def chunk_markdown_document(file_path: str) -> List[DocumentChunk]:
-    """Chunk markdown document using RecursiveCharacterTextSplitter with markdown-specific separators"""
-    # Read the file content
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Initialize the text splitter with markdown-specific separators
-    text_splitter = RecursiveCharacterTextSplitter(
+def retirement_due_at() -> datetime:
+    """
+    Waktu generasi lama boleh dihapus. Cache generasi aktif di sisi pencarian bisa
+    tertinggal sebentar, jadi generasi lama tetap ada selama masa tenggang.
+    """
+    return datetime.now() + timedelta(seconds=max(settings.ingest_generation_grace_seconds, 0))
+
+
+def sweep_retired_generations(db: Session = None, material_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Hapus generasi lama dokumen yang retire_due_at-nya sudah lewat. Penanda retire_due_at
+    di-commit bersama swap generasi, sehingga penghapusan yang tertunda (timer hilang karena
+    proses CLI selesai atau crash) tetap dijalankan pada ingestion berikutnya atau saat startup.
+    Mengembalikan jumlah dokumen yang generasi lamanya dihapus.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    retired = 0
+    try:
+        query = db.query(Document.id, Document.active_generation, Document.retire_due_at).filter(
+            Document.retire_due_at.isnot(None), Document.retire_due_at <= datetime.now()
+        )
+        if material_ids is not None:
+            query = query.filter(Document.id.in_(list(material_ids)))
+
+        for material_id, active_generation, due_at in query.all():
+            try:
+                delete_vectors_from_milvus(material_id, before_generation=active_generation or 0)
+            except Exception as e:
+                # Penanda tetap ada, dicoba lagi pada sweep berikutnya
+                logger.error(f"Error deleting old generations of {material_id}: {str(e)}")
+                continue
+            # Penanda hanya dibuang jika belum diganti swap yang lebih baru
+            db.query(Document).filter(Document.id == material_id, Document.retire_due_at == due_at).update(
+                {Document.retire_due_at: None}, synchronize_session=False
+            )
+            db.commit()
+            retired += 1
+    except Exception as e:
+        logger.error(f"Error sweeping retired generations: {str(e)}")
+        db.rollback()
+    finally:
+        if own_session:
+            db.close()
+
+    if retired:
+        logger.info(f"Retired old generations of {retired} documents")
+    return retired
+
+
+def retire_old_generations(material_id: str, active_generation: int):
+    """
+    Hapus generasi sebelum active_generation setelah masa tenggang. Dipanggil setelah
+    swap (beserta retire_due_at) ter-commit; timer hanya mempercepat penghapusan di
+    proses yang masih hidup, sumber kebenarannya tetap retire_due_at di MySQL.
+    """
+    grace_seconds = settings.ingest_generation_grace_seconds
+    if grace_seconds <= 0:
+        sweep_retired_generations(material_ids=[material_id])
+        return
+
+    timer = threading.Timer(grace_seconds, sweep_retired_generations, kwargs={"material_ids": [material_id]})
+    timer.daemon = True
+    timer.start()
+
+
+def _create_text_splitter() -> RecursiveCharacterTextSplitter:
+    """Buat text splitter untuk section yang melebihi chunk_size"""
+    return RecursiveCharacterTextSplitter(
         chunk_size=settings.chunk_size,
         chunk_overlap=settings.chunk_overlap,
-        separators=["\n#{1,6} ", "\n##{1,5} ", "\n###{1,4} ", "\n####{1,3} ", "\n#####{1,2} ", "\n###### ", "\n\n", "\n", " ", ""]
+        separators=SECTION_SEPARATORS
     )
-    
-    chunks = text_splitter.split_text(content)
-    
-    # Create document chunks with metadata
-    document_chunks = []
-    for idx, chunk in enumerate(chunks):
-        # For this function, we'll temporarily use placeholder metadata
-        # The actual metadata will be added during ingestion
-        metadata = DocumentMetadata(
-            material_id="",
-            doc_name=os.path.basename(file_path),
-            page_number=1,  # Placeholder, will be updated based on actual document structure
-            chunk_index=idx,
-            hash=hashlib.sha256(chunk.encode()).hexdigest()
+
+
+def parse_heading(line: str) -> Optional[Tuple[int, str]]:
+    """
+    Kenali baris heading dan kembalikan (level, judul).
+    Level penanda struktur peraturan (BAB/Bagian/Paragraf/Pasal) bersifat tetap,
+    heading markdown lainnya memakai jumlah '#'.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return None
+
+    match = MARKDOWN_HEADING_PATTERN.match(stripped)
+    if match:
+        title = match.group(2).strip()
+        if not title:
+            return None
+        level = len(match.group(1))
+    elif PLAIN_HEADING_PATTERN.match(stripped):
+        title = stripped
+        level = None
+    else:
+        return None
+
+    for pattern, structure_level in STRUCTURE_LEVELS:
+        if pattern.match(title):
+            level = structure_level
+            break
+
+    if level is None:
+        return None
+    return level, title[:MAX_HEADING_TITLE_LENGTH]
+
+
+def common_heading_path(first: List[str], second: List[str]) -> List[str]:
+    """Bagian awal path heading yang sama, dipakai untuk chunk gabungan beberapa section"""
+    common = []
+    for first_title, second_title in zip(first, second):
+        if first_title != second_title:
+            break
+        common.append(first_title)
+    return common
+
+
+@dataclass
+class _SectionText:
+    """Potongan teks bersambung beserta posisi dan path heading-nya"""
+    text: str
+    start: int
+    path: List[str]
+    number: int
+
+
+class MarkdownStreamChunker:
+    """
+    Chunker markdown berbasis struktur yang membaca file dalam satu kali lintasan.
+
+    Selama file dibaca per blok, chunker sekaligus menghitung hash SHA-256,
+    mengambil ringkasan awal dokumen dan memecah teks pada batas heading
+    (heading markdown serta BAB/Bagian/Paragraf/Pasal). Section kecil yang
+    berurutan di bawah heading teratas yang sama digabung hingga chunk_size,
+    section yang terlalu panjang dipecah dengan RecursiveCharacterTextSplitter.
+    Setiap chunk menyimpan path heading dan offset karakter di metadata.
+
+    Teks yang ditahan di memori dibatasi oleh `window_size`, bukan oleh ukuran
+    file. Atribut `content_hash`, `summary` dan `section_count` baru terisi
+    lengkap setelah `iter_chunks()` selesai dikonsumsi.
+    """
+
+    def __init__(self, file_path: str, material_id: str = "", doc_name: str = None,
+                 block_size: int = STREAM_BLOCK_SIZE, window_size: int = None,
+                 generation: int = 0):
+        self.file_path = file_path
+        self.material_id = material_id
+        self.generation = generation
+        self.doc_name = doc_name or os.path.basename(file_path)
+        self.block_size = block_size
+        self.chunk_size = settings.chunk_size
+        self.min_chunk_size = max(settings.chunk_overlap, settings.chunk_size // 4)
+        self.window_size = window_size or max(settings.chunk_size * 16, 16384)
+        self.text_splitter = _create_text_splitter()
+
+        self.content_hash: Optional[str] = None
+        self.summary: str = ""
+        self.section_count = 0
+        self.chunk_count = 0
+
+        self._hasher = hashlib.sha256()
+        self._summary_parts: List[str] = []
+        self._summary_length = 0
+        self._offset = 0
+        self._line_in_progress = False
+
+        self._heading_stack: List[Tuple[int, str]] = []
+        self._section_parts: List[str] = []
+        self._section_length = 0
+        self._section_start = 0
+        self._section_path: List[str] = []
+        self._pending: Optional[_SectionText] = None
+
+    def iter_chunks(self) -> Iterator[DocumentChunk]:
+        """Baca file secara streaming dan hasilkan DocumentChunk satu per satu"""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+
+        with open(self.file_path, "rb") as f:
+            for block in iter(lambda: f.read(self.block_size), b""):
+                self._hasher.update(block)
+                lines = (pending + decoder.decode(block)).split("\n")
+                pending = lines.pop()
+
+                for line in lines:
+                    yield from self._feed_line(line, complete=True)
+
+                # Baris tanpa newline yang sangat panjang tetap diproses agar memori terbatas
+                if len(pending) > self.window_size:
+                    yield from self._feed_line(pending, complete=False)
+                    pending = ""
+
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield from self._feed_line(pending, complete=False)
+
+        yield from self._close_section()
+        if self._pending:
+            yield from self._emit([self._pending])
+            self._pending = None
+
+        self.content_hash = self._hasher.hexdigest()
+        summary = "".join(self._summary_parts)
+        self.summary = summary[:SUMMARY_LENGTH] + "..." if len(summary) > SUMMARY_LENGTH else summary
+
+    def _feed_line(self, line: str, complete: bool) -> Iterator[DocumentChunk]:
+        """Proses satu baris (atau potongan baris) dari file"""
+        if line.endswith("\r"):
+            line = line[:-1]
+        text = line + "\n" if complete else line
+
+        if self._summary_length <= SUMMARY_LENGTH:
+            piece = text[:SUMMARY_LENGTH + 1 - self._summary_length]
+            self._summary_parts.append(piece)
+            self._summary_length += len(piece)
+
+        # Potongan dari baris yang sangat panjang tidak mungkin berupa heading
+        heading = parse_heading(line) if complete and not self._line_in_progress else None
+        self._line_in_progress = not complete
+
+        if heading:
+            yield from self._close_section()
+            level, title = heading
+            while self._heading_stack and self._heading_stack[-1][0] >= level:
+                self._heading_stack.pop()
+            self._heading_stack.append((level, title))
+
+        if not self._section_parts:
+            self._section_start = self._offset
+            self._section_path = [title for _, title in self._heading_stack]
+
+        self._section_parts.append(text)
+        self._section_length += len(text)
+        self._offset += len(text)
+
+        if self._section_length >= self.window_size:
+            yield from self._split_open_section()
+
+    def _close_section(self) -> Iterator[DocumentChunk]:
+        """Tutup section yang sedang dibaca dan teruskan ke tahap penggabungan"""
+        if not self._section_parts:
+            return
+
+        text = "".join(self._section_parts)
+        self._section_parts = []
+        self._section_length = 0
+
+        if text.strip():
+            self.section_count += 1
+        section = _SectionText(text, self._section_start, self._section_path, self._section_number(closed=True))
+        yield from self._add_section(section)
+
+    def _section_number(self, closed: bool) -> int:
+        """Nomor yang dicatat sebagai page_number, untuk markdown berupa urutan section"""
+        return max(self.section_count, 1) if closed else self.section_count + 1
+
+    def _add_section(self, section: _SectionText) -> Iterator[DocumentChunk]:
+        """Gabungkan section kecil yang berurutan, pecah section yang terlalu panjang"""
+        pending = self._pending
+        if pending:
+            same_parent = pending.path[:1] == section.path[:1]
+            if same_parent and len(pending.text) + len(section.text) <= self.chunk_size:
+                pending.text += section.text
+                # Chunk mencakup beberapa section (misalnya Pasal 2-5), simpan heading yang menaungi semuanya
+                pending.path = common_heading_path(pending.path, section.path)
+                return
+
+            self._pending = None
+            if len(pending.text.strip()) < self.min_chunk_size:
+                # Section yang hampir kosong (misalnya hanya judul BAB) ikut ke section berikutnya
+                section = _SectionText(pending.text + section.text, pending.start, section.path, section.number)
+            else:
+                yield from self._emit([pending])
+
+        if len(section.text) > self.chunk_size:
+            # Potongan terakhir tetap bisa digabung dengan section kecil berikutnya
+            pieces = self._split_section(section)
+            yield from self._emit(pieces[:-1])
+            section = self._raw_tail(section, pieces[-1]) if pieces else None
+        self._pending = section
+
+    def _split_open_section(self) -> Iterator[DocumentChunk]:
+        """
+        Pecah section yang sedang dibaca ketika melebihi window_size. Potongan
+        terakhir disimpan kembali agar tersambung dengan teks berikutnya.
+        """
+        text = "".join(self._section_parts)
+        start = self._section_start
+
+        if self._pending:
+            pending, self._pending = self._pending, None
+            if len(pending.text.strip()) < self.min_chunk_size:
+                text = pending.text + text
+                start = pending.start
+            else:
+                yield from self._emit([pending])
+
+        section = _SectionText(text, start, self._section_path, self._section_number(closed=False))
+        pieces = self._split_section(section)
+
+        if len(pieces) <= 1:
+            self._section_parts = [text]
+            self._section_length = len(text)
+            self._section_start = start
+            return
+
+        yield from self._emit(pieces[:-1])
+
+        # Simpan teks mentah mulai dari potongan terakhir (termasuk whitespace di belakangnya)
+        tail = self._raw_tail(section, pieces[-1])
+        self._section_parts = [tail.text]
+        self._section_length = len(tail.text)
+        self._section_start = tail.start
+
+    def _split_section(self, section: _SectionText) -> List[_SectionText]:
+        """Pecah section panjang dan hitung offset setiap potongannya"""
+        pieces = []
+        cursor = 0
+        carry: Optional[int] = None
+        for piece in self.text_splitter.split_text(section.text):
+            relative_start = section.text.find(piece, cursor)
+            if relative_start < 0:
+                relative_start = cursor
+            # Potongan berikutnya paling awal dimulai di area overlap potongan ini
+            cursor = relative_start + max(1, len(piece) - settings.chunk_overlap)
+
+            if carry is not None:
+                # Potongan kecil sebelumnya (misalnya judul) ikut ke potongan ini
+                piece = section.text[carry:relative_start + len(piece)]
+                relative_start, carry = carry, None
+            elif len(piece) < self.min_chunk_size:
+                carry = relative_start
+                continue
+
+            pieces.append(_SectionText(piece, section.start + relative_start, section.path, section.number))
+
+        if carry is not None:
+            pieces.append(_SectionText(section.text[carry:], section.start + carry, section.path, section.number))
+        return pieces
+
+    @staticmethod
+    def _raw_tail(section: _SectionText, piece: _SectionText) -> _SectionText:
+        """Teks mentah section mulai dari posisi potongan sampai akhir section"""
+        text = section.text[piece.start - section.start:]
+        return _SectionText(text, piece.start, section.path, section.number)
+
+    def _emit(self, sections: List[_SectionText]) -> Iterator[DocumentChunk]:
+        """Bungkus potongan teks menjadi DocumentChunk beserta metadatanya"""
+        for section in sections:
+            text = section.text.strip()
+            if not text:
+                continue
+
+            start_offset = section.start + len(section.text) - len(section.text.lstrip())
+            metadata = DocumentMetadata(
+                material_id=self.material_id,
+                doc_name=self.doc_name,
+                page_number=section.number,
+                chunk_index=self.chunk_count,
+                hash=hashlib.sha256(text.encode()).hexdigest(),
+                section_path=list(section.path),
+                start_offset=start_offset,
+                end_offset=start_offset + len(text),
+                generation=self.generation
+            )
+            self.chunk_count += 1
+            yield DocumentChunk(text=text, metadata=metadata)
+
+
+class PdfStreamChunker(MarkdownStreamChunker):
+    """
+    Chunker PDF yang memproses dokumen halaman per halaman.
+
+    Teks halaman diekstrak secara lazy (paralel di worker process untuk PDF
+    besar) lalu dipecah dengan aturan heading yang sama seperti markdown.
+    Chunk tidak pernah melewati batas halaman, sehingga page_number berisi
+    nomor halaman PDF yang sebenarnya dan offset dihitung dari awal halaman.
+    `section_count` berisi jumlah halaman setelah `iter_chunks()` selesai.
+    """
+
+    def __init__(self, file_path: str, material_id: str = "", doc_name: str = None,
+                 window_size: int = None, generation: int = 0, workers: int = None):
+        super().__init__(file_path, material_id=material_id, doc_name=doc_name,
+                         window_size=window_size, generation=generation)
+        self.workers = settings.pdf_extract_workers if workers is None else workers
+        self._page_number = 1
+
+    def iter_chunks(self) -> Iterator[DocumentChunk]:
+        """Ekstrak halaman secara berurutan dan hasilkan DocumentChunk satu per satu"""
+        page_count = 0
+        pages = iter_pdf_pages(
+            self.file_path,
+            executor=get_pdf_executor() if self.workers > 1 else None,
+            workers=self.workers,
+            min_parallel_pages=settings.pdf_parallel_min_pages
         )
-        
-        document_chunk = DocumentChunk(
-            text=chunk,
-            metadata=metadata
+        for page_number, page_text in pages:
+            page_count += 1
+            self._page_number = page_number
+            self._offset = 0
+            self._line_in_progress = False
+
+            for line in page_text.split("\n"):
+                yield from self._feed_line(line, complete=True)
+
+            # Tutup halaman: sisa teks tidak digabung dengan halaman berikutnya
+            yield from self._close_section()
+            if self._pending:
+                yield from self._emit([self._pending])
+                self._pending = None
+
+        self.section_count = page_count
+        self.content_hash = calculate_file_hash(self.file_path)
+        summary = "".join(self._summary_parts)
+        self.summary = summary[:SUMMARY_LENGTH] + "..." if len(summary) > SUMMARY_LENGTH else summary
+
+    def _section_number(self, closed: bool) -> int:
+        """Nomor halaman PDF tempat section berada"""
+        return self._page_number
+
+
+def create_chunker(file_path: str, material_id: str = "", doc_name: str = None,
+                   generation: int = 0) -> MarkdownStreamChunker:
+    """Pilih chunker berdasarkan ekstensi file"""
+    if Path(file_path).suffix.lower() == ".pdf":
+        return PdfStreamChunker(file_path, material_id=material_id, doc_name=doc_name, generation=generation)
+    return MarkdownStreamChunker(file_path, material_id=material_id, doc_name=doc_name, generation=generation)
+
+
+def chunk_markdown_document(file_path: str) -> List[DocumentChunk]:
+    """Chunk markdown document on heading boundaries (see MarkdownStreamChunker)"""
+    return list(MarkdownStreamChunker(file_path).iter_chunks())
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Kelompokkan item dari iterator menjadi list berukuran batch_size"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def get_text_cleaner() -> Optional[TextCleaner]:
+    """TextCleaner sesuai konfigurasi, None jika pembersihan dimatikan"""
+    global _text_cleaner
+    if not settings.text_cleaning_enabled:
+        return None
+    if _text_cleaner is None:
+        rules = [rule.strip() for rule in settings.text_cleaning_rules.split(",") if rule.strip()]
+        _text_cleaner = TextCleaner(rules, settings.text_cleaning_min_length)
+    return _text_cleaner
+
+
+def get_worker_executor() -> ProcessPoolExecutor:
+    """
+    Pool worker process yang dipakai bersama oleh pembersihan teks dan ekstraksi PDF,
+    dibuat sekali sehingga tidak ada pool baru (dan process baru) per dokumen
+    """
+    global _worker_executor
+    with _worker_lock:
+        if _worker_executor is None:
+            # spawn: pipeline juga dijalankan dari thread job ingestion di proses API,
+            # fork dari proses multi-thread bisa mewarisi lock yang sedang dipegang
+            _worker_executor = ProcessPoolExecutor(
+                max_workers=max(settings.text_cleaning_workers, settings.pdf_extract_workers, 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _worker_executor
+
+
+def get_cleaning_executor() -> Optional[ProcessPoolExecutor]:
+    """Pool worker untuk pembersihan teks, None jika TEXT_CLEANING_WORKERS = 0"""
+    if settings.text_cleaning_workers <= 0:
+        return None
+    return get_worker_executor()
+
+
+def get_pdf_executor() -> Optional[ProcessPoolExecutor]:
+    """Pool worker untuk ekstraksi PDF, None jika PDF_EXTRACT_WORKERS <= 1"""
+    if settings.pdf_extract_workers <= 1:
+        return None
+    return get_worker_executor()
+
+
+def apply_cleaned_texts(chunks: List[DocumentChunk], cleaned_texts: List[Optional[str]]) -> List[DocumentChunk]:
+    """
+    Terapkan hasil pembersihan ke chunk: chunk yang dibuang dilewati, hash
+    dihitung ulang untuk teks yang berubah. Offset tetap menunjuk ke teks sumber.
+    """
+    cleaned_chunks = []
+    for chunk, text in zip(chunks, cleaned_texts):
+        if text is None:
+            continue
+        if text != chunk.text:
+            chunk.text = text
+            chunk.metadata.hash = hashlib.sha256(text.encode()).hexdigest()
+        cleaned_chunks.append(chunk)
+    return cleaned_chunks
+
+
+def iter_cleaned_batches(batches: Iterable[List[DocumentChunk]]) -> Iterator[Tuple[List[DocumentChunk], List[DocumentChunk]]]:
+    """
+    Bersihkan batch chunk sebelum di-embed dan hasilkan (batch asli, batch bersih).
+    Dengan worker pool, batch berikutnya sudah dibersihkan di worker selama
+    batch saat ini di-embed.
+    """
+    cleaner = get_text_cleaner()
+    if cleaner is None:
+        for batch in batches:
+            yield batch, batch
+        return
+
+    executor = get_cleaning_executor()
+    if executor is None:
+        for batch in batches:
+            yield batch, apply_cleaned_texts(batch, cleaner.clean_batch([chunk.text for chunk in batch]))
+        return
+
+    in_flight = deque()
+    for batch in batches:
+        texts = [chunk.text for chunk in batch]
+        in_flight.append((batch, executor.submit(clean_texts, texts, cleaner.rules, cleaner.min_length)))
+        # Satu batch dibersihkan di depan batch yang sedang di-embed
+        if len(in_flight) > 1:
+            raw_batch, future = in_flight.popleft()
+            yield raw_batch, apply_cleaned_texts(raw_batch, future.result())
+
+    while in_flight:
+        raw_batch, future = in_flight.popleft()
+        yield raw_batch, apply_cleaned_texts(raw_batch, future.result())
+
+
+def get_embed_model() -> OllamaEmbedding:
+    """Ambil instance OllamaEmbedding yang dipakai bersama oleh pipeline"""
+    global _embed_model
+    if _embed_model is None:
+        _embed_model = OllamaEmbedding(
+            model_name=settings.embedding_model_name,
+            base_url=settings.llm_embedding
         )
-        
-        document_chunks.append(document_chunk)
-    
-    return document_chunks
+    return _embed_model
 
 
 def embed_chunks(chunks: List[DocumentChunk]) -> List:
-    """Generate embeddings for document chunks"""
-    # Initialize Ollama embedding model
-    embed_model = OllamaEmbedding(
-        model_name=settings.embedding_model_name,
-        base_url=settings.llm_embedding
-    )
-    
+    """
+    Generate embeddings for document chunks.
+    Embedding yang sudah ada di EmbeddingStore dipakai ulang, hanya teks baru
+    yang dikirim ke model embedding.
+    """
+    if not chunks:
+        return []
+
+    texts = [chunk.text for chunk in chunks]
+    store = get_embedding_store()
+    embeddings = store.get_many(texts) if store is not None else [None] * len(texts)
+
+    # Teks yang belum tersimpan (dan duplikat di dalam batch) cukup di-embed sekali
+    missing_texts = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+    if missing_texts:
+        embed_model = get_embed_model()
+        # Generate embeddings for the missing texts in one call
+        new_embeddings = embed_model.get_text_embedding_batch(missing_texts)
+        if store is not None:
+            store.put_many(missing_texts, new_embeddings)
+
+        embedding_by_text = dict(zip(missing_texts, new_embeddings))
+        embeddings = [
+            embedding if embedding is not None else embedding_by_text[text]
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+    logger.info(f"Embedded {len(missing_texts)} new texts, reused {len(texts) - len(missing_texts)} stored embeddings")
+
     embedded_chunks = []
-    for chunk in chunks:
-        # Generate embedding for the text
-        embedding = embed_model.get_text_embedding(chunk.text)
+    for chunk, embedding in zip(chunks, embeddings):
         embedded_chunks.append({
             'text': chunk.text,
             'embedding': embedding,
             'metadata': chunk.metadata.dict()
         })
-    
+
     return embedded_chunks
 
 
-def store_in_milvus(embedded_chunks: List) -> bool:
+def store_in_milvus(embedded_chunks: List, flush: bool = True) -> bool:
     """Store embedded chunks in Milvus"""
     try:
         # Prepare data for insertion
@@ -127,7 +866,8 @@ def store_in_milvus(embedded_chunks: List) -> bool:
         ])
         
         # Commit the changes
-        milvus_collection.flush()
+        if flush:
+            milvus_collection.flush()
         
         logger.info(f"Successfully stored {len(texts)} chunks in Milvus")
         return True
@@ -136,152 +876,478 @@ def store_in_milvus(embedded_chunks: List) -> bool:
         return False
 
 
-def update_document_metadata(db: Session, material_id: str, file_path: str, content_hash: str, content: str = None, pages: int = None):
-    """Update document metadata in MySQL"""
-    doc = get_existing_document(db, material_id)
-
+def apply_document_metadata(db: Session, doc: Optional[Document], material_id: str, file_path: str, content_hash: str,
+                            content: str = None, pages: int = None, active_generation: int = None,
+                            file_size: int = None, file_mtime_ns: int = None) -> Document:
+    """Isi metadata dokumen yang sudah ada atau buat record baru, tanpa commit"""
     if doc:
         # Update existing document
         doc.content_hash = content_hash
+        doc.file_size = file_size
+        doc.file_mtime_ns = file_mtime_ns
+        if active_generation is not None:
+            # Swap: mulai titik ini pencarian melayani generasi baru, generasi lama menunggu dihapus
+            doc.active_generation = active_generation
+            doc.retire_due_at = retirement_due_at()
         doc.last_synced = func.now()
         # Update content dan pages jika disediakan
         if content is not None:
             doc.content = content
         if pages is not None:
             doc.pages = pages
-    else:
-        # Create new document record
-        new_doc = Document(
-            id=material_id,
-            name=os.path.basename(file_path),
-            file_path=file_path,
-            content=content,  # Simpan ringkasan dokumen
-            pages=pages,  # Simpan jumlah halaman
-            content_hash=content_hash,
-            last_synced=func.now()
-        )
-        db.add(new_doc)
+        # Dokumen yang pernah dihapus lalu muncul kembali diaktifkan lagi
+        doc.deleted_at = None
+        return doc
+
+    # Create new document record
+    new_doc = Document(
+        id=material_id,
+        name=os.path.basename(file_path),
+        file_path=file_path,
+        content=content,  # Simpan ringkasan dokumen
+        pages=pages,  # Simpan jumlah halaman
+        content_hash=content_hash,
+        active_generation=active_generation or 0,
+        # Sisa generasi lama bisa ada jika record sempat hilang tetapi checkpoint tertinggal
+        retire_due_at=retirement_due_at() if active_generation else None,
+        file_size=file_size,
+        file_mtime_ns=file_mtime_ns,
+        last_synced=func.now()
+    )
+    db.add(new_doc)
+    return new_doc
 
+
+def update_document_metadata(db: Session, material_id: str, file_path: str, content_hash: str, content: str = None, pages: int = None,
+                             active_generation: int = None, file_size: int = None, file_mtime_ns: int = None):
+    """
+    Update document metadata in MySQL.
+    file_size dan file_mtime_ns sebaiknya stat yang diambil sebelum file dibaca,
+    agar perubahan selama ingestion tetap terdeteksi pada run berikutnya.
+    """
+    doc = get_existing_document(db, material_id)
+    apply_document_metadata(
+        db, doc, material_id, file_path, content_hash,
+        content=content, pages=pages, active_generation=active_generation,
+        file_size=file_size, file_mtime_ns=file_mtime_ns
+    )
     db.commit()
 
 
-def ingest_document(file_path: str, material_id: str, doc_name: str, db: Session) -> bool:
+class DocumentLock:
+    """
+    Lock ingestion per material_id agar satu dokumen tidak ditulis dua run sekaligus
+    (job ingestion dan watcher knowledge base berjalan di proses API yang sama).
+    Tanpa lock, run kedua bisa menghitung generasi yang sama dengan run pertama lalu
+    menghapus chunk yang baru saja ditulisnya.
+    """
+
+    def __init__(self, material_id: str):
+        self.material_id = material_id
+        self._lock: Optional[threading.Lock] = None
+
+    def acquire(self, blocking: bool = True, timeout: float = None) -> bool:
+        with _document_locks_guard:
+            lock = _document_locks.setdefault(self.material_id, threading.Lock())
+            _document_lock_users[self.material_id] = _document_lock_users.get(self.material_id, 0) + 1
+
+        if blocking:
+            acquired = lock.acquire(timeout=-1 if timeout is None else timeout)
+        else:
+            acquired = lock.acquire(blocking=False)
+
+        if acquired:
+            self._lock = lock
+        else:
+            self._unregister()
+        return acquired
+
+    def release(self):
+        if self._lock is None:
+            return
+        self._lock.release()
+        self._lock = None
+        self._unregister()
+
+    def _unregister(self):
+        """Buang lock dari registry jika tidak ada lagi yang memakai atau menunggunya"""
+        with _document_locks_guard:
+            users = _document_lock_users.get(self.material_id, 0) - 1
+            if users > 0:
+                _document_lock_users[self.material_id] = users
+            else:
+                _document_lock_users.pop(self.material_id, None)
+                _document_locks.pop(self.material_id, None)
+
+
+def acquire_document_lock(material_id: str) -> DocumentLock:
+    """Ambil lock dokumen, tunggu paling lama INGEST_DOCUMENT_LOCK_TIMEOUT detik"""
+    doc_lock = DocumentLock(material_id)
+    if doc_lock.acquire(blocking=False):
+        return doc_lock
+
+    logger.info(f"Document {material_id} is being ingested by another run, waiting")
+    if not doc_lock.acquire(timeout=settings.ingest_document_lock_timeout):
+        raise DocumentLockTimeoutException(
+            f"Timed out after {settings.ingest_document_lock_timeout}s waiting for document {material_id}"
+        )
+    return doc_lock
+
+
+class DocumentMetadataBatch:
+    """
+    Metadata dokumen untuk satu kali ingestion banyak file:
+    - Semua row Document di-prefetch dengan satu query per METADATA_PREFETCH_SIZE id
+    - Update metadata ditahan di session milik batch dan di-commit bersama setiap
+      INGEST_METADATA_BATCH_SIZE dokumen dan di akhir run (ingest_document langsung
+      mem-flush batch setelah swap generasi)
+    - Generasi lama baru dihapus setelah swap generasinya ter-commit
+
+    Batch memakai session sendiri dengan expire_on_commit=False: row hasil prefetch tetap
+    terisi setelah commit (tanpa SELECT ulang per dokumen), dan commit/rollback checkpoint
+    di session pipeline tidak ikut meng-commit atau membatalkan update yang tertahan.
+    """
+
+    def __init__(self, db: Session, material_ids: Iterable[str], batch_size: int = None):
+        self.db = Session(bind=db.get_bind(), autoflush=False, expire_on_commit=False)
+        self.batch_size = batch_size or settings.ingest_metadata_batch_size
+        self.documents: Dict[str, Document] = {}
+        for ids in iter_batches(material_ids, METADATA_PREFETCH_SIZE):
+            for doc in self.db.query(Document).filter(Document.id.in_(ids)).all():
+                self.documents[doc.id] = doc
+
+        self._dirty = 0
+        self._new_ids: List[str] = []
+        self._retire: List[Tuple[str, int]] = []
+
+    def __enter__(self) -> "DocumentMetadataBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, material_id: str) -> Optional[Document]:
+        """Ambil row Document hasil prefetch"""
+        return self.documents.get(material_id)
+
+    def refresh(self, material_id: str) -> Optional[Document]:
+        """
+        Baca ulang row Document dari MySQL setelah lock dokumen didapat: row hasil prefetch
+        bisa sudah tertinggal jika dokumen ini baru saja di-ingest run lain. Transaksi batch
+        diakhiri dulu agar SELECT biasa (tanpa lock row) membaca versi terbaru, bukan
+        snapshot REPEATABLE READ dari saat prefetch.
+        """
+        self.flush()
+        # Tidak ada update tertahan setelah flush, commit hanya menutup transaksi baca
+        self.db.commit()
+        doc = (
+            self.db.query(Document)
+            .populate_existing()
+            .filter(Document.id == material_id)
+            .first()
+        )
+        if doc is None:
+            self.documents.pop(material_id, None)
+        else:
+            self.documents[material_id] = doc
+        return doc
+
+    def upsert(self, material_id: str, file_path: str, content_hash: str, **fields):
+        """Tandai metadata dokumen untuk di-commit pada flush berikutnya"""
+        existing = self.documents.get(material_id)
+        doc = apply_document_metadata(self.db, existing, material_id, file_path, content_hash, **fields)
+        if existing is None:
+            self.documents[material_id] = doc
+            self._new_ids.append(material_id)
+        if fields.get("active_generation") is not None:
+            self._retire.append((material_id, fields["active_generation"]))
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Catat satu dokumen yang berubah, commit jika batch sudah penuh"""
+        self._dirty += 1
+        if self._dirty >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commit semua update yang tertahan lalu hapus generasi lama"""
+        if not self._dirty:
+            return
+        try:
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+        retire, self._retire = self._retire, []
+        self._dirty = 0
+        self._new_ids = []
+        for material_id, generation in retire:
+            retire_old_generations(material_id, generation)
+
+    def rollback(self):
+        """Batalkan update yang tertahan, dokumen terkait akan diproses ulang pada run berikutnya"""
+        self.db.rollback()
+        for material_id in self._new_ids:
+            self.documents.pop(material_id, None)
+        # Row lain dimuat ulang dari MySQL agar nilai yang batal tidak dipakai
+        self.db.expire_all()
+        self._dirty = 0
+        self._new_ids = []
+        self._retire = []
+
+    def close(self):
+        """Tutup session batch, update yang belum di-flush dibuang"""
+        self.db.close()
+
+
+def ingest_document(file_path: str, material_id: str, doc_name: str, db: Session,
+                    progress: Optional[IngestionProgress] = None,
+                    metadata_batch: Optional[DocumentMetadataBatch] = None) -> bool:
     """
     Main ingestion function that follows the pipeline:
-    1. Calculate file hash
-    2. Compare with existing hash in MySQL
-    3. If different, delete old vectors from Milvus
-    4. Chunk the document
-    5. Generate embeddings
-    6. Store in Milvus
-    7. Update MySQL metadata (only after successful Milvus storage)
+    1. Compare file size/mtime, then file hash, with MySQL (only for known documents)
+    2. If different, start a new chunk generation next to the active one
+    3. Stream the document once: hash, chunk on headings, count sections and extract summary
+    4. Clean chunks, generate embeddings and store in Milvus per batch under the new generation
+    5. Swap active_generation in MySQL, then retire the old generation
+
+    Generasi baru tidak terlihat oleh pencarian sampai swap di langkah 5, dan
+    generasi lama baru dihapus setelahnya, sehingga re-ingestion tidak
+    menimbulkan jeda tanpa hasil untuk dokumen tersebut.
+
+    Setiap batch yang tersimpan dicatat di tabel ingestion_checkpoints. Jika
+    ingestion sebelumnya terhenti dan file tidak berubah, proses dilanjutkan
+    dari batch terakhir tanpa menghapus dan meng-embed ulang chunk yang sudah ada.
+
+    Jika `progress` diberikan, jumlah chunk yang tersimpan dicatat di sana dan
+    pembatalan dicek sebelum setiap batch (IngestionCancelledException).
+
+    Jika `metadata_batch` diberikan, row Document diambil dari hasil prefetch dan
+    update metadata dokumen yang tidak berubah di-commit bersama dokumen lain.
+    Swap generasi di langkah 5 tetap langsung di-commit.
+
+    Run lain untuk material_id yang sama (job ingestion lain atau watcher) menunggu
+    sampai dokumen ini selesai dan swap generasinya ter-commit.
     """
     try:
-        # Step 1: Calculate file hash
-        current_hash = calculate_file_hash(file_path)
-        logger.info(f"Calculated hash for {file_path}: {current_hash}")
+        doc_lock = acquire_document_lock(material_id)
+    except DocumentLockTimeoutException as e:
+        logger.error(str(e))
+        if progress:
+            progress.add_error(f"{file_path}: {str(e)}")
+        return False
 
-        # Step 2: Get existing document from MySQL
-        existing_doc = get_existing_document(db, material_id)
+    try:
+        return _ingest_document(file_path, material_id, doc_name, db,
+                                progress=progress, metadata_batch=metadata_batch)
+    finally:
+        doc_lock.release()
+
+
+def _ingest_document(file_path: str, material_id: str, doc_name: str, db: Session,
+                     progress: Optional[IngestionProgress] = None,
+                     metadata_batch: Optional[DocumentMetadataBatch] = None) -> bool:
+    """Isi ingest_document, dijalankan sambil memegang lock dokumen"""
+    try:
+        # Step 1: Get existing document from MySQL
+        if metadata_batch:
+            existing_doc = metadata_batch.get(material_id)
+        else:
+            existing_doc = get_existing_document(db, material_id)
         logger.info(f"Existing document for material_id {material_id}: {existing_doc}")
+        active_generation = (existing_doc.active_generation or 0) if existing_doc else 0
+
+        if is_document_unchanged(db, existing_doc, file_path, metadata_batch=metadata_batch):
+            # Ukuran/mtime atau hash sama, lewati
+            logger.info(f"Document {material_id} has not changed, skipping ingestion")
+            return True
 
-        # Step 3: Check if content has changed
-        should_ingest = False
-        if existing_doc:
-            # Jika dokumen ditemukan
-            if existing_doc.content_hash and existing_doc.content_hash == current_hash:
-                # Jika hash sama, lewati
-                logger.info(f"Document {material_id} has not changed, skipping ingestion")
+        if metadata_batch:
+            # Dokumen akan ditulis: cocokkan lagi dengan row terbaru, bukan hasil prefetch
+            existing_doc = metadata_batch.refresh(material_id)
+            active_generation = (existing_doc.active_generation or 0) if existing_doc else 0
+            if is_document_unchanged(db, existing_doc, file_path, metadata_batch=metadata_batch):
+                logger.info(f"Document {material_id} was ingested by another run, skipping ingestion")
                 return True
-            else:
-                # Jika hash berbeda atau tidak ada hash, lanjutkan proses
-                logger.info(f"Document {material_id} has changed or has no hash, proceeding with ingestion")
-                if existing_doc.content_hash:
-                    logger.info(f"Old hash: {existing_doc.content_hash}, New hash: {current_hash}")
-                # Hapus vektor lama dari Milvus
-                delete_vectors_from_milvus(material_id)
-                should_ingest = True
+
+        if existing_doc and existing_doc.content_hash:
+            logger.info(f"Document {material_id} has changed, proceeding with ingestion")
+        elif existing_doc:
+            logger.info(f"Document {material_id} has no hash, proceeding with ingestion")
         else:
             # Jika dokumen tidak ditemukan, ini adalah dokumen baru
             logger.info(f"New document {material_id}, proceeding with ingestion")
-            should_ingest = True
 
-        if should_ingest:
-            # Step 4: Chunk the document
-            logger.info(f"Chunking document {file_path}")
-            chunks = chunk_markdown_document(file_path)
-
-            # Update metadata with actual material_id
-            for i, chunk in enumerate(chunks):
-                chunk.metadata.material_id = material_id
-                chunk.metadata.doc_name = doc_name
-                chunk.metadata.page_number = i + 1  # Simplified page numbering
-
-            # Step 5: Generate embeddings
-            logger.info(f"Generating embeddings for {len(chunks)} chunks")
-            embedded_chunks = embed_chunks(chunks)
+        checkpoint = get_checkpoint(db, material_id)
+        if is_resumable(checkpoint, file_path) and (checkpoint.generation or 0) > active_generation:
+            # Lanjutkan ingestion yang terhenti, vektor yang sudah tersimpan dipertahankan
+            generation = checkpoint.generation
+            resume_from = checkpoint.chunks_committed or 0
+            logger.info(f"Resuming ingestion of {material_id} (generation {generation}) after {resume_from} stored chunks")
+            # Buang chunk dari batch yang sempat masuk Milvus tetapi belum tercatat di checkpoint
+            delete_vectors_from_milvus(material_id, min_chunk_index=resume_from, generation=generation)
+        else:
+            generation = active_generation + 1
+            resume_from = 0
+            # Step 2: Buang sisa generasi yang belum pernah aktif (ingestion gagal),
+            # generasi aktif tetap dilayani selama generasi baru ditulis
+            if existing_doc or checkpoint:
+                delete_vectors_from_milvus(material_id, after_generation=active_generation)
+            checkpoint = start_checkpoint(db, material_id, file_path, generation, checkpoint)
 
-            # Step 6: Store in Milvus
-            logger.info("Storing chunks in Milvus")
-            success = store_in_milvus(embedded_chunks)
+        # Step 3: Stream the document
+        logger.info(f"Chunking document {file_path} into generation {generation}")
+        chunker = create_chunker(file_path, material_id=material_id, doc_name=doc_name, generation=generation)
 
-            if not success:
-                logger.error("Failed to store chunks in Milvus")
-                return False
+        # Step 4: Clean, generate embeddings and store in Milvus per batch
+        chunks = (chunk for chunk in chunker.iter_chunks() if chunk.metadata.chunk_index >= resume_from)
+        stored_chunks = 0
+        for raw_batch, batch in iter_cleaned_batches(iter_batches(chunks, settings.ingest_batch_size)):
+            if progress:
+                progress.check_cancelled()
 
-            # Step 7: Update MySQL metadata (only after successful Milvus storage)
-            logger.info("Updating MySQL metadata")
+            if batch:
+                logger.info(f"Generating embeddings for {len(batch)} chunks ({len(raw_batch) - len(batch)} dropped by cleaning)")
+                embedded_chunks = embed_chunks(batch)
 
-            # Baca konten file untuk disimpan sebagai ringkasan
-            with open(file_path, 'r', encoding='utf-8') as f:
-                file_content = f.read()
+                if not store_in_milvus(embedded_chunks, flush=False):
+                    logger.error("Failed to store chunks in Milvus")
+                    if progress:
+                        progress.add_error(f"{file_path}: failed to store chunks in Milvus")
+                    return False
 
-            # Ambil ringkasan dari awal dokumen (misalnya 500 karakter pertama)
-            summary_content = file_content[:500] + "..." if len(file_content) > 500 else file_content
+            # Insert yang sudah di-ack Milvus tercatat di log-nya, checkpoint bisa di-commit.
+            # Checkpoint menghitung chunk mentah (termasuk yang dibuang) agar resume tepat posisinya
+            commit_checkpoint_batch(db, checkpoint, len(raw_batch))
+            stored_chunks += len(batch)
+            if progress:
+                progress.chunks_processed += len(batch)
 
-            # Hitung jumlah halaman (dalam kasus file markdown, kita bisa menghitung jumlah heading utama atau jumlah paragraf)
-            # Untuk sederhananya, kita gunakan jumlah paragraf sebagai jumlah 'halaman'
-            paragraphs = [p.strip() for p in file_content.split('\n\n') if p.strip()]
-            num_pages = len(paragraphs)
+        milvus_collection.flush()
+        logger.info(f"Stored {stored_chunks} chunks in Milvus for {file_path}")
 
-            update_document_metadata(db, material_id, file_path, current_hash, content=summary_content, pages=num_pages)
+        # Step 5: Swap generasi aktif di MySQL (only after successful Milvus storage)
+        logger.info(f"Activating generation {generation} for {material_id}")
+        checkpoint.content_hash = chunker.content_hash
+        checkpoint.status = CHECKPOINT_COMPLETED
+        if metadata_batch:
+            # Row Document ada di session batch, checkpoint di-commit terpisah
+            db.commit()
+        metadata = dict(
+            content=chunker.summary, pages=chunker.section_count,
+            active_generation=generation,
+            file_size=checkpoint.file_size, file_mtime_ns=checkpoint.file_mtime_ns
+        )
+        if metadata_batch:
+            metadata_batch.upsert(material_id, file_path, chunker.content_hash, **metadata)
+            # Swap di-commit sekarang, bukan di akhir batch: lock dokumen dilepas begitu
+            # fungsi ini selesai dan run lain langsung melihat generasi barunya
+            metadata_batch.flush()
+        else:
+            update_document_metadata(db, material_id, file_path, chunker.content_hash, **metadata)
+            retire_old_generations(material_id, generation)
 
         logger.info(f"Successfully processed document {material_id}")
         return True
 
+    except IngestionCancelledException:
+        logger.info(f"Ingestion of {file_path} cancelled, progress kept in checkpoint")
+        raise
     except Exception as e:
         logger.error(f"Error during ingestion of {file_path}: {str(e)}")
+        # Update metadata dokumen lain di metadata_batch tidak ikut dibatalkan
+        db.rollback()
+        if progress:
+            progress.add_error(f"{file_path}: {str(e)}")
         return False
 
 
-def ingest_directory(directory_path: str = "data/knowledge_base/", db: Session = None) -> bool:
-    """Ingest all markdown files in a directory"""
+def ingest_directory(directory_path: str = "data/knowledge_base/", db: Session = None,
+                     progress: Optional[IngestionProgress] = None) -> bool:
+    """Ingest all supported files in a directory"""
+    progress = progress or IngestionProgress()
     try:
-        markdown_files = Path(directory_path).glob("**/*.md")
+        files = Path(directory_path).glob("**/*")
         success_count = 0
 
         # Konversi ke list agar bisa dihitung jumlahnya
-        markdown_files_list = list(markdown_files)
-        logger.info(f"Found {len(markdown_files_list)} markdown files in {directory_path}")
+        files_list = [f for f in files if f.is_file() and is_supported_file(f.name)]
+        progress.files_total = len(files_list)
+        logger.info(f"Found {len(files_list)} files in {directory_path}")
 
-        for file_path in markdown_files_list:
-            file_path_str = str(file_path)
-            material_id = str(hashlib.md5(file_path_str.encode()).hexdigest())
-            doc_name = file_path.name
+        # Selesaikan penghapusan generasi lama yang tertunda dari run sebelumnya
+        sweep_retired_generations(db)
 
-            logger.info(f"Processing file: {file_path_str}")
+        # Satu query untuk semua row Document di direktori ini
+        material_ids = {str(file_path): material_id_for_path(str(file_path)) for file_path in files_list}
+        with DocumentMetadataBatch(db, material_ids.values()) as metadata_batch:
+            try:
+                for file_path in files_list:
+                    progress.check_cancelled()
 
-            if ingest_document(file_path_str, material_id, doc_name, db):
-                success_count += 1
-            else:
-                logger.error(f"Failed to ingest document: {file_path_str}")
+                    file_path_str = str(file_path)
+                    material_id = material_ids[file_path_str]
+                    doc_name = file_path.name
+
+                    logger.info(f"Processing file: {file_path_str}")
+                    progress.current_file = file_path_str
 
-        logger.info(f"Successfully ingested {success_count} out of {len(markdown_files_list)} documents")
+                    if ingest_document(file_path_str, material_id, doc_name, db,
+                                       progress=progress, metadata_batch=metadata_batch):
+                        success_count += 1
+                    else:
+                        progress.files_failed += 1
+                        logger.error(f"Failed to ingest document: {file_path_str}")
+                    progress.files_processed += 1
+            finally:
+                # Dokumen yang sudah selesai tetap di-commit walaupun job dibatalkan
+                metadata_batch.flush()
+
+        progress.current_file = None
+        logger.info(f"Successfully ingested {success_count} out of {len(files_list)} documents")
         return True
 
+    except IngestionCancelledException:
+        logger.info(f"Directory ingestion of {directory_path} cancelled")
+        raise
     except Exception as e:
         logger.error(f"Error during directory ingestion: {str(e)}")
+        progress.add_error(str(e))
+        return False
+
+
+def remove_document(db: Session, material_id: str) -> bool:
+    """
+    Hapus dokumen yang filenya sudah tidak ada: vektor di Milvus dihapus,
+    checkpoint dibuang, dan record di MySQL ditandai deleted_at.
+    """
+    doc_lock = None
+    try:
+        doc_lock = acquire_document_lock(material_id)
+        delete_vectors_from_milvus(material_id)
+
+        checkpoint = get_checkpoint(db, material_id)
+        if checkpoint:
+            db.delete(checkpoint)
+
+        doc = get_existing_document(db, material_id)
+        if doc:
+            # Hash dikosongkan agar file yang muncul kembali di-ingest ulang
+            doc.content_hash = None
+            doc.file_size = None
+            doc.file_mtime_ns = None
+            doc.deleted_at = func.now()
+
+        db.commit()
+        logger.info(f"Removed document {material_id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error removing document {material_id}: {str(e)}")
+        db.rollback()
         return False
+    finally:
+        if doc_lock:
+            doc_lock.release()
 
 
 def ingest_default_knowledge_base(db: Session = None) -> bool:
@@ -0,0 +1,321 @@
+"""
+Watch mode untuk knowledge base
+Memantau data/knowledge_base/ dan hanya meneruskan file yang berubah ke ingestion pipeline
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.database.mysql_config import SessionLocal
+from app.models.database_schema import Document
+from app.core.exceptions import IngestionCancelledException
+from app.llms.agents.chatbot.ingestion_pipeline import (
+    IngestionProgress,
+    ingest_directory,
+    ingest_document,
+    is_supported_file,
+    material_id_for_path,
+    remove_document,
+)
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:  # pragma: no cover - watchdog opsional
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Jenis perubahan yang diteruskan ke pipeline
+CHANGE_UPSERT = "upsert"
+CHANGE_DELETE = "delete"
+
+
+class _WatchdogHandler(FileSystemEventHandler):
+    """Teruskan event watchdog (inotify) ke KnowledgeBaseWatcher"""
+
+    def __init__(self, watcher: "KnowledgeBaseWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.record_change(event.src_path, CHANGE_UPSERT)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.record_change(event.src_path, CHANGE_UPSERT)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.record_change(event.src_path, CHANGE_DELETE)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.record_change(event.src_path, CHANGE_DELETE)
+            self.watcher.record_change(event.dest_path, CHANGE_UPSERT)
+
+
+class KnowledgeBaseWatcher:
+    """
+    Memantau direktori knowledge base dan melakukan sinkronisasi inkremental:
+    - Backend inotify lewat watchdog, dengan fallback polling berbasis stat()
+    - Perubahan beruntun di-debounce lalu diproses sebagai satu batch
+    - File baru/berubah di-ingest, file yang dihapus dibuang dari index
+    """
+
+    def __init__(self, directory: str = None, debounce_seconds: float = None,
+                 poll_interval: float = None, backend: str = None):
+        self.directory = directory or settings.kb_watch_directory
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else settings.kb_watch_debounce_seconds
+        self.poll_interval = poll_interval if poll_interval is not None else settings.kb_watch_poll_interval
+        self.backend = (backend or settings.kb_watch_backend).lower()
+        # Batas tunggu agar perubahan terus-menerus tidak menahan sinkronisasi selamanya
+        self.max_delay = self.debounce_seconds * 10
+
+        self._pending: Dict[str, str] = {}
+        self._first_change_at: Optional[float] = None
+        self._last_change_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        # Batch perubahan baru diproses setelah initial sync selesai
+        self._initial_sync_done = threading.Event()
+        self._initial_sync_progress = IngestionProgress()
+        self._observer = None
+        self._threads = []
+        self.active_backend: Optional[str] = None
+
+    # --- Pengumpulan perubahan ---
+
+    def record_change(self, path: str, change: str):
+        """Catat perubahan file, perubahan terakhir untuk path yang sama yang berlaku"""
+        path = self._normalize_path(path)
+        if not is_supported_file(path):
+            return
+
+        with self._condition:
+            now = time.monotonic()
+            self._pending[path] = change
+            self._last_change_at = now
+            if self._first_change_at is None:
+                self._first_change_at = now
+            self._condition.notify()
+
+    def _normalize_path(self, path) -> str:
+        """Samakan format path dengan yang dipakai ingest_directory (untuk material_id)"""
+        path = os.fsdecode(path)
+        if not os.path.isabs(self.directory) and os.path.isabs(path):
+            path = os.path.relpath(path)
+        return os.path.normpath(path)
+
+    def _take_batch(self) -> Dict[str, str]:
+        """Tunggu sampai perubahan tenang selama debounce_seconds lalu ambil batch-nya"""
+        with self._condition:
+            while not self._stop_event.is_set():
+                if self._pending:
+                    now = time.monotonic()
+                    quiet_for = now - self._last_change_at
+                    waited = now - self._first_change_at
+                    if quiet_for >= self.debounce_seconds or waited >= self.max_delay:
+                        batch, self._pending = self._pending, {}
+                        self._first_change_at = self._last_change_at = None
+                        return batch
+                    self._condition.wait(self.debounce_seconds - quiet_for)
+                else:
+                    self._condition.wait()
+            return {}
+
+    # --- Sinkronisasi ---
+
+    def sync_changes(self, changes: Dict[str, str]) -> Tuple[int, int]:
+        """Teruskan batch perubahan ke pipeline, kembalikan (jumlah sukses, jumlah gagal)"""
+        succeeded = failed = 0
+        db = SessionLocal()
+        try:
+            for path, change in sorted(changes.items()):
+                material_id = material_id_for_path(path)
+                if change == CHANGE_UPSERT and os.path.isfile(path):
+                    logger.info(f"[KB WATCH] Ingesting changed file: {path}")
+                    ok = ingest_document(path, material_id, os.path.basename(path), db)
+                else:
+                    logger.info(f"[KB WATCH] Removing deleted file: {path}")
+                    ok = remove_document(db, material_id)
+
+                if ok:
+                    succeeded += 1
+                else:
+                    failed += 1
+        finally:
+            db.close()
+
+        logger.info(f"[KB WATCH] Synced {succeeded} changes, {failed} failed")
+        return succeeded, failed
+
+    def _is_in_directory(self, path: str) -> bool:
+        directory = os.path.abspath(self.directory)
+        return os.path.abspath(path).startswith(directory + os.sep)
+
+    def remove_missing_documents(self, db) -> int:
+        """
+        Hapus dokumen di direktori ini yang filenya sudah tidak ada, misalnya file
+        yang dihapus saat watcher tidak berjalan. Kembalikan jumlah dokumen yang dihapus.
+        """
+        on_disk = {material_id_for_path(path) for path in self._snapshot()}
+        rows = db.query(Document.id, Document.file_path).filter(Document.deleted_at.is_(None)).all()
+
+        removed = 0
+        for material_id, file_path in rows:
+            if material_id in on_disk or not file_path or not self._is_in_directory(file_path):
+                continue
+            if os.path.exists(file_path):
+                continue
+            logger.info(f"[KB WATCH] Removing document whose file is gone: {file_path}")
+            if remove_document(db, material_id):
+                removed += 1
+        return removed
+
+    def initial_sync(self):
+        """Rekonsiliasi penuh: ingest file baru/berubah lalu buang dokumen yang filenya hilang"""
+        db = SessionLocal()
+        try:
+            ingest_directory(self.directory, db, progress=self._initial_sync_progress)
+            removed = self.remove_missing_documents(db)
+            logger.info(f"[KB WATCH] Initial sync finished, removed {removed} missing documents")
+        except IngestionCancelledException:
+            logger.info("[KB WATCH] Initial sync cancelled")
+        except Exception as e:
+            logger.error(f"[KB WATCH] Initial sync failed: {e}")
+        finally:
+            db.close()
+            self._initial_sync_done.set()
+
+    def _dispatch_loop(self):
+        """Thread yang memproses batch perubahan setelah debounce"""
+        # Perubahan selama initial sync tetap terkumpul, diproses setelahnya
+        while not self._initial_sync_done.wait(1.0):
+            if self._stop_event.is_set():
+                return
+        while not self._stop_event.is_set():
+            batch = self._take_batch()
+            if batch:
+                try:
+                    self.sync_changes(batch)
+                except Exception as e:
+                    logger.error(f"[KB WATCH] Error while syncing changes: {e}")
+
+    # --- Backend polling ---
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Ambil (ukuran, mtime) semua file yang didukung tanpa membaca isinya"""
+        snapshot = {}
+        for file_path in Path(self.directory).glob("**/*"):
+            path = str(file_path)
+            if not is_supported_file(path):
+                continue
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _poll_loop(self):
+        """Fallback polling: bandingkan snapshot stat() secara berkala"""
+        previous = self._snapshot()
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                current = self._snapshot()
+            except Exception as e:
+                logger.error(f"[KB WATCH] Error while scanning {self.directory}: {e}")
+                continue
+
+            for path, stat in current.items():
+                if previous.get(path) != stat:
+                    self.record_change(path, CHANGE_UPSERT)
+            for path in previous.keys() - current.keys():
+                self.record_change(path, CHANGE_DELETE)
+            previous = current
+
+    # --- Lifecycle ---
+
+    def start(self, initial_sync: bool = None):
+        """
+        Mulai memantau direktori di background thread. Initial sync juga berjalan di
+        background sehingga pemanggil (misalnya startup API) tidak menunggu seluruh
+        knowledge base selesai disinkronkan.
+        """
+        initial_sync = settings.kb_watch_initial_sync if initial_sync is None else initial_sync
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+
+        use_inotify = self.backend in ("auto", "inotify") and WATCHDOG_AVAILABLE
+        if self.backend == "inotify" and not WATCHDOG_AVAILABLE:
+            logger.warning("[KB WATCH] watchdog is not installed, falling back to polling")
+
+        if use_inotify:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WatchdogHandler(self), self.directory, recursive=True)
+                self._observer.start()
+                self.active_backend = "inotify"
+            except Exception as e:
+                logger.warning(f"[KB WATCH] Native watcher unavailable ({e}), falling back to polling")
+                self._observer = None
+
+        if self._observer is None:
+            poll_thread = threading.Thread(target=self._poll_loop, name="kb-watch-poll", daemon=True)
+            poll_thread.start()
+            self._threads.append(poll_thread)
+            self.active_backend = "polling"
+
+        # Watcher dipasang sebelum initial sync agar perubahan selama sync tidak terlewat
+        if initial_sync:
+            sync_thread = threading.Thread(target=self.initial_sync, name="kb-watch-initial-sync", daemon=True)
+            sync_thread.start()
+            self._threads.append(sync_thread)
+        else:
+            self._initial_sync_done.set()
+
+        dispatch_thread = threading.Thread(target=self._dispatch_loop, name="kb-watch-sync", daemon=True)
+        dispatch_thread.start()
+        self._threads.append(dispatch_thread)
+
+        logger.info(f"[KB WATCH] Watching {self.directory} using {self.active_backend} backend")
+
+    def stop(self):
+        """Hentikan pemantauan"""
+        self._stop_event.set()
+        self._initial_sync_progress.cancel()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        logger.info("[KB WATCH] Stopped")
+
+
+def start_knowledge_base_watcher(**kwargs) -> KnowledgeBaseWatcher:
+    """Buat dan jalankan watcher knowledge base"""
+    watcher = KnowledgeBaseWatcher(**kwargs)
+    watcher.start()
+    return watcher
+
+
+# Jalankan watcher jika file ini dijalankan langsung
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    kb_watcher = start_knowledge_base_watcher()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        kb_watcher.stop()
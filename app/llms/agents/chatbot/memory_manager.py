@@ -12,6 +12,7 @@ from app.database.milvus_config import search_memory_collection
 from app.database.mysql_config import get_db
 from llama_index.embeddings.ollama import OllamaEmbedding
 from app.services.redis_service import redis_service
+from app.services.search_memory_maintenance import build_expiry_metadata, is_near_duplicate
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,8 +33,12 @@ class MemoryManager:
             base_url=settings.llm_embedding
         )
     
-    def save_search_memory(self, summary: str, search_id: str, session_id: str, source_urls: List[str]) -> bool:
-        """Simpan ringkasan hasil search baru ke Milvus search_memory"""
+    def save_search_memory(self, summary: str, search_id: str, session_id: str, source_urls: List[str],
+                           query: Optional[str] = None) -> bool:
+        """
+        Simpan ringkasan hasil search baru ke Milvus search_memory.
+        Masa berlaku entri ditentukan dari query (atau summary jika query tidak diberikan).
+        """
         try:
             logger.info(f"\033[95m[SAVING TO MILVUS]\033[0m Attempting to save search memory to Milvus - Search ID: {search_id}")
             # Validasi bahwa summary tidak kosong
@@ -55,6 +60,12 @@ class MemoryManager:
                 "source_urls": source_urls,
                 "timestamp": datetime.now().isoformat()
             }
+            metadata.update(build_expiry_metadata(query or summary))
+
+            # Ringkasan yang hampir sama dengan entri yang ada digabung, bukan ditambahkan
+            duplicate = self._find_duplicate_search_memory(summary_embedding)
+            if duplicate:
+                metadata = self._merge_search_memory_metadata(duplicate["metadata"], metadata)
 
             # Simpan ke search_memory collection
             insert_result = search_memory_collection.insert([
@@ -63,10 +74,17 @@ class MemoryManager:
                 [metadata]  # metadata
             ])
 
+            # Entri lama dihapus setelah penggantinya tersimpan agar tidak ada jeda tanpa entri
+            if duplicate:
+                search_memory_collection.delete(expr=f"id in [{duplicate['id']}]")
+
             # Commit perubahan
             search_memory_collection.flush()
 
-            logger.info(f"\033[95m[SUCCESS MILVUS]\033[0m Successfully stored search result in Milvus with ID: {search_id}")
+            if duplicate:
+                logger.info(f"\033[95m[MERGED MILVUS]\033[0m Merged search result {search_id} into near-duplicate entry {duplicate['id']} (similarity {duplicate['similarity']:.3f})")
+            else:
+                logger.info(f"\033[95m[SUCCESS MILVUS]\033[0m Successfully stored search result in Milvus with ID: {search_id}")
             return True
         except Exception as e:
             logger.error(f"Error storing search memory: {str(e)}")
@@ -74,6 +92,49 @@ class MemoryManager:
             logger.error(f"Full traceback: {traceback.format_exc()}")
             return False
     
+    def _find_duplicate_search_memory(self, summary_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Cari entri search_memory terdekat yang masih berlaku. Dianggap duplikat jika similarity
+        COSINE-nya minimal SEARCH_MEMORY_DEDUP_SIMILARITY (nilai lebih tinggi = lebih mirip).
+        """
+        if not settings.search_memory_dedup_enabled:
+            return None
+        try:
+            results = search_memory_collection.search(
+                data=[summary_embedding],
+                anns_field="vector",
+                param={"metric_type": "COSINE", "params": {"ef": 64}},
+                limit=1,
+                output_fields=["metadata"]
+            )
+            if not results or not results[0]:
+                return None
+
+            hit = results[0][0]
+            metadata = hit.entity.get("metadata") or {}
+            # Untuk metric COSINE, Milvus mengembalikan similarity di field distance
+            if not is_near_duplicate(hit.distance, metadata):
+                return None
+            return {"id": hit.id, "metadata": metadata, "similarity": hit.distance}
+        except Exception as e:
+            # Gagal cek duplikat tidak boleh menggagalkan penyimpanan
+            logger.warning(f"Near-duplicate check on search_memory failed, inserting new entry: {e}")
+            return None
+
+    @staticmethod
+    def _merge_search_memory_metadata(existing: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """Gabungkan metadata entri lama ke entri baru: sumber digabung, waktu dan masa berlaku diperbarui"""
+        merged = dict(new)
+        merged["source_urls"] = list(dict.fromkeys(
+            list(new.get("source_urls") or []) + list(existing.get("source_urls") or [])
+        ))
+        merged["merged_search_ids"] = list(dict.fromkeys(
+            list(existing.get("merged_search_ids") or [existing.get("search_id")]) + [new.get("search_id")]
+        ))
+        merged["first_seen"] = existing.get("first_seen", existing.get("timestamp", new.get("timestamp")))
+        merged["merge_count"] = existing.get("merge_count", 0) + 1
+        return merged
+
     def save_conversation_context(self, session_id: str, query: str, response: str, agent_responses: List[Dict]) -> bool:
         """Simpan log percakapan ke MySQL contexts"""
         try:
@@ -2,6 +2,7 @@
 Definisi Agen Spesialis untuk Multi Agent RAG
 """
 import asyncio
+import re
 from typing import Dict, List, Any, Optional
 from langchain_core.tools import BaseTool
 from llama_index.core import VectorStoreIndex
@@ -10,6 +11,10 @@ from llama_index.embeddings.ollama import OllamaEmbedding
 from app.core.config import settings
 from app.services.searxng_service import searxng_service
 from app.services.milvus_service import milvus_service
+from app.services.web_page_fetcher import WebPageFetcher
+from app.services.ephemeral_retriever import EphemeralRetriever
+from app.services.search_memory_maintenance import is_reusable_search_memory, rank_search_memory
+from app.services.search_result_processing import deduplicate_results, process_search_results
 from app.database.milvus_config import search_memory_collection
 from app.llms.agents.tools.mcp_tool import call_sequential_thinking_tool
 from app.llms.agents.chatbot.memory_manager import memory_manager
@@ -149,35 +154,72 @@ class LocalSpecialistAgent:
             }
 
 
+# Penanda jawaban yang berasal dari search_memory karena SearXNG tidak tersedia
+SEARCH_MEMORY_FALLBACK_PREFIX = "Internet search is temporarily unavailable, using previous search results."
+
+
+def keyword_similarity(first: str, second: str) -> float:
+    """Jaccard similarity antar himpunan kata (huruf kecil) dari dua query"""
+    first_tokens = set(re.findall(r"\w+", first.lower()))
+    second_tokens = set(re.findall(r"\w+", second.lower()))
+    if not first_tokens and not second_tokens:
+        return 1.0
+    return len(first_tokens & second_tokens) / len(first_tokens | second_tokens)
+
+
+def merge_search_results(*result_lists: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Gabungkan beberapa daftar hasil pencarian, URL yang sama hanya diambil sekali"""
+    merged = []
+    seen_urls = set()
+    for results in result_lists:
+        for result in results or []:
+            url = result.get("url")
+            if url and url in seen_urls:
+                continue
+            if url:
+                seen_urls.add(url)
+            merged.append(result)
+    return merged
+
+
 class SearchSpecialistTool(BaseTool):
     name: str = "internet_search"
     description: str = "Search for information on the internet using Searxng"
 
+    @staticmethod
+    def _format_results(search_results: List[Dict[str, Any]]) -> str:
+        """Format 3 hasil pencarian teratas"""
+        if not search_results:
+            return "No relevant results found on the internet."
+
+        formatted_results = []
+        for result in search_results[:3]:  # Ambil 3 hasil teratas
+            formatted_result = f"Title: {result.get('title', 'No title')}\n"
+            formatted_result += f"URL: {result.get('url', 'No URL')}\n"
+            formatted_result += f"Content: {result.get('content', '')[:300]}...\n\n"
+            formatted_results.append(formatted_result)
+
+        return "\n".join(formatted_results)
+
     def _run(self, query: str) -> str:
         """Search for information on the internet"""
         try:
-            # Cek dulu di search_memory
-            search_results = searxng_service.search_compliance_info(query)
-
-            if search_results:
-                # Format hasil pencarian
-                formatted_results = []
-                for result in search_results[:3]:  # Ambil 3 hasil teratas
-                    formatted_result = f"Title: {result.get('title', 'No title')}\n"
-                    formatted_result += f"URL: {result.get('url', 'No URL')}\n"
-                    formatted_result += f"Content: {result.get('content', '')[:300]}...\n\n"
-                    formatted_results.append(formatted_result)
-
-                return "\n".join(formatted_results)
-            else:
-                return "No relevant results found on the internet."
+            return self._format_results(deduplicate_results(
+                searxng_service.search_compliance_info(query), settings.search_near_duplicate_threshold
+            ))
         except Exception as e:
             logger.error(f"Error searching internet: {str(e)}")
             return f"Error searching internet: {str(e)}"
 
     async def _arun(self, query: str) -> str:
         """Asynchronous version of _run"""
-        return self._run(query)
+        try:
+            return self._format_results(deduplicate_results(
+                await searxng_service.asearch_compliance_info(query), settings.search_near_duplicate_threshold
+            ))
+        except Exception as e:
+            logger.error(f"Error searching internet: {str(e)}")
+            return f"Error searching internet: {str(e)}"
 
 
 class SearchSpecialistAgent:
@@ -202,55 +244,92 @@ class SearchSpecialistAgent:
             # Tool lain bisa ditambahkan di sini
         ]
 
-    def check_search_memory(self, query: str) -> str:
-        """Check search_memory in Milvus for previous search results"""
-        try:
-            logger.info(f"\033[94m[CHECKING SEARCH MEMORY]\033[0m Checking search_memory in Milvus for query: {query}")
-            # Ambil embedding dari query
-            query_embedding = OllamaEmbedding(
+        # Dibuat saat pertama dipakai, hanya jika WEB_FETCH_ENABLED aktif
+        self._web_fetcher: Optional[WebPageFetcher] = None
+        self._embed_model: Optional[OllamaEmbedding] = None
+
+    def _get_web_fetcher(self) -> WebPageFetcher:
+        if self._web_fetcher is None:
+            self._web_fetcher = WebPageFetcher(
+                max_concurrency=settings.web_fetch_max_concurrency,
+                per_host_limit=settings.web_fetch_per_host_limit,
+                timeout=settings.web_fetch_timeout,
+                max_bytes=settings.web_fetch_max_bytes,
+                cache_dir=settings.web_fetch_cache_dir,
+                cache_ttl=settings.web_fetch_cache_ttl,
+            )
+        return self._web_fetcher
+
+    async def aclose(self):
+        """Tutup client HTTP web fetcher jika sudah dibuat"""
+        if self._web_fetcher is not None:
+            await self._web_fetcher.aclose()
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if self._embed_model is None:
+            self._embed_model = OllamaEmbedding(
                 model_name=settings.embedding_model_name,
                 base_url=settings.llm_embedding
-            ).get_text_embedding(query)
+            )
+        return self._embed_model.get_text_embedding_batch(texts)
+
+    async def fetch_web_passages(self, query: str, search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ambil halaman top-N hasil pencarian dan cari passage paling relevan di index sementara"""
+        try:
+            urls = [result.get("url") for result in search_results[:settings.web_fetch_top_n]]
+            pages = await self._get_web_fetcher().fetch_many(urls)
 
-            # Cari di search_memory collection
-            search_results = milvus_service.search_in_collection(
-                collection_name="search_memory",
-                query_vector=query_embedding,
-                top_k=settings.similarity_top_k
+            retriever = EphemeralRetriever(
+                self._embed_texts,
+                chunk_size=settings.web_fetch_chunk_size,
+                chunk_overlap=settings.web_fetch_chunk_overlap,
             )
+            fetched = 0
+            for page in pages:
+                if page.ok:
+                    fetched += 1
+                    retriever.add_document(page.text, {"url": page.url, "title": page.title})
+
+            logger.info(f"[SEARCH AGENT] Fetched {fetched}/{len(pages)} pages, {len(retriever.passages)} passages indexed")
+            # Embedding Ollama bersifat sync, jalankan di thread agar event loop tidak terblokir
+            return await asyncio.to_thread(retriever.retrieve, query, settings.web_fetch_top_k)
+        except Exception as e:
+            logger.warning(f"[SEARCH AGENT] Web page retrieval failed, using snippets only: {e}")
+            return []
 
-            logger.info(f"\033[94m[SEARCH RESULTS]\033[0m Found {len(search_results)} results in search_memory for query: {query}")
+    @staticmethod
+    def _format_passages(passages: List[Dict[str, Any]]) -> str:
+        formatted = ["Relevant passages from fetched pages:\n"]
+        for passage in passages:
+            formatted.append(f"Source: {passage['metadata'].get('url', 'No URL')}\n")
+            formatted.append(f"Passage: {passage['text']}\n\n")
+        return "".join(formatted)
 
-            if search_results:
-                # Ambil hasil dengan skor kemiripan tertinggi (jarak terendah)
-                best_result = search_results[0]  # Hasil dengan jarak terendah (kemiripan tertinggi)
-                best_similarity_score = best_result.get('distance', float('inf'))  # Gunakan jarak sebagai ukuran kemiripan
+    def check_search_memory(self, query: str) -> str:
+        """Check search_memory in Milvus for previous search results"""
+        try:
+            logger.info(f"\033[94m[CHECKING SEARCH MEMORY]\033[0m Checking search_memory in Milvus for query: {query}")
+            search_results = self._search_memory_candidates(query)
 
-                # Gunakan threshold tetap berdasarkan skor kemiripan terbaik
-                # Kita gunakan threshold tetap untuk konsistensi antar permintaan
-                # Berdasarkan pengujian sebelumnya, nilai 0.65 masih terlalu tinggi
-                # Kita turunkan threshold untuk mencegah sistem menganggap pertanyaan yang berbeda sebagai mirip
-                similarity_threshold = 0.5  # Threshold tetap untuk menentukan kemiripan
+            if search_results:
+                # Hasil sudah diurutkan dari similarity (setelah decay) tertinggi
+                best_result = search_results[0]
+                best_similarity_score = best_result['similarity']
+                similarity_threshold = settings.search_memory_reuse_similarity
 
                 logger.info(f"\033[94m[BEST SCORE]\033[0m Best similarity score: {best_similarity_score}")
-                logger.info(f"\033[94m[THRESHOLD]\033[0m Fixed similarity threshold: {similarity_threshold}")
+                logger.info(f"\033[94m[THRESHOLD]\033[0m Similarity threshold: {similarity_threshold}")
 
-                # Jika skor terbaik lebih kecil dari threshold, maka cukup mirip
-                # Dalam konteks cosine similarity, jarak yang lebih rendah berarti kemiripan yang lebih tinggi
-                if best_similarity_score < similarity_threshold:
-                    # Ambil hanya hasil dengan skor kemiripan terbaik (jarak terendah)
+                # Metric COSINE: similarity lebih tinggi berarti lebih mirip
+                if is_reusable_search_memory(best_result):
+                    # Ambil hanya hasil dengan similarity tertinggi
                     # Gunakan field yang benar berdasarkan skema search_memory
-                    summary_text = best_result.get('summary_text', best_result.get('text', ''))
-
-                    # Format hasil pencarian dari memory
-                    formatted_result = f"Previous Search Summary: {summary_text}\n"
-                    formatted_result += f"Source URLs: {best_result.get('metadata', {}).get('source_urls', [])}\n"
-                    formatted_result += f"Timestamp: {best_result.get('metadata', {}).get('timestamp', 'N/A')}\n\n"
+                    formatted_result = self._format_memory_result(best_result)
 
                     logger.info(f"\033[92m[SUFFICIENT SIMILARITY]\033[0m Using cached results with similarity score: {best_similarity_score} (threshold: {similarity_threshold})")
                     return formatted_result
                 else:
-                    logger.info(f"\033[93m[LOW SIMILARITY]\033[0m Best similarity score {best_similarity_score} is above threshold {similarity_threshold}, need to search internet")
+                    logger.info(f"\033[93m[LOW SIMILARITY]\033[0m Best similarity score {best_similarity_score} is below threshold {similarity_threshold}, need to search internet")
                     return "No previous search results found in memory for this query."
             else:
                 logger.info(f"\033[91m[NO RESULTS FOUND]\033[0m No previous search results found in memory for query: {query}")
@@ -259,48 +338,124 @@ class SearchSpecialistAgent:
             logger.error(f"Error checking search memory: {str(e)}")
             return f"Error checking search memory: {str(e)}"
 
+    def _search_memory_candidates(self, query: str) -> List[Dict[str, Any]]:
+        """Cari entri search_memory untuk query, entri kedaluwarsa sudah dibuang dan diurutkan"""
+        # Ambil embedding dari query
+        query_embedding = self._embed_texts([query])[0]
+
+        # Cari di search_memory collection
+        search_results = milvus_service.search_in_collection(
+            collection_name="search_memory",
+            query_vector=query_embedding,
+            top_k=settings.similarity_top_k
+        )
+
+        logger.info(f"\033[94m[SEARCH RESULTS]\033[0m Found {len(search_results)} results in search_memory for query: {query}")
+
+        # Entri kedaluwarsa dibuang dan similarity diberi penalti sesuai umur entri, yang paling mirip di depan
+        return rank_search_memory(search_results)
+
+    @staticmethod
+    def _format_memory_result(result: Dict[str, Any]) -> str:
+        # Gunakan field yang benar berdasarkan skema search_memory
+        summary_text = result.get('summary_text', result.get('text', ''))
+
+        # Format hasil pencarian dari memory
+        formatted_result = f"Previous Search Summary: {summary_text}\n"
+        formatted_result += f"Source URLs: {result.get('metadata', {}).get('source_urls', [])}\n"
+        formatted_result += f"Timestamp: {result.get('metadata', {}).get('timestamp', 'N/A')}\n\n"
+        return formatted_result
+
+    def search_memory_fallback(self, query: str) -> str:
+        """
+        Jawaban saat SearXNG tidak tersedia (circuit open): entri search_memory paling mirip
+        dipakai walaupun tidak lolos threshold check_search_memory
+        """
+        try:
+            search_results = self._search_memory_candidates(query)
+        except Exception as e:
+            logger.error(f"Error reading search memory fallback: {str(e)}")
+            search_results = []
+
+        if not search_results:
+            return f"{SEARCH_MEMORY_FALLBACK_PREFIX} No related previous search results were found."
+
+        logger.info(f"[SEARCH AGENT] Using search_memory fallback (similarity {search_results[0]['similarity']:.3f})")
+        return f"{SEARCH_MEMORY_FALLBACK_PREFIX}\n\n" + self._format_memory_result(search_results[0])
+
+    async def extract_search_keywords(self, query: str) -> str:
+        """Ekstrak kata kunci pencarian lewat sequential thinking, fallback ke query asli"""
+        # Gunakan pendekatan ReAct (Reason + Act) dengan bantuan sequential thinking
+        # Pertama, lakukan reasoning untuk memahami query
+        reasoning_result = await call_sequential_thinking_tool(
+            tool_name="sequentialThinking", 
+            parameters={
+                "thought": f"Analisis query: {query}",
+                "thoughtNumber": 1,
+                "totalThoughts": 1,
+                "nextThoughtNeeded": False
+            }
+        )
+
+        logger.info(f"[SEARCH AGENT] Query asli: {query}")
+        logger.info(f"[SEARCH AGENT] Hasil reasoning: {reasoning_result}")
+
+        # Ekstrak kata kunci dari hasil reasoning
+        if reasoning_result and "result" in reasoning_result:
+            reasoning_content = reasoning_result["result"]
+            logger.info(f"[SEARCH AGENT] Isi reasoning: {reasoning_content}")
+
+            # Cari pola kata kunci dalam reasoning
+            keywords_match = re.search(r'kata kunci.*?:(.*?)(?:\n|$)', reasoning_content, re.IGNORECASE | re.DOTALL)
+            if keywords_match and keywords_match.group(1).strip():
+                keywords = keywords_match.group(1).strip()
+                logger.info(f"[SEARCH AGENT] Kata kunci diekstrak dari reasoning: {keywords}")
+                return keywords
+
+            # Jika tidak ditemukan, gunakan query asli
+            logger.info(f"[SEARCH AGENT] Tidak menemukan kata kunci spesifik, menggunakan query asli: {query}")
+        else:
+            logger.info(f"[SEARCH AGENT] Sequential thinking tidak memberikan hasil, menggunakan query asli: {query}")
+        return query
+
     async def search_internet(self, query: str) -> str:
         """Search for information on the internet using Searxng"""
         try:
-            # Gunakan pendekatan ReAct (Reason + Act) dengan bantuan sequential thinking
-            # Pertama, lakukan reasoning untuk memahami query
-            reasoning_result = await call_sequential_thinking_tool(
-                tool_name="sequentialThinking", 
-                parameters={
-                    "thought": f"Analisis query: {query}",
-                    "thoughtNumber": 1,
-                    "totalThoughts": 1,
-                    "nextThoughtNeeded": False
-                }
-            )
-
-            logger.info(f"[SEARCH AGENT] Query asli: {query}")
-            logger.info(f"[SEARCH AGENT] Hasil reasoning: {reasoning_result}")
-
-            # Ekstrak kata kunci dari hasil reasoning
-            if reasoning_result and "result" in reasoning_result:
-                reasoning_content = reasoning_result["result"]
-                logger.info(f"[SEARCH AGENT] Isi reasoning: {reasoning_content}")
-
-                # Coba ekstrak kata kunci dari reasoning
-                import re
-                # Cari pola kata kunci dalam reasoning
-                keywords_match = re.search(r'kata kunci.*?:(.*?)(?:\n|$)', reasoning_content, re.IGNORECASE | re.DOTALL)
-                if keywords_match:
-                    keywords = keywords_match.group(1).strip()
-                    logger.info(f"[SEARCH AGENT] Kata kunci diekstrak dari reasoning: {keywords}")
-                else:
-                    # Jika tidak ditemukan, gunakan query asli
-                    keywords = query
-                    logger.info(f"[SEARCH AGENT] Tidak menemukan kata kunci spesifik, menggunakan query asli: {keywords}")
-            else:
+            # SearXNG sedang dianggap mati, langsung pakai search_memory tanpa menunggu timeout
+            if not searxng_service.is_available():
+                logger.warning("[SEARCH AGENT] SearXNG circuit is open, falling back to search_memory")
+                return await asyncio.to_thread(self.search_memory_fallback, query)
+
+            # Pencarian spekulatif dengan query asli berjalan bersamaan dengan ekstraksi kata kunci
+            raw_search = asyncio.create_task(searxng_service.asearch_compliance_info(query))
+            try:
+                keywords = await self.extract_search_keywords(query)
+            except Exception as e:
+                logger.warning(f"[SEARCH AGENT] Keyword extraction failed, using raw query: {e}")
                 keywords = query
-                logger.info(f"[SEARCH AGENT] Sequential thinking tidak memberikan hasil, menggunakan query asli: {keywords}")
+            search_results = await raw_search
 
             logger.info(f"[SEARCH AGENT] Kata kunci yang akan digunakan untuk pencarian: {keywords}")
 
-            # Gunakan searxng_service untuk pencarian
-            search_results = searxng_service.search_compliance_info(keywords)
+            # Pencarian kedua hanya jika kata kunci berbeda cukup jauh dari query asli
+            similarity = keyword_similarity(query, keywords)
+            if similarity < settings.search_keyword_similarity_threshold:
+                logger.info(f"[SEARCH AGENT] Keywords differ from query (similarity {similarity:.2f}), running second search")
+                keyword_results = await searxng_service.asearch_compliance_info(keywords)
+                search_results = merge_search_results(keyword_results, search_results)
+            else:
+                logger.info(f"[SEARCH AGENT] Keywords close to query (similarity {similarity:.2f}), reusing speculative search")
+
+            # Gabungkan URL/mirror yang sama, buang snippet hampir sama, lalu urutkan ulang dengan embedding
+            if search_results:
+                search_results = await asyncio.to_thread(
+                    process_search_results,
+                    query,
+                    search_results,
+                    self._embed_texts if settings.search_rerank_enabled else None,
+                    settings.search_results_top_n,
+                    settings.search_near_duplicate_threshold,
+                )
 
             if search_results:
                 logger.info(f"[SEARCH AGENT] Ditemukan {len(search_results)} hasil untuk kata kunci: {keywords}")
@@ -313,7 +468,16 @@ class SearchSpecialistAgent:
                     formatted_result += f"Content: {result.get('content', '')[:300]}...\n\n"
                     formatted_results.append(formatted_result)
 
-                # Gunakan pendekatan ReAct untuk mengevaluasi hasil
+                # Passage relevan dari halaman lengkap, melengkapi snippet yang pendek
+                if settings.web_fetch_enabled:
+                    passages = await self.fetch_web_passages(query, search_results)
+                    if passages:
+                        formatted_results.append(self._format_passages(passages))
+
+                # Evaluasi ReAct atas hasil pencarian bersifat opsional (menambah satu round trip MCP)
+                if not settings.search_evaluation_enabled:
+                    return "\n".join(formatted_results)
+
                 evaluation_result = await call_sequential_thinking_tool(
                     "sequentialThinking",
                     {
@@ -327,6 +491,10 @@ class SearchSpecialistAgent:
                     return f"Evaluation: {evaluation_result['result']}\n\n" + "\n".join(formatted_results)
                 else:
                     return "\n".join(formatted_results)
+            elif not searxng_service.is_available():
+                # Pencarian barusan membuat circuit open
+                logger.warning("[SEARCH AGENT] SearXNG failed during search, falling back to search_memory")
+                return await asyncio.to_thread(self.search_memory_fallback, query)
             else:
                 logger.info(f"[SEARCH AGENT] Tidak ditemukan hasil untuk kata kunci: {keywords}")
                 return "No results found from internet search."
@@ -347,7 +515,8 @@ class SearchSpecialistAgent:
                 response = await self.search_internet(query)
 
                 # Simpan hasil pencarian ke memory jika session_id disediakan
-                if session_id:
+                # (jawaban fallback dari search_memory tidak disimpan ulang)
+                if session_id and not response.startswith(SEARCH_MEMORY_FALLBACK_PREFIX):
                     logger.info("\033[95m[SAVING RESULTS]\033[0m Saving new search results to MySQL and Milvus")
                     # Ekstrak informasi dari hasil pencarian untuk disimpan
                     results_summary = self._extract_summary_from_response(response)
@@ -359,7 +528,7 @@ class SearchSpecialistAgent:
 
                     # Simpan ke Milvus search_memory
                     if search_id:
-                        memory_manager.save_search_memory(results_summary, search_id, session_id, source_urls)
+                        memory_manager.save_search_memory(results_summary, search_id, session_id, source_urls, query=query)
                         logger.info(f"\033[95m[SAVED TO MILVUS]\033[0m Saved search memory to Milvus with search_id: {search_id}")
             else:
                 logger.info("\033[92m[USING CACHED RESULT]\033[0m Found similar query in search memory, using cached results")
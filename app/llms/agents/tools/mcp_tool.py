@@ -2,6 +2,7 @@
 MCP Tool untuk integrasi dengan Model Context Protocol (Multi-Server Support)
 """
 from app.llms.core.mcp.mcp_client import get_mcp_client
+from app.llms.agents.tools.sequential_thinking import get_sequential_thinking_server
 from app.core.config import settings
 import logging
 import asyncio
@@ -20,36 +21,48 @@ async def call_mcp_tool(tool_name: str, parameters: dict = None):
         logger.warning("MCP client (lms) not available")
         return None
 
+def _thinking_params(parameters: dict = None) -> dict:
+    """
+    Sesuaikan parameter agar cocok dengan skema tool sequential thinking.
+    Server npx mengharapkan 'thought', bukan 'input'
+    """
+    parameters = parameters or {}
+    return {
+        "thought": parameters.get("thought", parameters.get("input", "Analisis sistem")),
+        "thoughtNumber": parameters.get("thoughtNumber", 1),
+        "totalThoughts": parameters.get("totalThoughts", 1),
+        "nextThoughtNeeded": parameters.get("nextThoughtNeeded", False)
+    }
+
 async def call_sequential_thinking_tool(tool_name: str, parameters: dict = None):
     """
     Memanggil tool sequential thinking dengan deteksi nama tool otomatis.
+    Backend dipilih lewat SEQUENTIAL_THINKING_BACKEND: 'local' diproses in-process,
+    'mcp' dikirim ke server npx. Bentuk hasil keduanya sama: {"result": <teks JSON>}.
     """
+    final_params = _thinking_params(parameters)
+
+    if settings.sequential_thinking_backend != "mcp":
+        result = get_sequential_thinking_server().process_thought(final_params)
+        return {"result": result["text"]}
+
     client = await get_mcp_client()
     if not client:
         return None
 
     try:
-        # 1. Ambil daftar tool asli dari server 'thinking'
-        thinking_session = client.sessions.get("thinking")
-        if not thinking_session:
+        # 1. Cocokkan nama tool dengan katalog server 'thinking' yang di-cache saat connect
+        if not client.is_available("thinking"):
+            return None
+
+        actual_tool_name = await client.resolve_tool_name("thinking", tool_name)
+        if not actual_tool_name:
+            logger.error(f"❌ [MCP_TOOL] Thinking tool '{tool_name}' not found in catalog")
             return None
-            
-        tools_resp = await thinking_session.list_tools()
-        # Ambil nama tool pertama yang tersedia (biasanya cuma ada 1)
-        actual_tool_name = tools_resp.tools[0].name 
-        
-        logger.info(f"🔍 [MCP_TOOL] Detected thinking tool name: {actual_tool_name}")
 
-        # 2. Sesuaikan parameter agar cocok dengan skema server npx
-        # Server npx mengharapkan 'thought', bukan 'input'
-        final_params = {
-            "thought": parameters.get("thought", parameters.get("input", "Analisis sistem")),
-            "thoughtNumber": parameters.get("thoughtNumber", 1),
-            "totalThoughts": parameters.get("totalThoughts", 1),
-            "nextThoughtNeeded": parameters.get("nextThoughtNeeded", False)
-        }
+        logger.debug(f"🔍 [MCP_TOOL] Resolved thinking tool name: {actual_tool_name}")
 
-        # 3. Panggil dengan nama asli yang ditemukan
+        # 2. Panggil dengan nama asli yang ditemukan
         result = await client.acall(actual_tool_name, final_params, server_name="thinking")
         
         if result and "result" in result:
@@ -69,8 +82,8 @@ async def list_mcp_tools(server: str = "lms"):
     client = await get_mcp_client()
     if client and server in client.sessions:
         try:
-            result = await client.sessions[server].list_tools()
-            return result.tools
+            tools = await client.get_tools(server)
+            return list(tools.values())
         except Exception as e:
             logger.error(f"Error listing tools for {server}: {e}")
             return []
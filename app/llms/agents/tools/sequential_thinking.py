@@ -0,0 +1,105 @@
+"""
+Implementasi in-process tool sequential thinking
+Meniru perilaku @modelcontextprotocol/server-sequential-thinking (validasi input, riwayat
+thought, branch dan format respons JSON) tanpa proses npx dan round-trip stdio JSON-RPC.
+"""
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TOOL_NAME = "sequentialthinking"
+
+# Field wajib beserta tipe yang diterima, sama dengan validasi server npx
+REQUIRED_FIELDS = {
+    "thought": (str,),
+    "thoughtNumber": (int, float),
+    "totalThoughts": (int, float),
+    "nextThoughtNeeded": (bool,),
+}
+REQUIRED_FIELD_LABELS = {"thought": "string", "thoughtNumber": "number",
+                         "totalThoughts": "number", "nextThoughtNeeded": "boolean"}
+
+
+class SequentialThinkingServer:
+    """
+    Penyimpan riwayat thought dan branch. Riwayat dibatasi max_history agar proses yang
+    berjalan lama tidak terus membesar (server npx menyimpan riwayat tanpa batas).
+    """
+
+    def __init__(self, max_history: int = 1000):
+        self.max_history = max(max_history, 1)
+        self.thought_history: Deque[Dict[str, Any]] = deque(maxlen=self.max_history)
+        self.branches: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _validate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        for field, types in REQUIRED_FIELDS.items():
+            value = arguments.get(field)
+            is_flag = types == (bool,)
+            # bool adalah subclass int sehingga tidak boleh lolos sebagai number,
+            # string kosong dan angka 0 ditolak seperti di server npx
+            if not isinstance(value, types) or (not is_flag and (isinstance(value, bool) or not value)):
+                raise ValueError(f"Invalid {field}: must be a {REQUIRED_FIELD_LABELS[field]}")
+        return arguments
+
+    @staticmethod
+    def _format_thought(thought: Dict[str, Any]) -> str:
+        if thought.get("isRevision"):
+            prefix = f"Revision (revising thought {thought.get('revisesThought')})"
+        elif thought.get("branchFromThought"):
+            prefix = f"Branch (from thought {thought['branchFromThought']}, ID: {thought.get('branchId')})"
+        else:
+            prefix = "Thought"
+        return f"{prefix} {thought['thoughtNumber']}/{thought['totalThoughts']}: {thought['thought']}"
+
+    def process_thought(self, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Proses satu thought. Mengembalikan {"text": <JSON respons>, "is_error": bool},
+        isi text sama persis dengan content teks yang dikirim server npx.
+        """
+        try:
+            thought = dict(self._validate(dict(arguments or {})))
+        except ValueError as e:
+            return {"text": json.dumps({"error": str(e), "status": "failed"}, indent=2), "is_error": True}
+
+        if thought["thoughtNumber"] > thought["totalThoughts"]:
+            thought["totalThoughts"] = thought["thoughtNumber"]
+
+        with self._lock:
+            self.thought_history.append(thought)
+            branch_id = thought.get("branchId")
+            if thought.get("branchFromThought") and branch_id:
+                self.branches.setdefault(branch_id, deque(maxlen=self.max_history)).append(thought)
+
+            response = {
+                "thoughtNumber": thought["thoughtNumber"],
+                "totalThoughts": thought["totalThoughts"],
+                "nextThoughtNeeded": thought["nextThoughtNeeded"],
+                "branches": list(self.branches.keys()),
+                "thoughtHistoryLength": len(self.thought_history),
+            }
+
+        logger.debug(self._format_thought(thought))
+        return {"text": json.dumps(response, indent=2), "is_error": False}
+
+    def reset(self):
+        with self._lock:
+            self.thought_history.clear()
+            self.branches.clear()
+
+
+_sequential_thinking_server: Optional[SequentialThinkingServer] = None
+
+
+def get_sequential_thinking_server() -> SequentialThinkingServer:
+    """Instance global, dibuat saat pertama dipakai"""
+    global _sequential_thinking_server
+    if _sequential_thinking_server is None:
+        from app.core.config import settings
+        _sequential_thinking_server = SequentialThinkingServer(settings.sequential_thinking_max_history)
+    return _sequential_thinking_server
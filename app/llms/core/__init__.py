@@ -56,12 +56,13 @@ def run_mcp_server_in_background():
     """
     Menjalankan runner FastMCP di Process terpisah.
     Ini identik dengan menjalankan 'python mcp_server.py' di terminal lain.
+    Server melayani SSE (/sse) dan streamable HTTP (/mcp) di port 8071.
     """
     def start_server_process():
         try:
             # Import di dalam fungsi untuk menghindari circular import
-            from app.llms.core.mcp.mcp_server import run_mcp_sse_server
-            run_mcp_sse_server()
+            from app.llms.core.mcp.mcp_server import run_mcp_http_server
+            run_mcp_http_server()
         except Exception as e:
             logger.error(f"❌ Error di dalam MCP Process: {e}")
 
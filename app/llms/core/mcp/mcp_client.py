@@ -1,100 +1,360 @@
 """
 MCP Client menggunakan SDK resmi untuk berkomunikasi dengan Multi-Server (FastMCP & Sequential Thinking)
+Setiap server dilayani oleh pool beberapa session (beberapa proses npx stdio / beberapa koneksi HTTP).
+Panggilan tool dikirim ke session yang paling sedikit sedang dipakai, dan session dicek dengan ping berkala.
 """
 import asyncio
+import itertools
 import logging
 import shutil
-from typing import Dict, Any, Optional, List
-from contextlib import AsyncExitStack
-from mcp import ClientSession, StdioServerParameters
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, Set
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+
+class PooledSession:
+    """
+    Satu slot pool. Session dibuka dan ditutup di task milik slot itu sendiri, karena
+    transport MCP (anyio task group) harus ditutup di task yang sama dengan yang membukanya.
+    """
+
+    def __init__(self, server_name: str, index: int):
+        self.server_name = server_name
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.healthy = False
+        self.ready = asyncio.Event()
+        self.restart = asyncio.Event()
+        self.stopping = False
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.server_name}#{self.index}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"session": self.name, "healthy": self.healthy, "in_flight": self.in_flight}
+
+
 class MultiMCPClient:
     """
     Client resmi yang mengelola koneksi ke beberapa MCP Server:
-    1. lms: FastMCP Server berbasis SSE (Port 8071)
-    2. thinking: Sequential Thinking Server berbasis STDIO (npx)
+    1. lms: FastMCP Server berbasis streamable HTTP atau SSE (Port 8071)
+    2. thinking: Sequential Thinking Server berbasis STDIO (npx), hanya jika SEQUENTIAL_THINKING_BACKEND=mcp
     """
 
     def __init__(self):
-        self.sessions: Dict[str, ClientSession] = {}
-        self._exit_stack = AsyncExitStack()
+        self.pools: Dict[str, List[PooledSession]] = {}
         self.connected = False
         self.mcp_url = "http://localhost:8071/sse"
+        self.mcp_streamable_url = "http://localhost:8071/mcp"
+        # Katalog tool per server (nama -> Tool beserta inputSchema), diambil saat connect
+        self.tool_catalog: Dict[str, Dict[str, types.Tool]] = {}
+        # Server yang katalognya perlu diambil ulang (notifikasi tools/list_changed atau reconnect)
+        self._stale_catalogs: Set[str] = set()
+        self._round_robin = itertools.count()
+        self._health_task: Optional[asyncio.Task] = None
 
-    async def connect(self) -> bool:
+    @property
+    def sessions(self) -> Dict[str, ClientSession]:
+        """Session sehat yang paling sedikit dipakai untuk setiap server (kompatibel dengan kode lama)"""
+        sessions = {}
+        for server_name in self.pools:
+            slot = self._pick_slot(server_name)
+            if slot:
+                sessions[server_name] = slot.session
+        return sessions
+
+    @staticmethod
+    def _server_names() -> List[str]:
+        """Server yang dihubungkan, proses npx tidak dijalankan jika sequential thinking memakai backend local"""
+        if settings.sequential_thinking_backend == "mcp":
+            return ["lms", "thinking"]
+        return ["lms"]
+
+    def _pool_size(self, server_name: str) -> int:
+        sizes = {"lms": settings.mcp_lms_pool_size, "thinking": settings.mcp_thinking_pool_size}
+        return max(sizes.get(server_name, 1), 1)
+
+    def _message_handler(self, server_name: str):
         """
-        Membuat koneksi ke semua server MCP
+        Handler notifikasi server: tools/list_changed menandai katalog basi.
+        Katalog tidak diambil di sini karena handler berjalan di loop penerima session,
+        request list_tools dari dalamnya akan menunggu dirinya sendiri.
         """
-        try:
-            # --- 1. Koneksi ke FastMCP Server (SSE) ---
-            try:
-                sse_streams = await self._exit_stack.enter_async_context(sse_client(url=self.mcp_url))
-                self.sessions["lms"] = await self._exit_stack.enter_async_context(
-                    ClientSession(sse_streams[0], sse_streams[1])
-                )
-                await self.sessions["lms"].initialize()
-                logger.info(f"✅ Connected to FastMCP SSE: {self.mcp_url}")
-            except Exception as e:
-                logger.error(f"❌ Failed to connect to FastMCP SSE: {e}")
+        async def handle(message) -> None:
+            notification = getattr(message, "root", message)
+            if isinstance(notification, types.ToolListChangedNotification):
+                logger.info(f"Tool list changed on MCP server {server_name}, catalog will be refreshed")
+                self._stale_catalogs.add(server_name)
+            elif isinstance(message, Exception):
+                logger.warning(f"MCP server {server_name} transport error: {message}")
+        return handle
+
+    async def refresh_tools(self, server_name: str) -> Dict[str, types.Tool]:
+        """Ambil ulang katalog tool satu server (mengikuti pagination)"""
+        session = self.sessions[server_name]
+        tools: Dict[str, types.Tool] = {}
+        result = await session.list_tools()
+        while True:
+            for tool in result.tools:
+                tools[tool.name] = tool
+            if not result.nextCursor:
+                break
+            result = await session.list_tools(cursor=result.nextCursor)
+
+        self.tool_catalog[server_name] = tools
+        self._stale_catalogs.discard(server_name)
+        logger.info(f"Cached {len(tools)} tools from MCP server {server_name}: {', '.join(tools)}")
+        return tools
+
+    async def get_tools(self, server_name: str) -> Dict[str, types.Tool]:
+        """Katalog tool dari cache, diambil ulang hanya jika belum ada atau basi"""
+        if server_name not in self.sessions:
+            return {}
+        if server_name not in self.tool_catalog or server_name in self._stale_catalogs:
+            await self.refresh_tools(server_name)
+        return self.tool_catalog[server_name]
+
+    async def resolve_tool_name(self, server_name: str, requested: Optional[str] = None) -> Optional[str]:
+        """
+        Cocokkan nama tool yang diminta dengan katalog tanpa request ke server:
+        nama persis, lalu nama yang sama tanpa memperhatikan huruf besar/underscore/strip,
+        lalu tool satu-satunya jika server hanya punya satu tool.
+        """
+        tools = await self.get_tools(server_name)
+        if not tools:
+            return None
+        if requested in tools:
+            return requested
+
+        if requested:
+            normalized = requested.replace("_", "").replace("-", "").lower()
+            for name in tools:
+                if name.replace("_", "").replace("-", "").lower() == normalized:
+                    return name
+
+        if len(tools) == 1:
+            return next(iter(tools))
+        return None
+
+    def get_tool_schema(self, server_name: str, tool_name: str) -> Optional[Dict[str, Any]]:
+        """inputSchema tool dari katalog yang sudah di-cache"""
+        tool = self.tool_catalog.get(server_name, {}).get(tool_name)
+        return tool.inputSchema if tool else None
+
+    @asynccontextmanager
+    async def _open_transport(self, server_name: str):
+        """Stream baca/tulis ke server: streamable HTTP atau SSE untuk lms, proses npx stdio baru untuk thinking"""
+        if server_name == "lms":
+            if settings.mcp_lms_transport == "sse":
+                async with sse_client(url=self.mcp_url) as streams:
+                    yield streams
+            else:
+                async with streamablehttp_client(url=self.mcp_streamable_url) as (read_stream, write_stream, _):
+                    yield read_stream, write_stream
+        elif server_name == "thinking":
+            npx_path = shutil.which("npx")
+            if not npx_path:
+                raise RuntimeError("npx not found in system PATH")
 
-            # --- 2. Koneksi ke Sequential Thinking (STDIO via npx) ---
+            server_params = StdioServerParameters(
+                command=npx_path,
+                args=["-y", "@modelcontextprotocol/server-sequential-thinking"],
+                env=None
+            )
+            async with stdio_client(server_params) as streams:
+                yield streams
+        else:
+            raise ValueError(f"Unknown MCP server: {server_name}")
+
+    async def _run_slot(self, slot: PooledSession):
+        """Buka session slot dan pertahankan; jika putus atau gagal health check, buka ulang"""
+        retry_delay = settings.mcp_retry_delay or 1.0
+        while not slot.stopping:
             try:
-                npx_path = shutil.which("npx")
-                if not npx_path:
-                    raise RuntimeError("npx not found in system PATH")
-
-                server_params = StdioServerParameters(
-                    command=npx_path,
-                    args=["-y", "@modelcontextprotocol/server-sequential-thinking"],
-                    env=None
-                )
-                
-                stdio_streams = await self._exit_stack.enter_async_context(stdio_client(server_params))
-                self.sessions["thinking"] = await self._exit_stack.enter_async_context(
-                    ClientSession(stdio_streams[0], stdio_streams[1])
-                )
-                await self.sessions["thinking"].initialize()
-                logger.info("✅ Connected to Sequential Thinking Server (npx)")
+                async with self._open_transport(slot.server_name) as streams:
+                    async with ClientSession(streams[0], streams[1],
+                                             message_handler=self._message_handler(slot.server_name)) as session:
+                        await session.initialize()
+                        slot.session = session
+                        slot.healthy = True
+                        slot.restart.clear()
+                        slot.ready.set()
+                        # Server bisa saja berubah setelah reconnect, katalog diambil ulang saat dipakai
+                        self._stale_catalogs.add(slot.server_name)
+                        logger.info(f"✅ MCP session {slot.name} connected")
+                        retry_delay = settings.mcp_retry_delay or 1.0
+
+                        await slot.restart.wait()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"❌ Failed to connect to Thinking Server: {e}")
+                logger.error(f"❌ MCP session {slot.name} failed: {e}")
+            finally:
+                slot.session = None
+                slot.healthy = False
+                slot.ready.clear()
+
+            if not slot.stopping:
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30.0)
+
+    async def _health_loop(self):
+        """Ping semua session secara berkala, session yang tidak menjawab dibuka ulang"""
+        while True:
+            await asyncio.sleep(settings.mcp_health_check_interval)
+            for slots in self.pools.values():
+                for slot in slots:
+                    if not slot.healthy or slot.session is None:
+                        continue
+                    try:
+                        await asyncio.wait_for(slot.session.send_ping(), timeout=settings.mcp_health_check_timeout)
+                    except Exception as e:
+                        logger.warning(f"MCP session {slot.name} failed health check, restarting: {e!r}")
+                        slot.healthy = False
+                        slot.restart.set()
+
+    def _pick_slot(self, server_name: str) -> Optional[PooledSession]:
+        """Session sehat dengan request berjalan paling sedikit, seri dibagi bergiliran"""
+        healthy = [slot for slot in self.pools.get(server_name, []) if slot.healthy and slot.session is not None]
+        if not healthy:
+            return None
+        least = min(slot.in_flight for slot in healthy)
+        candidates = [slot for slot in healthy if slot.in_flight == least]
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    async def connect(self) -> bool:
+        """
+        Membuat pool session ke semua server MCP dan menunggu sampai minimal satu session per server siap
+        """
+        try:
+            for server_name in self._server_names():
+                if server_name in self.pools:
+                    continue
+                slots = [PooledSession(server_name, index) for index in range(self._pool_size(server_name))]
+                self.pools[server_name] = slots
+                for slot in slots:
+                    slot.task = asyncio.create_task(self._run_slot(slot))
+
+            for server_name, slots in self.pools.items():
+                try:
+                    if not await self._wait_for_ready(slots):
+                        raise TimeoutError(f"no session ready after {settings.mcp_connect_timeout}s")
+                    await self.refresh_tools(server_name)
+                    ready = sum(slot.healthy for slot in slots)
+                    logger.info(f"✅ Connected to MCP server {server_name} ({ready}/{len(slots)} sessions ready)")
+                except Exception as e:
+                    logger.error(f"❌ Failed to connect to MCP server {server_name}: {e!r}")
+
+            if self._health_task is None and settings.mcp_health_check_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
 
             self.connected = len(self.sessions) > 0
             return self.connected
-            
+
         except Exception as e:
             logger.error(f"❌ Critical failure in MultiMCPClient connect: {e}")
             return False
 
     async def disconnect(self):
-        await self._exit_stack.aclose()
+        """
+        Tutup semua session. Slot diberi waktu MCP_DISCONNECT_TIMEOUT untuk menutup transport
+        di task-nya sendiri, slot yang belum selesai (misalnya server tidak menjawab) dibatalkan
+        agar shutdown tidak tertahan.
+        """
+        tasks = []
+        if self._health_task:
+            self._health_task.cancel()
+            tasks.append(self._health_task)
+            self._health_task = None
+
+        for slots in self.pools.values():
+            for slot in slots:
+                slot.stopping = True
+                slot.restart.set()
+                if slot.task:
+                    tasks.append(slot.task)
+
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=settings.mcp_disconnect_timeout)
+            if pending:
+                logger.warning(f"Cancelling {len(pending)} MCP session task(s) that did not stop "
+                               f"within {settings.mcp_disconnect_timeout}s")
+                for task in pending:
+                    task.cancel()
+                _, still_running = await asyncio.wait(pending, timeout=settings.mcp_disconnect_timeout)
+                if still_running:
+                    logger.error(f"{len(still_running)} MCP session task(s) ignored cancellation, leaving them behind")
+
         self.connected = False
-        self.sessions = {}
+        self.pools = {}
+        self.tool_catalog = {}
+        self._stale_catalogs = set()
         logger.info("Disconnected from all MCP servers")
 
     def is_available(self, server_name: str = "lms") -> bool:
-        return server_name in self.sessions
+        return self._pick_slot(server_name) is not None
+
+    def get_pool_status(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Status setiap session di pool, untuk monitoring"""
+        return {server_name: [slot.to_dict() for slot in slots] for server_name, slots in self.pools.items()}
+
+    async def _wait_for_session(self, server_name: str) -> bool:
+        """Tunggu sebentar sampai ada session sehat (misalnya saat semua sedang reconnect)"""
+        if server_name not in self.pools:
+            await self.connect()
+            return self.is_available(server_name)
+
+        await self._wait_for_ready(self.pools[server_name])
+        return self.is_available(server_name)
+
+    @staticmethod
+    async def _wait_for_ready(slots: List[PooledSession]) -> bool:
+        """Tunggu sampai salah satu slot siap atau mcp_connect_timeout habis"""
+        waiters = [asyncio.create_task(slot.ready.wait()) for slot in slots]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=settings.mcp_connect_timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            return bool(done)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
 
     async def acall(self, tool_name: str, parameters: Dict[str, Any] = None, server_name: str = "lms") -> Optional[Dict[str, Any]]:
         """
-        Memanggil tool dari server tertentu (default: lms)
+        Memanggil tool dari server tertentu (default: lms) lewat session yang paling sedikit dipakai
         """
         if not self.is_available(server_name):
-            logger.warning(f"Server {server_name} not available, reconnecting...")
-            if not await self.connect():
+            logger.warning(f"Server {server_name} not available, waiting for a session...")
+            if not await self._wait_for_session(server_name):
                 return None
 
+        slot = self._pick_slot(server_name)
+        if slot is None:
+            return None
+
+        slot.in_flight += 1
         try:
-            session = self.sessions[server_name]
-            result = await session.call_tool(tool_name, arguments=parameters or {})
+            result = await slot.session.call_tool(tool_name, arguments=parameters or {})
             return {"result": result.content}
         except Exception as e:
-            logger.error(f"Error calling tool {tool_name} on {server_name}: {e}")
+            logger.error(f"Error calling tool {tool_name} on {slot.name}: {e}")
+            # Error dari tool (McpError) bukan tanda session rusak, error transport membuat session dibuka ulang
+            if not isinstance(e, McpError):
+                slot.healthy = False
+                slot.restart.set()
             return {"error": str(e)}
+        finally:
+            slot.in_flight -= 1
 
 # --- Global Instance Management ---
 
@@ -1,9 +1,13 @@
 """
 MCP Server untuk layanan tools dalam sistem Multi Agent RAG menggunakan FastMCP
+Transport SSE (/sse) dan streamable HTTP (/mcp) dilayani oleh satu aplikasi Starlette.
+Agent spesialis dibuat sekali saat server start dan dipakai ulang oleh semua panggilan tool.
 """
 import logging
-from typing import List
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
 from mcp.server.fastmcp import FastMCP
+from starlette.applications import Starlette
 
 # Inisialisasi Logger
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +19,48 @@ mcp = FastMCP("Multi Agent RAG Server")
 app = mcp
 mcp_app = mcp
 
+# --- AGENT SPESIALIS (dibuat sekali per proses server) ---
+
+_agents: Dict[str, Any] = {}
+
+
+def get_local_agent():
+    """Local Specialist Agent milik server, dibuat saat pertama dipakai jika belum dibuat saat startup"""
+    if "local" not in _agents:
+        from app.llms.agents.chatbot.specialist_agents import create_local_specialist_agent
+        _agents["local"] = create_local_specialist_agent()
+    return _agents["local"]
+
+
+def get_search_agent():
+    """Search Specialist Agent milik server, dibuat saat pertama dipakai jika belum dibuat saat startup"""
+    if "search" not in _agents:
+        from app.llms.agents.chatbot.specialist_agents import create_search_specialist_agent
+        _agents["search"] = create_search_specialist_agent()
+    return _agents["search"]
+
+
+def init_mcp_agents():
+    """Buat agent spesialis (ChatOpenAI, OllamaEmbedding) sebelum panggilan tool pertama"""
+    for name, factory in (("local", get_local_agent), ("search", get_search_agent)):
+        try:
+            factory()
+        except Exception as e:
+            # Gagal di sini tidak menghentikan server, agent dicoba dibuat lagi saat tool dipanggil
+            logger.error(f"❌ Failed to create {name} specialist agent for MCP server: {e}")
+    logger.info(f"MCP server specialist agents ready: {sorted(_agents)}")
+
+
+async def close_mcp_agents():
+    """Tutup client HTTP milik agent saat server berhenti"""
+    from app.services.searxng_service import searxng_service
+
+    search_agent = _agents.get("search")
+    if search_agent is not None:
+        await search_agent.aclose()
+    await searxng_service.aclose()
+    _agents.clear()
+
 # --- REGISTRASI TOOLS ---
 
 @mcp.tool()
@@ -25,10 +71,8 @@ async def search_local_documents(query: str) -> str:
     Args:
         query: Query to search for in local documents
     """
-    from app.llms.agents.chatbot.specialist_agents import create_local_specialist_agent
-    
     logger.info(f"Searching local documents for: {query}")
-    agent = create_local_specialist_agent()
+    agent = get_local_agent()
     # FastMCP menangani await jika fungsi mengembalikan coroutine
     return await agent.search_local_documents(query)
 
@@ -40,10 +84,8 @@ async def search_internet(query: str) -> str:
     Args:
         query: Query to search for on the internet
     """
-    from app.llms.agents.chatbot.specialist_agents import create_search_specialist_agent
-    
     logger.info(f"Searching internet for: {query}")
-    agent = create_search_specialist_agent()
+    agent = get_search_agent()
     return await agent.search_internet(query)
 
 @mcp.tool()
@@ -69,6 +111,56 @@ def add(a: int, b: int) -> int:
 
 # --- RUNNER ---
 
+def create_mcp_http_app() -> Starlette:
+    """
+    Satu aplikasi ASGI untuk dua transport:
+    - SSE di /sse (+ /messages/) untuk client lama
+    - Streamable HTTP di /mcp, satu POST per request tanpa koneksi SSE terpisah
+    """
+    sse_app = mcp.sse_app()
+    streamable_app = mcp.streamable_http_app()
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        init_mcp_agents()
+        # Session manager streamable HTTP harus berjalan selama aplikasi hidup
+        async with mcp.session_manager.run():
+            try:
+                yield
+            finally:
+                try:
+                    await close_mcp_agents()
+                except Exception as e:
+                    logger.error(f"❌ Failed to close MCP server agents: {e}")
+
+    return Starlette(
+        debug=mcp.settings.debug,
+        routes=[*streamable_app.routes, *sse_app.routes],
+        lifespan=lifespan,
+    )
+
+
+def run_mcp_http_server():
+    """Runner untuk transport SSE + streamable HTTP di port yang sama"""
+    import uvicorn
+
+    print("🚀 Memulai FastMCP Server (SSE + streamable HTTP)...")
+    try:
+        mcp.settings.host = "0.0.0.0"  # Gunakan 0.0.0.0 agar bisa diakses dari network lain jika perlu
+        mcp.settings.port = 8071       # Sesuaikan dengan config client Anda
+
+        logger.info(f"🚀 Memulai FastMCP Server di http://{mcp.settings.host}:{mcp.settings.port} "
+                    f"(SSE: {mcp.settings.sse_path}, streamable HTTP: {mcp.settings.streamable_http_path})")
+        uvicorn.run(
+            create_mcp_http_app(),
+            host=mcp.settings.host,
+            port=mcp.settings.port,
+            log_level=mcp.settings.log_level.lower(),
+        )
+    except Exception as e:
+        print(f"❌ Gagal menjalankan MCP Server: {e}")
+
+
 def run_mcp_sse_server():
     """Runner resmi untuk transport SSE"""
     print("🚀 Memulai FastMCP SSE Server...")
@@ -83,4 +175,4 @@ def run_mcp_sse_server():
 
 if __name__ == "__main__":
     # Ini agar file tetap bisa dijalankan manual
-    run_mcp_sse_server()
\ No newline at end of file
+    run_mcp_http_server()
\ No newline at end of file
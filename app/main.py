@@ -21,7 +21,7 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """
     Mengelola lifecycle aplikasi:
-    1. Menjalankan Server MCP (FastMCP SSE + npx thinking)
+    1. Menjalankan Server MCP (FastMCP SSE + streamable HTTP, npx thinking jika SEQUENTIAL_THINKING_BACKEND=mcp)
     2. Menghubungkan Client ke server-server tersebut
     3. Cleanup saat aplikasi dimatikan
     """
@@ -35,12 +35,43 @@ async def lifespan(app: FastAPI):
         
         # Initialize MCP client ganda
         sync_initialize_mcp_client()
+
+        # Generasi lama yang penghapusannya tertunda (proses CLI/ingestion sebelumnya sudah berhenti)
+        from app.llms.agents.chatbot.ingestion_pipeline import sweep_retired_generations
+        app.state.generation_sweep = asyncio.create_task(asyncio.to_thread(sweep_retired_generations))
+
+        # Watch mode knowledge base (opsional)
+        if settings.kb_watch_enabled:
+            from app.llms.agents.chatbot.knowledge_base_watcher import KnowledgeBaseWatcher
+            kb_watcher = KnowledgeBaseWatcher()
+            # Initial sync berjalan di thread watcher, startup tidak menunggu sinkronisasi selesai
+            kb_watcher.start()
+            app.state.kb_watcher = kb_watcher
+
+        # Purge entri search_memory kedaluwarsa + compaction secara berkala
+        if settings.search_memory_maintenance_interval > 0:
+            from app.services.search_memory_maintenance import run_search_memory_maintenance
+            app.state.search_memory_maintenance = asyncio.create_task(run_search_memory_maintenance())
+
         logger.info("OriensSpace AI Components Ready.")
         
         yield
     finally:
         # Cleanup: Tutup koneksi agar tidak ada process npx yang menggantung
         logger.info("Shutting down OriensSpace AI...")
+        maintenance_task = getattr(app.state, "search_memory_maintenance", None)
+        if maintenance_task:
+            maintenance_task.cancel()
+
+        kb_watcher = getattr(app.state, "kb_watcher", None)
+        if kb_watcher:
+            kb_watcher.stop()
+
+        from app.services.searxng_service import searxng_service
+        from app.services.search_cache_service import search_cache_service
+        await searxng_service.aclose()
+        await search_cache_service.aclose()
+
         client = await get_mcp_client()
         if client:
             # Menggunakan loop asinkron untuk menutup client
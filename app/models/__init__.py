@@ -13,6 +13,10 @@ class DocumentMetadata(BaseModel):
     page_number: int
     chunk_index: int
     hash: str
+    section_path: List[str] = []
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
+    generation: int = 0  # Generasi ingestion, chunk lama tanpa field ini dianggap generasi 0
 
 
 class SearchMetadata(BaseModel):
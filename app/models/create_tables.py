@@ -3,12 +3,41 @@ Script untuk membuat tabel-tabel di database MySQL
 """
 from app.database.mysql_config import engine
 from app.models.database_schema import Base
+from sqlalchemy import inspect, text
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def add_missing_columns():
+    """
+    Tambahkan kolom baru dari model ke tabel yang sudah ada.
+    create_all hanya membuat tabel baru, tidak mengubah tabel lama.
+    """
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                connection.execute(text(ddl))
+                logger.info(f"➕ Kolom {table.name}.{column.name} ditambahkan")
+
+
 def create_tables():
     """Fungsi untuk membuat tabel-tabel di database"""
     logger.info("Membuat tabel-tabel di database MySQL...")
@@ -16,10 +45,10 @@ def create_tables():
     try:
         # Buat semua tabel berdasarkan model
         Base.metadata.create_all(bind=engine)
+        add_missing_columns()
         logger.info("✅ Tabel-tabel berhasil dibuat")
         
         # Verifikasi tabel telah dibuat
-        from sqlalchemy import inspect
         inspector = inspect(engine)
         tables = inspector.get_table_names()
         logger.info(f"📊 Tabel-tabel yang ada di database: {tables}")
@@ -38,6 +67,13 @@ def create_tables():
             for col in columns:
                 logger.info(f"   - {col['name']}: {col['type']} (nullable: {col['nullable']})")
         
+        # Verifikasi struktur tabel ingestion_checkpoints
+        if 'ingestion_checkpoints' in tables:
+            columns = inspector.get_columns('ingestion_checkpoints')
+            logger.info("📋 Struktur tabel 'ingestion_checkpoints':")
+            for col in columns:
+                logger.info(f"   - {col['name']}: {col['type']} (nullable: {col['nullable']})")
+
         # Verifikasi struktur tabel search_history
         if 'search_history' in tables:
             columns = inspector.get_columns('search_history')
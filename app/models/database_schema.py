@@ -1,7 +1,7 @@
 """
 Skema database untuk Multi Agent RAG
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, LargeBinary
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, ForeignKey, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import uuid
@@ -28,11 +28,31 @@ class Document(Base):
     pages = Column(Integer)
     file_path = Column(String(255))
     content_hash = Column(String(64))  # SHA-256 hash
+    file_size = Column(BigInteger)  # Ukuran file saat terakhir di-ingest
+    file_mtime_ns = Column(BigInteger)  # mtime file (nanodetik) saat terakhir di-ingest
+    active_generation = Column(Integer, nullable=False, default=0, server_default='0')  # Generasi chunk yang dilayani pencarian
+    retire_due_at = Column(DateTime)  # Generasi di bawah active_generation dihapus mulai waktu ini (NULL = tidak ada)
     last_synced = Column(DateTime)
     deleted_at = Column(DateTime)
     created_at = Column(DateTime, default=func.now())
 
 
+class IngestionCheckpoint(Base):
+    __tablename__ = 'ingestion_checkpoints'
+
+    id = Column(String(36), primary_key=True, index=True)  # material_id dokumen
+    file_path = Column(String(255))
+    file_size = Column(BigInteger)  # Ukuran file saat ingestion dimulai
+    file_mtime_ns = Column(BigInteger)  # mtime file (nanodetik) saat ingestion dimulai
+    content_hash = Column(String(64))  # Diisi setelah seluruh file selesai dibaca
+    status = Column(String(20), nullable=False, default='in_progress')  # in_progress / completed
+    generation = Column(Integer, nullable=False, default=0, server_default='0')  # Generasi chunk yang sedang ditulis
+    batches_committed = Column(Integer, default=0)
+    chunks_committed = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=func.now())
+
+
 class SearchHistory(Base):
     __tablename__ = 'search_history'
 
@@ -0,0 +1,91 @@
+"""
+Circuit breaker sederhana untuk layanan eksternal
+closed -> open setelah failure_threshold kegagalan berturut-turut, open -> half_open
+setelah reset_timeout detik (satu request percobaan), lalu closed jika berhasil.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe, dipakai dari jalur sync maupun async"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._last_error: Optional[str] = None
+        self._total_failures = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True jika request boleh dikirim ke upstream"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            # Hanya satu request percobaan selama half-open, kecuali percobaan sebelumnya tidak pernah selesai
+            if state == HALF_OPEN and (not self._probe_in_flight
+                                       or time.monotonic() - self._probe_started_at >= self.reset_timeout):
+                self._probe_in_flight = True
+                self._probe_started_at = time.monotonic()
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            if error is not None:
+                self._last_error = f"{type(error).__name__}: {error}"
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status breaker untuk endpoint health"""
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == OPEN:
+                retry_in = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "total_failures": self._total_failures,
+                "rejected_requests": self._rejected,
+                "retry_in_seconds": retry_in,
+                "last_error": self._last_error,
+            }
@@ -0,0 +1,234 @@
+"""
+Modul penyimpanan embedding persisten untuk aplikasi OriensSpace AI
+Embedding disimpan berdasarkan (model embedding, hash teks chunk) agar teks yang
+sama tidak perlu di-embed ulang, termasuk setelah koleksi Milvus dihapus.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows tidak punya fcntl
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Ukuran digest SHA-256 per key
+KEY_SIZE = 32
+
+KEYS_FILE = "keys.bin"
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+
+def text_key(text: str) -> bytes:
+    """Key penyimpanan untuk sebuah teks chunk"""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """
+    Penyimpanan embedding append-only untuk satu model embedding:
+    - keys.bin berisi digest SHA-256 teks (32 byte per baris)
+    - vectors.f32 berisi vektor float32 mentah dengan urutan yang sama,
+      dibaca lewat numpy memmap sehingga tidak dimuat seluruhnya ke memori
+    - Vektor ditulis lebih dulu dari key-nya; sisa penulisan yang terputus (baris
+      setengah jadi atau vektor tanpa key) dipotong saat store dibuka dan sebelum append
+    """
+
+    def __init__(self, model_name: str, base_dir: str = None):
+        self.model_name = model_name
+        safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        self.directory = os.path.join(base_dir or settings.embedding_cache_dir, safe_name)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.keys_path = os.path.join(self.directory, KEYS_FILE)
+        self.vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        self.meta_path = os.path.join(self.directory, META_FILE)
+        self.lock_path = os.path.join(self.directory, LOCK_FILE)
+
+        self.dim: Optional[int] = None
+        self._index: Dict[bytes, int] = {}
+        self._keys_read = 0
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+            with self._file_lock():
+                self._repair_files()
+            self._load_new_keys()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load_new_keys(self):
+        """Baca key yang ditambahkan sejak pembacaan terakhir (juga dari proses lain)"""
+        if not os.path.exists(self.keys_path):
+            return
+
+        keys_size = os.path.getsize(self.keys_path)
+        if keys_size // KEY_SIZE <= self._keys_read:
+            return
+
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_read * KEY_SIZE)
+            data = f.read((keys_size // KEY_SIZE - self._keys_read) * KEY_SIZE)
+
+        for offset in range(0, len(data), KEY_SIZE):
+            self._index.setdefault(data[offset:offset + KEY_SIZE], self._keys_read)
+            self._keys_read += 1
+
+        # Memmap dibuka ulang agar mencakup baris yang baru ditambahkan
+        self._vectors = None
+
+    def _vector_rows(self) -> np.memmap:
+        """Memmap read-only dari baris vektor yang sudah punya key"""
+        if self._vectors is None:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                      shape=(self._keys_read, self.dim))
+        return self._vectors
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Ambil embedding untuk setiap teks, None jika belum tersimpan"""
+        with self._lock:
+            if self.dim is None and os.path.exists(self.meta_path):
+                with open(self.meta_path) as f:
+                    self.dim = json.load(f)["dim"]
+            if self.dim is None:
+                self.misses += len(texts)
+                return [None] * len(texts)
+
+            self._load_new_keys()
+            rows = [self._index.get(text_key(text)) for text in texts]
+            found = [row for row in rows if row is not None]
+            vectors = self._vector_rows() if found else None
+
+            results = []
+            for row in rows:
+                if row is None:
+                    results.append(None)
+                    self.misses += 1
+                else:
+                    results.append(vectors[row].tolist())
+                    self.hits += 1
+            return results
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Simpan embedding baru, teks yang sudah ada dilewati"""
+        if not texts:
+            return
+
+        with self._lock:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+                with open(self.meta_path, "w") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+            elif matrix.shape[1] != self.dim:
+                logger.warning(
+                    f"Embedding dimension {matrix.shape[1]} does not match store dimension {self.dim}, skipping cache write"
+                )
+                return
+
+            with self._file_lock():
+                # Sinkronkan dengan penulisan proses lain sebelum menambah baris
+                self._repair_files()
+                self._load_new_keys()
+
+                new_keys, new_rows, seen = [], [], set()
+                for text, vector in zip(texts, matrix):
+                    key = text_key(text)
+                    if key in self._index or key in seen:
+                        continue
+                    seen.add(key)
+                    new_keys.append(key)
+                    new_rows.append(vector)
+
+                if not new_keys:
+                    return
+
+                with open(self.vectors_path, "ab") as f:
+                    f.write(np.vstack(new_rows).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(self.keys_path, "ab") as f:
+                    f.write(b"".join(new_keys))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                for key in new_keys:
+                    self._index[key] = self._keys_read
+                    self._keys_read += 1
+                self._vectors = None
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock antar proses untuk penulisan keys.bin dan vectors.f32"""
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _repair_files(self):
+        """
+        Potong keys.bin dan vectors.f32 ke jumlah baris lengkap yang sama-sama ada di
+        kedua file. Tanpa ini, key setengah jadi dari append yang terputus membuat semua
+        key berikutnya bergeser dari batas 32 byte. Dipanggil dengan _file_lock dipegang.
+        """
+        row_size = self.dim * np.dtype(np.float32).itemsize
+        keys_size = os.path.getsize(self.keys_path) if os.path.exists(self.keys_path) else 0
+        vectors_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        rows = min(keys_size // KEY_SIZE, vectors_size // row_size)
+
+        for path, size, expected_size in ((self.keys_path, keys_size, rows * KEY_SIZE),
+                                          (self.vectors_path, vectors_size, rows * row_size)):
+            if size > expected_size:
+                logger.warning(f"Truncating {path} from {size} to {expected_size} bytes after an interrupted write")
+                with open(path, "r+b") as f:
+                    f.truncate(expected_size)
+
+        if rows < self._keys_read:
+            # Key yang sudah terbaca ikut terpotong, index dibangun ulang dari file
+            self._index = {}
+            self._keys_read = 0
+            self._vectors = None
+
+
+_stores: Dict[str, EmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(model_name: str = None) -> Optional[EmbeddingStore]:
+    """Ambil EmbeddingStore untuk model embedding, None jika cache dimatikan"""
+    if not settings.embedding_cache_enabled:
+        return None
+
+    model_name = model_name or settings.embedding_model_name
+    with _stores_lock:
+        if model_name not in _stores:
+            try:
+                _stores[model_name] = EmbeddingStore(model_name)
+            except Exception as e:
+                logger.error(f"Failed to open embedding store for {model_name}: {e}")
+                return None
+        return _stores[model_name]
@@ -0,0 +1,99 @@
+"""
+Index vektor sementara di memori untuk satu request
+Teks halaman web dipotong menjadi passage, di-embed sekali, lalu dicari dengan
+cosine similarity numpy. Index dibuang setelah request selesai.
+"""
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EmbedTexts = Callable[[List[str]], Sequence[Sequence[float]]]
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\n")
+
+
+def split_passages(text: str, chunk_size: int = 800, chunk_overlap: int = 100) -> List[str]:
+    """Gabungkan paragraf sampai sekitar chunk_size karakter, paragraf panjang dipotong dengan overlap"""
+    passages: List[str] = []
+    current = ""
+    step = max(chunk_size - chunk_overlap, 1)
+
+    for paragraph in _PARAGRAPH_BREAK.split(text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        if len(paragraph) > chunk_size:
+            if current:
+                passages.append(current)
+                current = ""
+            passages.extend(paragraph[i:i + chunk_size] for i in range(0, len(paragraph), step)
+                            if paragraph[i:i + chunk_size].strip())
+            continue
+
+        if current and len(current) + 1 + len(paragraph) > chunk_size:
+            passages.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n{paragraph}" if current else paragraph
+
+    if current:
+        passages.append(current)
+    return passages
+
+
+class EphemeralRetriever:
+    """Kumpulkan passage dari beberapa dokumen lalu ambil yang paling relevan untuk query"""
+
+    def __init__(self, embed_texts: EmbedTexts, chunk_size: int = 800, chunk_overlap: int = 100,
+                 max_passages: int = 400):
+        self.embed_texts = embed_texts
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_passages = max_passages
+        self.passages: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add_document(self, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Potong dokumen menjadi passage, embedding dihitung saat retrieve pertama"""
+        for passage in split_passages(text, self.chunk_size, self.chunk_overlap):
+            if len(self.passages) >= self.max_passages:
+                logger.debug("Ephemeral index is full, ignoring remaining passages")
+                return
+            self.passages.append(passage)
+            self.metadata.append(dict(metadata or {}))
+        self._matrix = None
+
+    def _ensure_index(self):
+        if self._matrix is not None or not self.passages:
+            return
+        vectors = np.asarray(self.embed_texts(self.passages), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._matrix = vectors / np.where(norms == 0, 1.0, norms)
+
+    def retrieve(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Kembalikan top_k passage dengan skor cosine similarity tertinggi"""
+        if not self.passages or top_k <= 0:
+            return []
+
+        self._ensure_index()
+        query_vector = np.asarray(self.embed_texts([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return []
+
+        scores = self._matrix @ (query_vector / norm)
+        top_k = min(top_k, len(self.passages))
+        # argpartition lalu urutkan hanya top_k teratas
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        return [
+            {"text": self.passages[i], "score": float(scores[i]), "metadata": self.metadata[i]}
+            for i in best
+        ]
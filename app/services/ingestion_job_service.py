@@ -0,0 +1,174 @@
+"""
+Modul layanan job ingestion untuk aplikasi OriensSpace AI
+Menjalankan ingest_directory di background thread agar request API tidak tertahan
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from app.core.config import settings
+from app.core.exceptions import (
+    IngestionCancelledException,
+    IngestionJobConflictException,
+    IngestionJobLimitException,
+)
+from app.database.mysql_config import SessionLocal
+from app.llms.agents.chatbot.ingestion_pipeline import IngestionProgress, ingest_directory
+
+logger = logging.getLogger(__name__)
+
+# Status job ingestion
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+def directories_overlap(first: str, second: str) -> bool:
+    """True jika kedua direktori sama atau salah satunya berada di dalam yang lain"""
+    first = os.path.realpath(first)
+    second = os.path.realpath(second)
+    return os.path.commonpath([first, second]) in (first, second)
+
+
+@dataclass
+class IngestionJob:
+    job_id: str
+    directory_path: str
+    status: str = JOB_QUEUED
+    progress: IngestionProgress = field(default_factory=IngestionProgress)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Ringkasan status job untuk dikirim lewat API"""
+        progress = self.progress
+        elapsed = 0.0
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "job_id": self.job_id,
+            "directory_path": self.directory_path,
+            "status": self.status,
+            "cancel_requested": self.cancel_requested,
+            "files_total": progress.files_total,
+            "files_processed": progress.files_processed,
+            "files_failed": progress.files_failed,
+            "chunks_processed": progress.chunks_processed,
+            "current_file": progress.current_file,
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(progress.files_processed / elapsed, 3) if elapsed > 0 else 0.0,
+            "chunks_per_second": round(progress.chunks_processed / elapsed, 3) if elapsed > 0 else 0.0,
+            "errors": list(progress.errors),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionJobService:
+    """
+    Mengelola job ingestion di background:
+    - Setiap job mendapat ID dan menjalankan ingest_directory dengan session DB sendiri
+    - Jumlah job aktif dibatasi oleh INGEST_MAX_CONCURRENT_JOBS
+    - Direktori yang beririsan dengan job aktif lain ditolak, dokumen yang sama
+      tidak di-ingest dua job sekaligus
+    - Job bisa dibatalkan, pipeline berhenti di antara file atau batch
+    """
+
+    def __init__(self, max_concurrent_jobs: int = None, history_size: int = None):
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs or settings.ingest_max_concurrent_jobs)
+        self.history_size = history_size or settings.ingest_job_history_size
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_jobs,
+            thread_name_prefix="ingestion-job"
+        )
+
+    def submit(self, directory_path: str) -> IngestionJob:
+        """Daftarkan job baru dan jalankan di background"""
+        with self._lock:
+            active_jobs = [job for job in self.jobs.values() if job.status in ACTIVE_STATUSES]
+            for job in active_jobs:
+                if directories_overlap(job.directory_path, directory_path):
+                    raise IngestionJobConflictException(
+                        f"Ingestion job {job.job_id} is already running for {job.directory_path}"
+                    )
+            if len(active_jobs) >= self.max_concurrent_jobs:
+                raise IngestionJobLimitException(
+                    f"Maximum of {self.max_concurrent_jobs} concurrent ingestion jobs reached"
+                )
+
+            job = IngestionJob(job_id=str(uuid4()), directory_path=directory_path)
+            self.jobs[job.job_id] = job
+            self._prune_history()
+
+        self._executor.submit(self._run_job, job)
+        logger.info(f"Ingestion job {job.job_id} queued for {directory_path}")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Ambil job berdasarkan ID"""
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        """Daftar job, terbaru di akhir"""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Minta pembatalan job yang masih aktif"""
+        job = self.jobs.get(job_id)
+        if job and job.status in ACTIVE_STATUSES:
+            job.cancel_requested = True
+            job.progress.cancel()
+            logger.info(f"Cancellation requested for ingestion job {job_id}")
+        return job
+
+    def _run_job(self, job: IngestionJob):
+        """Eksekusi ingest_directory untuk satu job"""
+        if job.progress.cancelled:
+            job.status = JOB_CANCELLED
+            job.finished_at = time.time()
+            return
+
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        db = SessionLocal()
+
+        try:
+            success = ingest_directory(job.directory_path, db, progress=job.progress)
+            job.status = JOB_COMPLETED if success else JOB_FAILED
+        except IngestionCancelledException:
+            job.status = JOB_CANCELLED
+        except Exception as e:
+            logger.error(f"Ingestion job {job.job_id} failed: {e}")
+            job.progress.add_error(str(e))
+            job.status = JOB_FAILED
+        finally:
+            db.close()
+            job.finished_at = time.time()
+            logger.info(f"Ingestion job {job.job_id} finished with status {job.status}")
+
+    def _prune_history(self):
+        """Buang job lama yang sudah selesai agar riwayat tidak tumbuh tanpa batas"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status not in ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(self.jobs) - self.history_size)]:
+            del self.jobs[job_id]
+
+
+# Buat instance global
+ingestion_job_service = IngestionJobService()
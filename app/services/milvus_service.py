@@ -2,9 +2,13 @@
 Modul layanan Milvus untuk aplikasi OriensSpace AI
 """
 import logging
+import threading
+import time
 from typing import List, Dict, Any, Optional
 from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType, utility
 from app.core.config import settings
+from app.database.mysql_config import SessionLocal
+from app.models.database_schema import Document
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -31,6 +35,10 @@ class MilvusService:
         self.collection_name = self.config.collection_name
         self.client = None
         self.collection = None
+        # Cache material_id -> active_generation dari MySQL untuk menyaring hasil pencarian
+        self._active_generations: Dict[str, int] = {}
+        self._active_generations_loaded_at = 0.0
+        self._generation_lock = threading.Lock()
         self._connect()
         self._create_collection_if_not_exists()
         self._test_connection()
@@ -118,6 +126,41 @@ class MilvusService:
             logger.error(f"✗ Error saat menyisipkan dokumen: {e}")
             raise
 
+    def get_active_generations(self) -> Dict[str, int]:
+        """Ambil generasi aktif per dokumen, di-cache selama MILVUS_GENERATION_CACHE_TTL detik"""
+        with self._generation_lock:
+            if time.monotonic() - self._active_generations_loaded_at < settings.milvus_generation_cache_ttl:
+                return self._active_generations
+
+            db = SessionLocal()
+            try:
+                rows = db.query(Document.id, Document.active_generation).all()
+                self._active_generations = {doc_id: generation or 0 for doc_id, generation in rows}
+                self._active_generations_loaded_at = time.monotonic()
+            except Exception as e:
+                # Jika MySQL tidak tersedia, tetap pakai cache terakhir
+                logger.error(f"✗ Gagal memuat generasi aktif dokumen: {e}")
+            finally:
+                db.close()
+            return self._active_generations
+
+    def filter_active_generation(self, results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Buang chunk yang bukan generasi aktif dokumennya: generasi baru yang masih
+        ditulis dan generasi lama yang menunggu dihapus. Chunk tanpa material_id
+        atau dari dokumen yang belum tercatat hanya lolos jika generasinya 0.
+        """
+        active_generations = self.get_active_generations()
+        filtered = []
+        for result in results:
+            metadata = result.get("metadata") or {}
+            generation = int(metadata.get("generation", 0) or 0)
+            if generation == active_generations.get(metadata.get("material_id"), 0):
+                filtered.append(result)
+                if len(filtered) >= top_k:
+                    break
+        return filtered
+
     def search_similar(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Mencari dokumen yang mirip berdasarkan embedding
@@ -129,12 +172,12 @@ class MilvusService:
                 "params": {"nprobe": 10}
             }
 
-            # Lakukan pencarian
+            # Lakukan pencarian, ambil lebih banyak karena sebagian bisa tersaring generasinya
             results = self.collection.search(
                 data=[query_embedding],
                 anns_field="vector",
                 param=search_params,
-                limit=top_k,
+                limit=top_k * settings.milvus_search_overfetch,
                 output_fields=["text", "metadata"]  # Pastikan field ini sesuai dengan skema koleksi
             )
 
@@ -149,6 +192,8 @@ class MilvusService:
                 }
                 formatted_results.append(formatted_result)
 
+            formatted_results = self.filter_active_generation(formatted_results, top_k)
+
             logger.info(f"✓ Ditemukan {len(formatted_results)} dokumen mirip")
             return formatted_results
 
@@ -163,7 +208,8 @@ class MilvusService:
             collection = Collection(collection_name)
 
             # Determine the text field name based on collection
-            text_field = "text" if collection_name == "compliance_docs" else "summary_text"
+            is_document_collection = collection_name == self.collection_name
+            text_field = "text" if is_document_collection else "summary_text"
 
             # Prepare search parameters
             search_params = {
@@ -176,7 +222,7 @@ class MilvusService:
                 data=[query_vector],
                 anns_field="vector",  # Assuming the vector field is named 'vector'
                 param=search_params,
-                limit=top_k,
+                limit=top_k * settings.milvus_search_overfetch if is_document_collection else top_k,
                 output_fields=[text_field, "metadata"]  # Return text and metadata
             )
 
@@ -191,6 +237,9 @@ class MilvusService:
                 }
                 formatted_results.append(formatted_result)
 
+            if is_document_collection:
+                formatted_results = self.filter_active_generation(formatted_results, top_k)
+
             logger.info(f"✓ Ditemukan {len(formatted_results)} dokumen mirip di koleksi {collection_name}")
             return formatted_results
         except Exception as e:
@@ -0,0 +1,173 @@
+"""
+Cache hasil mentah SearXNG di Redis dengan pola stale-while-revalidate
+Entri segar dikembalikan langsung, entri basi tetap dikembalikan sambil
+di-refresh di background (satu refresh per key lewat lock Redis).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SearchFetcher = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalisasi query agar variasi huruf besar/spasi memakai entri cache yang sama"""
+    query = unicodedata.normalize("NFKC", query or "")
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class SearchCacheService:
+    """Cache Redis untuk hasil SearXNG, dengan metrik hit/miss per process"""
+
+    def __init__(self):
+        self.enabled = settings.search_cache_enabled
+        self.fresh_ttl = settings.search_cache_ttl
+        self.stale_ttl = settings.search_cache_stale_ttl
+        self.lock_seconds = settings.search_cache_refresh_lock_seconds
+        self.prefix = settings.search_cache_prefix
+        # Client redis.asyncio terikat ke event loop, jadi dibuat satu per loop
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Referensi task refresh agar tidak di-garbage collect sebelum selesai
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "errors": 0,
+        }
+
+    def _get_client(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = aioredis.Redis(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                password=settings.redis_password,
+                decode_responses=True,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Tutup client Redis milik event loop yang sedang berjalan"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def _count(self, name: str):
+        with self._metrics_lock:
+            self._metrics[name] += 1
+
+    def cache_key(self, query: str, language: str, max_results: int) -> str:
+        """Key cache dari query ternormalisasi, bahasa dan jumlah hasil"""
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{language}:{max_results}:{digest}"
+
+    async def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._get_client().get(key)
+        return json.loads(raw) if raw else None
+
+    async def _write(self, key: str, results: List[Dict[str, Any]]):
+        payload = json.dumps({"fetched_at": time.time(), "results": results})
+        # Entri tetap ada selama masa segar + masa basi, setelah itu dihapus Redis
+        await self._get_client().set(key, payload, ex=self.fresh_ttl + self.stale_ttl)
+
+    async def _fetch_and_store(self, key: str, fetcher: SearchFetcher) -> List[Dict[str, Any]]:
+        results = await fetcher()
+        # Hasil kosong bisa berarti rate limiting upstream, jangan di-cache
+        if results:
+            try:
+                await self._write(key, results)
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Failed to write search cache entry {key}: {e}")
+        return results
+
+    async def _refresh(self, key: str, fetcher: SearchFetcher):
+        lock_key = f"{key}:refresh"
+        try:
+            # Hanya satu worker/process yang me-refresh key yang sama
+            if not await self._get_client().set(lock_key, "1", nx=True, ex=self.lock_seconds):
+                return
+            self._count("refreshes")
+            try:
+                if not await self._fetch_and_store(key, fetcher):
+                    self._count("refresh_failures")
+            finally:
+                await self._get_client().delete(lock_key)
+        except Exception as e:
+            self._count("refresh_failures")
+            logger.warning(f"Background refresh of search cache entry {key} failed: {e}")
+
+    def _schedule_refresh(self, key: str, fetcher: SearchFetcher):
+        task = asyncio.create_task(self._refresh(key, fetcher))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def get_or_fetch(self, query: str, language: str, max_results: int,
+                           fetcher: SearchFetcher) -> List[Dict[str, Any]]:
+        """
+        Ambil hasil pencarian dari cache, atau panggil fetcher jika belum ada.
+        Kegagalan Redis tidak pernah menggagalkan pencarian, fetcher langsung dipanggil.
+        """
+        if not self.enabled:
+            return await fetcher()
+
+        key = self.cache_key(query, language, max_results)
+        try:
+            entry = await self._read(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Search cache unavailable, querying SearXNG directly: {e}")
+            return await fetcher()
+
+        if entry is None:
+            self._count("misses")
+            return await self._fetch_and_store(key, fetcher)
+
+        age = time.time() - entry.get("fetched_at", 0)
+        if age > self.fresh_ttl:
+            self._count("stale_hits")
+            self._schedule_refresh(key, fetcher)
+        else:
+            self._count("hits")
+        return entry.get("results", [])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Metrik cache sejak process dimulai"""
+        with self._metrics_lock:
+            stats = dict(self._metrics)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["fresh_ttl"] = self.fresh_ttl
+        stats["stale_ttl"] = self.stale_ttl
+        return stats
+
+
+# Buat instance global
+search_cache_service = SearchCacheService()
@@ -0,0 +1,158 @@
+"""
+Masa berlaku entri search_memory dan pemeliharaan koleksinya
+Setiap entri menyimpan created_at/expires_at di metadata. Query yang sensitif waktu
+(berita, harga, "terbaru") mendapat TTL lebih pendek. Job background menghapus
+entri kedaluwarsa dan memicu compaction Milvus.
+"""
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Kata yang menandakan jawaban cepat basi
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(terbaru|terkini|hari ini|kemarin|minggu ini|bulan ini|tahun ini|sekarang|saat ini|berita|"
+    r"harga|kurs|cuaca|jadwal|update|latest|today|news|price|current|20\d\d)\b",
+    re.IGNORECASE,
+)
+
+PURGE_DELETE_BATCH_SIZE = 1000
+PURGE_QUERY_BATCH_SIZE = 1000
+
+
+def search_memory_ttl(text: str) -> int:
+    """TTL entri dalam detik berdasarkan apakah query/ringkasan sensitif waktu"""
+    if text and TIME_SENSITIVE_PATTERN.search(text):
+        return settings.search_memory_time_sensitive_ttl
+    return settings.search_memory_ttl
+
+
+def build_expiry_metadata(text: str, now: Optional[float] = None) -> Dict[str, Any]:
+    """Field masa berlaku untuk metadata entri baru"""
+    now = time.time() if now is None else now
+    ttl = search_memory_ttl(text)
+    return {"created_at": now, "expires_at": now + ttl, "ttl": ttl}
+
+
+def entry_times(metadata: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """
+    (created_at, expires_at) sebuah entri. Entri lama tanpa expires_at dihitung dari
+    field timestamp dengan TTL default, None jika waktunya tidak bisa ditentukan.
+    """
+    metadata = metadata or {}
+    if "expires_at" in metadata:
+        expires_at = float(metadata["expires_at"])
+        created_at = float(metadata.get("created_at", expires_at - settings.search_memory_ttl))
+        return created_at, expires_at
+
+    try:
+        created_at = datetime.fromisoformat(metadata["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+    return created_at, created_at + settings.search_memory_ttl
+
+
+def is_expired(metadata: Optional[Dict[str, Any]], now: Optional[float] = None) -> bool:
+    times = entry_times(metadata)
+    return times is None or times[1] <= (time.time() if now is None else now)
+
+
+def is_near_duplicate(similarity: float, metadata: Optional[Dict[str, Any]], now: Optional[float] = None) -> bool:
+    """
+    Hit search_memory dianggap duplikat jika masih berlaku dan similarity-nya minimal
+    SEARCH_MEMORY_DEDUP_SIMILARITY (metric COSINE: nilai lebih tinggi = lebih mirip)
+    """
+    return similarity >= settings.search_memory_dedup_similarity and not is_expired(metadata, now)
+
+
+def is_reusable_search_memory(result: Dict[str, Any]) -> bool:
+    """
+    Hasil rank_search_memory cukup mirip untuk dipakai ulang tanpa mencari ke internet
+    jika similarity (setelah decay) minimal SEARCH_MEMORY_REUSE_SIMILARITY
+    """
+    return result.get("similarity", float("-inf")) >= settings.search_memory_reuse_similarity
+
+
+def decayed_similarity(similarity: float, metadata: Optional[Dict[str, Any]], now: Optional[float] = None) -> float:
+    """
+    Similarity yang dikurangi penalti sesuai umur entri relatif terhadap TTL-nya
+    (metric COSINE: field distance Milvus berisi similarity, nilai lebih tinggi = lebih mirip)
+    """
+    times = entry_times(metadata)
+    if times is None:
+        return float("-inf")
+    now = time.time() if now is None else now
+    created_at, expires_at = times
+    lifetime = max(expires_at - created_at, 1.0)
+    age_fraction = min(max((now - created_at) / lifetime, 0.0), 1.0)
+    return similarity - settings.search_memory_decay_weight * age_fraction
+
+
+def rank_search_memory(results: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Buang entri kedaluwarsa lalu urutkan dari similarity (setelah decay) tertinggi.
+    Field distance dari Milvus tidak diubah, skor setelah decay disimpan di similarity.
+    """
+    now = time.time() if now is None else now
+    ranked = []
+    for result in results:
+        metadata = result.get("metadata")
+        if is_expired(metadata, now):
+            continue
+        ranked.append(dict(result, similarity=decayed_similarity(result.get("distance", float("-inf")), metadata, now)))
+    ranked.sort(key=lambda result: result["similarity"], reverse=True)
+    return ranked
+
+
+def purge_expired_search_memory(collection=None, compact: bool = True) -> int:
+    """Hapus entri search_memory yang kedaluwarsa, kembalikan jumlah entri yang dihapus"""
+    if collection is None:
+        from app.database.milvus_config import search_memory_collection
+        collection = search_memory_collection
+
+    now = time.time()
+    expired_ids = []
+    # Iterator agar koleksi besar tidak terkena batas jumlah hasil query Milvus
+    iterator = collection.query_iterator(
+        batch_size=PURGE_QUERY_BATCH_SIZE,
+        expr="id >= 0",
+        output_fields=["id", "metadata"],
+    )
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            expired_ids.extend(row["id"] for row in batch if is_expired(row.get("metadata"), now))
+    finally:
+        iterator.close()
+
+    for start in range(0, len(expired_ids), PURGE_DELETE_BATCH_SIZE):
+        collection.delete(expr=f"id in {expired_ids[start:start + PURGE_DELETE_BATCH_SIZE]}")
+
+    if expired_ids:
+        collection.flush()
+        logger.info(f"Purged {len(expired_ids)} expired entries from search_memory")
+        if compact:
+            # Compaction membuang baris yang sudah dihapus dari segmen agar pencarian tetap cepat
+            collection.compact()
+    return len(expired_ids)
+
+
+async def run_search_memory_maintenance(interval: Optional[float] = None):
+    """Loop background: purge + compact search_memory setiap interval detik"""
+    interval = interval or settings.search_memory_maintenance_interval
+    while True:
+        try:
+            await asyncio.to_thread(purge_expired_search_memory)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"search_memory maintenance failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,136 @@
+"""
+Post-processing hasil pencarian web sebelum dikirim ke aggregator
+1. Kanonisasi URL sehingga halaman yang sama lewat URL berbeda/mirror digabung
+2. Buang snippet yang hampir sama (Jaccard similarity shingle kata)
+3. Urutkan ulang dengan cosine similarity embedding query vs snippet (numpy)
+"""
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EmbedTexts = Callable[[List[str]], Sequence[Sequence[float]]]
+
+# Parameter query yang hanya untuk tracking dan tidak mengubah isi halaman
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src",
+                   "igshid", "_ga", "_gl", "spm", "share", "amp"}
+TRACKING_PREFIXES = ("utm_",)
+# Prefix host untuk versi mobile/AMP dari halaman yang sama
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+_WORD = re.compile(r"\w+")
+
+
+def canonicalize_url(url: str) -> str:
+    """Bentuk kanonik URL untuk deteksi duplikat (bukan untuk ditampilkan)"""
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    for prefix in MIRROR_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/+", "/", parts.path or "/")
+    # Versi AMP biasanya berakhiran /amp atau /amp/
+    path = re.sub(r"/amp/?$", "/", path)
+    if path != "/":
+        path = path.rstrip("/")
+    path = re.sub(r"/index\.(html?|php)$", "", path) or "/"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    # http dan https dianggap halaman yang sama, fragment diabaikan
+    canonical = f"{host}{path}"
+    return f"{canonical}?{urlencode(query)}" if query else canonical
+
+
+def shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    """Himpunan shingle kata berukuran size dari teks"""
+    words = _WORD.findall((text or "").lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(first: Set, second: Set) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def _snippet_text(result: Dict[str, Any]) -> str:
+    return f"{result.get('title', '')}\n{result.get('content', '')}".strip()
+
+
+def deduplicate_results(results: List[Dict[str, Any]], near_duplicate_threshold: float = 0.7) -> List[Dict[str, Any]]:
+    """
+    Buang hasil dengan URL kanonik yang sama atau snippet yang hampir sama.
+    Hasil pertama (peringkat SearXNG lebih tinggi) yang dipertahankan.
+    """
+    kept: List[Dict[str, Any]] = []
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    seen_urls: Set[str] = set()
+
+    for result in results:
+        canonical = canonicalize_url(result.get("url", ""))
+        if canonical and canonical in seen_urls:
+            continue
+
+        result_shingles = shingles(_snippet_text(result))
+        if any(jaccard(result_shingles, other) >= near_duplicate_threshold for other in kept_shingles):
+            continue
+
+        if canonical:
+            seen_urls.add(canonical)
+        kept.append(result)
+        kept_shingles.append(result_shingles)
+
+    return kept
+
+
+def rerank_by_embedding(query: str, results: List[Dict[str, Any]], embed_texts: EmbedTexts) -> List[Dict[str, Any]]:
+    """Urutkan hasil berdasarkan cosine similarity embedding query dan snippet, skor disimpan di 'relevance'"""
+    if not results:
+        return results
+
+    # Query dan semua snippet di-embed dalam satu batch
+    vectors = np.asarray(embed_texts([query] + [_snippet_text(result) for result in results]), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+    scores = vectors[1:] @ vectors[0]
+
+    order = np.argsort(-scores, kind="stable")
+    return [dict(results[i], relevance=float(scores[i])) for i in order]
+
+
+def process_search_results(query: str, results: List[Dict[str, Any]], embed_texts: Optional[EmbedTexts] = None,
+                           top_n: int = 5, near_duplicate_threshold: float = 0.7) -> List[Dict[str, Any]]:
+    """Dedup, re-rank (jika embed_texts diberikan) lalu ambil top_n hasil"""
+    deduplicated = deduplicate_results(results, near_duplicate_threshold)
+    if len(deduplicated) < len(results):
+        logger.info(f"Dropped {len(results) - len(deduplicated)} duplicate web results")
+
+    if embed_texts is not None and len(deduplicated) > 1:
+        try:
+            deduplicated = rerank_by_embedding(query, deduplicated, embed_texts)
+        except Exception as e:
+            # Gagal embedding tidak menggagalkan pencarian, urutan SearXNG dipakai
+            logger.warning(f"Embedding re-rank of web results failed, keeping SearXNG order: {e}")
+
+    return deduplicated[:top_n]
@@ -1,132 +1,291 @@
 """
 Modul layanan SearXNG untuk aplikasi OriensSpace AI
+Mendukung beberapa instance SearXNG: request dikirim ke endpoint tercepat, dan
+jika belum menjawab dalam persentil latensinya, request cadangan (hedge) dikirim
+ke endpoint berikutnya. Respons baik pertama yang dipakai.
 """
 import asyncio
+import logging
+import math
+import threading
+import time
+import weakref
+from collections import deque
 from typing import List, Dict, Any, Optional
+
+import httpx
 from searxng_wrapper import SearxngWrapper
-from app.core.config import config
+from app.core.config import config, settings
+from app.services.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from app.services.search_cache_service import search_cache_service
+
+logger = logging.getLogger(__name__)
+
+SEARCH_LANGUAGE = "id"
+
+
+def configured_base_urls() -> List[str]:
+    """Daftar URL SearXNG dari SEARXNG_BASE_URLS, fallback ke SEARXNG_BASE_URL"""
+    urls = [url.strip().rstrip("/") for url in (settings.searxng_base_urls or "").split(",") if url.strip()]
+    return list(dict.fromkeys(urls)) or [config.SEARXNG_BASE_URL.rstrip("/")]
+
+
+class SearxngEndpoint:
+    """Satu instance SearXNG beserta circuit breaker dan riwayat latensinya"""
+
+    def __init__(self, base_url: str, order: int):
+        self.base_url = base_url
+        self.order = order
+        self.client = SearxngWrapper(base_url=base_url)
+        self.breaker = CircuitBreaker(
+            f"searxng:{base_url}",
+            failure_threshold=settings.searxng_breaker_failure_threshold,
+            reset_timeout=settings.searxng_breaker_reset_timeout,
+        )
+        self._latencies = deque(maxlen=settings.searxng_latency_window)
+        self._lock = threading.Lock()
+        self.hedged_requests = 0
+        self.wins = 0
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Persentil latensi (0-1) dari jendela terakhir, None jika sampel belum cukup"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < settings.searxng_hedge_min_samples:
+            return None
+        index = min(max(math.ceil(percentile * len(samples)) - 1, 0), len(samples) - 1)
+        return samples[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "p50_latency": self.latency_percentile(0.5),
+            "p90_latency": self.latency_percentile(0.9),
+            "hedged_requests": self.hedged_requests,
+            "wins": self.wins,
+            "circuit_breaker": self.breaker.to_dict(),
+        }
+
 
 class SearXNGService:
     def __init__(self):
-        self.base_url = config.SEARXNG_BASE_URL
-        self.client = SearxngWrapper(base_url=self.base_url)
-        self._test_connection()
+        # Tidak ada request jaringan saat startup, kesehatan SearXNG dipantau lewat circuit breaker per endpoint
+        self.endpoints = [SearxngEndpoint(url, order) for order, url in enumerate(configured_base_urls())]
+        self.base_url = self.endpoints[0].base_url
+        self.client = self.endpoints[0].client
+        # Satu AsyncClient per event loop, koneksinya dipakai bersama oleh semua endpoint dan request
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
 
-    def _test_connection(self):
-        """Test koneksi ke SearXNG"""
-        try:
-            # Coba akses SearXNG untuk memastikan berjalan
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Jika loop sedang berjalan, buat task baru
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, self._async_test_connection())
-                    result = future.result()
-            else:
-                result = asyncio.run(self._async_test_connection())
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Ambil AsyncClient milik event loop yang sedang berjalan, buat jika belum ada"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.searxng_timeout,
+                    connect=settings.searxng_connect_timeout,
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.searxng_max_connections,
+                    max_keepalive_connections=settings.searxng_max_keepalive_connections,
+                ),
+                headers={"Accept": "application/json"},
+            )
+            self._async_clients[loop] = client
+        return client
 
-            if result:
-                print("✓ Koneksi SearXNG berhasil")
-            else:
-                print("⚠ SearXNG merespons tetapi tidak ada hasil pencarian, pastikan konfigurasi sudah benar")
-        except Exception as e:
-            print(f"⚠ SearXNG tidak merespons. Pastikan instance SearXNG berjalan. Error: {e}")
+    async def aclose(self):
+        """Tutup AsyncClient milik event loop yang sedang berjalan"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
 
-    async def _async_test_connection(self):
-        """Test koneksi async ke SearXNG"""
-        try:
-            result = await self.client.asearch(q="test", lang="id", limit=1)
-            # Cek apakah result adalah None sebelum mengakses atributnya
-            if result is None:
-                return False
-            # Akses atribut 'results' dari objek SearchResponse
-            search_results = getattr(result, 'results', [])
-            return len(search_results) > 0
-        except Exception:
-            return False
+    def ranked_endpoints(self) -> List[SearxngEndpoint]:
+        """
+        Endpoint yang circuit-nya tidak open, diurutkan dari median latensi tercepat.
+        Endpoint tanpa sampel latensi cukup mengikuti urutan konfigurasi.
+        """
+        available = [endpoint for endpoint in self.endpoints if endpoint.breaker.state != OPEN]
+
+        def rank(endpoint: SearxngEndpoint):
+            median = endpoint.latency_percentile(0.5)
+            return (median is None, median or 0.0, endpoint.order)
+
+        return sorted(available, key=rank)
+
+    def _hedge_delay(self, endpoint: SearxngEndpoint) -> float:
+        """Waktu tunggu sebelum mengirim hedge: persentil latensi endpoint, dengan batas bawah"""
+        latency = endpoint.latency_percentile(settings.searxng_hedge_percentile)
+        if latency is None:
+            latency = settings.searxng_hedge_default_delay
+        return max(latency, settings.searxng_hedge_min_delay)
+
+    @staticmethod
+    def _process_results(search_results) -> List[Dict[str, Any]]:
+        """Ubah hasil mentah SearXNG menjadi format yang dipakai agent"""
+        results = []
+        for result_item in search_results:
+            processed_result = {
+                "title": result_item.get("title", "") if isinstance(result_item, dict) else str(result_item),
+                "url": result_item.get("url", "") if isinstance(result_item, dict) else "",
+                "content": result_item.get("content", "") if isinstance(result_item, dict) else "",
+                "engine": result_item.get("engine", "") if isinstance(result_item, dict) else "",
+                "score": result_item.get("score", 0.0) if isinstance(result_item, dict) else 0.0
+            }
+            results.append(processed_result)
+        return results
+
+    def is_available(self) -> bool:
+        """False jika circuit breaker semua endpoint sedang open (SearXNG dianggap mati)"""
+        return any(endpoint.breaker.state != OPEN for endpoint in self.endpoints)
+
+    def get_health(self) -> Dict[str, Any]:
+        """Status SearXNG untuk endpoint health, tanpa request jaringan"""
+        states = [endpoint.breaker.state for endpoint in self.endpoints]
+        if all(state == CLOSED for state in states):
+            status = "healthy"
+        elif self.is_available():
+            status = "degraded"
+        else:
+            status = "unavailable"
+        return {"status": status, "endpoints": [endpoint.to_dict() for endpoint in self.endpoints]}
 
     def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
-        Lakukan pencarian sync menggunakan SearXNG
+        Lakukan pencarian sync menggunakan SearXNG.
+        Jalur sync tidak melakukan hedging, endpoint dicoba berurutan sampai ada yang berhasil.
         """
-        try:
-            result = self.client.search(
-                q=query,
-                language="id",
-                max_results=max_results
-            )
+        for endpoint in self.ranked_endpoints():
+            if not endpoint.breaker.allow_request():
+                continue
 
-            # Cek apakah result adalah None sebelum mengakses atributnya
-            if result is None:
-                print("Peringatan: Hasil pencarian SearXNG adalah None (kemungkinan karena rate limiting)")
-                return []
+            started = time.monotonic()
+            try:
+                result = endpoint.client.search(
+                    q=query,
+                    language="id",
+                    max_results=max_results
+                )
 
-            # Ekstrak hasil pencarian - objek result adalah SearchResponse bukan dictionary
-            results = []
-            # Akses atribut 'results' dari objek SearchResponse
-            search_results = getattr(result, 'results', [])
+                # Cek apakah result adalah None sebelum mengakses atributnya
+                if result is None:
+                    logger.warning(f"SearXNG search on {endpoint.base_url} returned no response for query '{query}' (possibly rate limited)")
+                    endpoint.breaker.record_failure()
+                    continue
 
-            for result_item in search_results:
-                processed_result = {
-                    "title": result_item.get("title", "") if isinstance(result_item, dict) else str(result_item),
-                    "url": result_item.get("url", "") if isinstance(result_item, dict) else "",
-                    "content": result_item.get("content", "") if isinstance(result_item, dict) else "",
-                    "engine": result_item.get("engine", "") if isinstance(result_item, dict) else "",
-                    "score": result_item.get("score", 0.0) if isinstance(result_item, dict) else 0.0
-                }
-                results.append(processed_result)
+                endpoint.breaker.record_success()
+                endpoint.record_latency(time.monotonic() - started)
+                # Ekstrak hasil pencarian - objek result adalah SearchResponse bukan dictionary
+                # Akses atribut 'results' dari objek SearchResponse
+                return self._process_results(getattr(result, 'results', []))
 
-            return results
+            except Exception as e:
+                logger.error(f"SearXNG search on {endpoint.base_url} failed for query '{query}': {e}")
+                endpoint.breaker.record_failure(e)
 
-        except Exception as e:
-            print(f"Error saat melakukan pencarian SearXNG: {e}")
-            return []
+        logger.info(f"No SearXNG endpoint answered for query '{query}'")
+        return []
 
     async def asearch(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
-        Lakukan pencarian async menggunakan SearXNG
+        Lakukan pencarian async menggunakan SearXNG lewat AsyncClient bersama,
+        sehingga pencarian dari banyak user berjalan bersamaan tanpa memblokir event loop.
+        Hasil mentah di-cache di Redis (lihat search_cache_service).
         """
+        return await search_cache_service.get_or_fetch(
+            query, SEARCH_LANGUAGE, max_results,
+            lambda: self._afetch(query, max_results),
+        )
+
+    async def _request_endpoint(self, endpoint: SearxngEndpoint, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Satu request ke satu endpoint, mencatat latensi dan hasil ke circuit breaker-nya"""
+        started = time.monotonic()
         try:
-            result = await self.client.asearch(
-                q=query,
-                language="id",
-                max_results=max_results
+            response = await self._get_async_client().get(
+                f"{endpoint.base_url}/search",
+                params={"q": query, "format": "json", "language": SEARCH_LANGUAGE},
             )
+            response.raise_for_status()
+            data = response.json()
+        except asyncio.CancelledError:
+            # Request yang kalah hedge dibatalkan, bukan kegagalan endpoint. Waktu tunggunya tetap
+            # dicatat sebagai batas bawah latensi agar endpoint yang melambat turun peringkatnya.
+            endpoint.record_latency(time.monotonic() - started)
+            raise
+        except httpx.TimeoutException as e:
+            endpoint.breaker.record_failure(e)
+            logger.warning(f"SearXNG async search on {endpoint.base_url} timed out for query '{query}': {e!r}")
+            raise
+        except Exception as e:
+            endpoint.breaker.record_failure(e)
+            logger.error(f"SearXNG async search on {endpoint.base_url} failed for query '{query}': {e}")
+            raise
 
-            # Cek apakah result adalah None sebelum mengakses atributnya
-            if result is None:
-                print("Peringatan: Hasil pencarian SearXNG adalah None (kemungkinan karena rate limiting)")
-                return []
+        endpoint.breaker.record_success()
+        endpoint.record_latency(time.monotonic() - started)
+        search_results = data.get("results", []) if isinstance(data, dict) else []
+        return self._process_results(search_results[:max_results])
 
-            # Ekstrak hasil pencarian - objek result adalah SearchResponse bukan dictionary
-            results = []
-            # Akses atribut 'results' dari objek SearchResponse
-            search_results = getattr(result, 'results', [])
+    async def _afetch(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """
+        Request langsung ke SearXNG tanpa cache. Endpoint tercepat dikirimi request lebih dulu;
+        jika belum menjawab dalam persentil latensinya atau gagal, endpoint berikutnya ikut dikirimi.
+        Respons berhasil pertama dipakai dan request lain dibatalkan.
+        """
+        candidates = self.ranked_endpoints()
+        pending: Dict[asyncio.Task, SearxngEndpoint] = {}
 
-            for result_item in search_results:
-                processed_result = {
-                    "title": result_item.get("title", "") if isinstance(result_item, dict) else str(result_item),
-                    "url": result_item.get("url", "") if isinstance(result_item, dict) else "",
-                    "content": result_item.get("content", "") if isinstance(result_item, dict) else "",
-                    "engine": result_item.get("engine", "") if isinstance(result_item, dict) else "",
-                    "score": result_item.get("score", 0.0) if isinstance(result_item, dict) else 0.0
-                }
-                results.append(processed_result)
+        def launch_next(hedged: bool) -> bool:
+            while candidates:
+                endpoint = candidates.pop(0)
+                if endpoint.breaker.allow_request():
+                    if hedged:
+                        endpoint.hedged_requests += 1
+                    task = asyncio.create_task(self._request_endpoint(endpoint, query, max_results))
+                    pending[task] = endpoint
+                    return True
+            return False
 
-            return results
+        if not launch_next(hedged=False):
+            logger.info(f"All SearXNG circuits open, skipping search for query '{query}'")
+            return []
 
-        except Exception as e:
-            print(f"Error saat melakukan pencarian async SearXNG: {e}")
+        try:
+            while pending:
+                # Tunggu sampai persentil latensi endpoint tercepat yang sedang berjalan, lalu kirim hedge
+                timeout = None
+                if candidates:
+                    timeout = min(self._hedge_delay(endpoint) for endpoint in pending.values())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    launch_next(hedged=True)
+                    continue
+
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is None:
+                        endpoint.wins += 1
+                        return task.result()
+                    # Endpoint gagal, langsung coba endpoint berikutnya
+                    launch_next(hedged=True)
             return []
+        finally:
+            for task in pending:
+                task.cancel()
 
     def search_compliance_info(self, query: str) -> List[Dict[str, Any]]:
         """
         Lakukan pencarian informasi menggunakan SearXNG tanpa filter spesifik
         """
-        import logging
-        logger = logging.getLogger(__name__)
-
         try:
             logger.info(f"[SEARXNG_SERVICE] Melakukan pencarian untuk query: '{query}'")
 
@@ -145,5 +304,26 @@ class SearXNGService:
             return []
 
 
+    async def asearch_compliance_info(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Versi async dari search_compliance_info
+        """
+        try:
+            logger.info(f"[SEARXNG_SERVICE] Melakukan pencarian async untuk query: '{query}'")
+
+            results = await self.asearch(query, max_results=10)
+
+            if results:
+                logger.info(f"[SEARXNG_SERVICE] Ditemukan {len(results)} hasil untuk query '{query}'")
+                return results
+            else:
+                logger.info(f"[SEARXNG_SERVICE] Tidak ada hasil ditemukan untuk query '{query}'")
+                return []
+
+        except Exception as e:
+            logger.error(f"[SEARXNG_SERVICE] Error saat melakukan pencarian informasi: {e}")
+            return []
+
+
 # Buat instance global
 searxng_service = SearXNGService()
\ No newline at end of file
@@ -0,0 +1,296 @@
+"""
+Pengambilan halaman web hasil pencarian secara bersamaan
+Jumlah request dibatasi secara global dan per host, halaman yang sudah diambil
+disimpan di cache disk. Modul ini tidak membaca settings agar bisa diuji mandiri.
+"""
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Tag yang isinya bukan teks utama halaman
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"}
+# Tag blok, diberi baris baru agar paragraf tidak menyatu
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "br", "tr", "table",
+              "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"}
+# Tag penanda konten utama
+MAIN_TAGS = {"main", "article"}
+# Konten utama dipakai jika panjangnya minimal sebanyak ini
+MIN_MAIN_TEXT_LENGTH = 200
+
+FETCHABLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+ALLOWED_SCHEMES = ("http", "https")
+
+
+class UnsafeURLError(ValueError):
+    """URL hasil pencarian (atau tujuan redirect-nya) tidak boleh diambil"""
+    pass
+
+
+def is_public_address(address: str) -> bool:
+    """True jika alamat IP bisa dijangkau publik (bukan private, loopback, link-local, dst.)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class _MainTextExtractor(HTMLParser):
+    """Kumpulkan judul, seluruh teks body dan teks di dalam <main>/<article>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title_parts: List[str] = []
+        self.all_parts: List[str] = []
+        self.main_parts: List[str] = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in MAIN_TAGS:
+            self._main_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+        elif not self._skip_depth:
+            self._append(data)
+
+    def _append(self, text: str):
+        if self._skip_depth:
+            return
+        self.all_parts.append(text)
+        if self._main_depth:
+            self.main_parts.append(text)
+
+
+def _normalize_text(parts: List[str]) -> str:
+    lines = (" ".join(line.split()) for line in "".join(parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def extract_main_text(html: str) -> Dict[str, str]:
+    """Ekstrak judul dan teks utama dari HTML"""
+    parser = _MainTextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        # HTML rusak tetap dipakai sejauh yang berhasil di-parse
+        logger.debug(f"HTML parse stopped early: {e}")
+
+    main_text = _normalize_text(parser.main_parts)
+    text = main_text if len(main_text) >= MIN_MAIN_TEXT_LENGTH else _normalize_text(parser.all_parts)
+    return {"title": " ".join("".join(parser.title_parts).split()), "text": text}
+
+
+@dataclass
+class FetchedPage:
+    """Hasil pengambilan satu halaman"""
+    url: str
+    title: str = ""
+    text: str = ""
+    from_cache: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.text)
+
+
+class WebPageFetcher:
+    """
+    Ambil banyak URL sekaligus dengan batas konkurensi global dan per host.
+    Client HTTP dan semaphore terikat ke event loop, sehingga dibuat ulang jika loop berganti.
+
+    URL berasal dari hasil pencarian, jadi hanya http/https ke host dengan alamat publik
+    yang diambil. Redirect diikuti manual (paling banyak max_redirects) dan setiap tujuan
+    dicek ulang, sehingga hasil pencarian tidak bisa mengarah ke localhost, Milvus, Redis
+    atau metadata cloud. `allow_private_hosts` hanya untuk pengujian dengan server lokal.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_host_limit: int = 2, timeout: float = 8.0,
+                 max_bytes: int = 2_000_000, cache_dir: Optional[str] = None, cache_ttl: float = 86400.0,
+                 user_agent: str = "OriensSpaceAI/1.0 (+web page fetcher)", max_redirects: int = 5,
+                 allow_private_hosts: bool = False):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self.allow_private_hosts = allow_private_hosts
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _ensure_loop_state(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._client is None or self._client.is_closed:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+                # Redirect diikuti di _download agar setiap tujuan bisa dicek
+                follow_redirects=False,
+                headers={"User-Agent": self.user_agent},
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_semaphores = {}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # Cache disk: satu file JSON per URL
+
+    def _cache_path(self, url: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_cache(self, url: str) -> Optional[FetchedPage]:
+        path = self._cache_path(url)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            if time.time() - os.path.getmtime(path) > self.cache_ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return FetchedPage(url=url, title=data.get("title", ""), text=data.get("text", ""), from_cache=True)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable page cache for {url}: {e}")
+            return None
+
+    def _write_cache(self, page: FetchedPage):
+        path = self._cache_path(page.url)
+        if not path:
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"url": page.url, "title": page.title, "text": page.text}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write page cache for {page.url}: {e}")
+
+    async def _check_url(self, url: str):
+        """Tolak skema selain http/https dan host yang resolve ke alamat non-publik"""
+        parts = urlsplit(url)
+        if parts.scheme.lower() not in ALLOWED_SCHEMES:
+            raise UnsafeURLError(f"scheme {parts.scheme or '(none)'!r} is not allowed")
+        if not parts.hostname:
+            raise UnsafeURLError("URL has no host")
+        if self.allow_private_hosts:
+            return
+
+        port = parts.port or (443 if parts.scheme.lower() == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+        for info in infos:
+            address = info[4][0]
+            if not is_public_address(address):
+                raise UnsafeURLError(f"host {parts.hostname} resolves to non-public address {address}")
+
+    async def _download(self, url: str) -> FetchedPage:
+        target = url
+        for _ in range(self.max_redirects + 1):
+            await self._check_url(target)
+            async with self._client.stream("GET", target) as response:
+                if response.next_request is not None:
+                    target = str(response.next_request.url)
+                    continue
+                return await self._read_page(url, response)
+        raise UnsafeURLError(f"more than {self.max_redirects} redirects")
+
+    async def _read_page(self, url: str, response: httpx.Response) -> FetchedPage:
+        """Baca body response (dipotong di max_bytes) lalu ekstrak teksnya"""
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type and not content_type.startswith(FETCHABLE_CONTENT_TYPES):
+            return FetchedPage(url=url, error=f"unsupported content type {content_type}")
+
+        # Body dibaca bertahap dan dipotong di max_bytes
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) >= self.max_bytes:
+                break
+        encoding = response.encoding or "utf-8"
+
+        raw = bytes(body[:self.max_bytes]).decode(encoding, errors="replace")
+        if content_type == "text/plain":
+            return FetchedPage(url=url, text=_normalize_text([raw]))
+        extracted = extract_main_text(raw)
+        return FetchedPage(url=url, title=extracted["title"], text=extracted["text"])
+
+    async def fetch(self, url: str) -> FetchedPage:
+        """Ambil satu URL, dari cache jika masih berlaku"""
+        self._ensure_loop_state()
+
+        cached = await asyncio.to_thread(self._read_cache, url)
+        if cached is not None:
+            return cached
+
+        try:
+            # Slot host diambil lebih dulu agar host yang lambat tidak menahan slot global
+            async with self._host_semaphore(url), self._semaphore:
+                page = await self._download(url)
+        except Exception as e:
+            logger.info(f"Failed to fetch {url}: {e!r}")
+            return FetchedPage(url=url, error=str(e) or type(e).__name__)
+
+        if page.ok:
+            await asyncio.to_thread(self._write_cache, page)
+        return page
+
+    async def fetch_many(self, urls: List[str]) -> List[FetchedPage]:
+        """Ambil banyak URL bersamaan, urutan hasil sama dengan urutan URL"""
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        pages = await asyncio.gather(*(self.fetch(url) for url in unique_urls))
+        return list(pages)
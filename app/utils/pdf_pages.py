@@ -0,0 +1,76 @@
+"""
+Ekstraksi teks PDF per halaman untuk ingestion pipeline
+Modul ini sengaja ringan (hanya PyPDF2) karena fungsinya dijalankan di worker process
+"""
+import logging
+import os
+from concurrent.futures import Executor
+from typing import Iterator, Optional, Tuple
+
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Reader PDF yang sedang dibuka oleh worker process, dipakai ulang antar halaman
+_worker_reader: Optional[Tuple[Tuple[str, int, int], PdfReader]] = None
+
+
+def _get_reader(file_path: str) -> PdfReader:
+    """
+    Buka PDF sekali per process, halaman dibaca secara lazy oleh PdfReader.
+    Worker dipakai ulang antar dokumen, reader dibuka ulang jika file di path yang sama berubah.
+    """
+    global _worker_reader
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_size, stat.st_mtime_ns)
+    if _worker_reader is None or _worker_reader[0] != key:
+        _worker_reader = (key, PdfReader(file_path))
+    return _worker_reader[1]
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Hitung jumlah halaman tanpa mengekstrak teksnya"""
+    return len(PdfReader(file_path).pages)
+
+
+def extract_pdf_page(file_path: str, page_index: int) -> str:
+    """Ekstrak teks satu halaman (index mulai dari 0)"""
+    try:
+        return _get_reader(file_path).pages[page_index].extract_text() or ""
+    except Exception as e:
+        # Halaman rusak tidak menggagalkan seluruh dokumen
+        logger.warning(f"Failed to extract page {page_index + 1} of {file_path}: {e}")
+        return ""
+
+
+def iter_pdf_pages(file_path: str, executor: Optional[Executor] = None, workers: int = 1,
+                   min_parallel_pages: int = 16, max_in_flight: int = None) -> Iterator[Tuple[int, str]]:
+    """
+    Hasilkan (nomor halaman, teks) secara berurutan.
+    PDF besar diekstrak paralel di `executor` (pool worker process milik pemanggil,
+    sebaiknya dengan context spawn), dengan jumlah halaman yang sedang diproses
+    dibatasi max_in_flight (default workers * 2) agar memori tetap terbatas.
+    """
+    page_count = count_pdf_pages(file_path)
+
+    if executor is None or workers <= 1 or page_count < min_parallel_pages:
+        for page_index in range(page_count):
+            yield page_index + 1, extract_pdf_page(file_path, page_index)
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    in_flight = []
+    next_page = 0
+    try:
+        while next_page < page_count or in_flight:
+            while next_page < page_count and len(in_flight) < max_in_flight:
+                in_flight.append((next_page, executor.submit(extract_pdf_page, file_path, next_page)))
+                next_page += 1
+
+            # Hasil diambil sesuai urutan halaman
+            page_index, future = in_flight.pop(0)
+            yield page_index + 1, future.result()
+    finally:
+        # Pool dipakai bersama, halaman yang belum jalan tidak perlu diekstrak lagi
+        for _, future in in_flight:
+            future.cancel()
@@ -0,0 +1,81 @@
+"""
+Pembersihan teks chunk sebelum di-embed
+Pola regex dikompilasi sekali dan bisa dipilih lewat TEXT_CLEANING_RULES.
+Modul ini sengaja ringan (hanya re) karena fungsinya dijalankan di worker process.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Aturan pembersihan: nama -> (pola, pengganti), dijalankan sesuai urutan di sini
+CLEANING_RULES: Dict[str, Tuple["re.Pattern", str]] = {
+    # Baris berisi karakter X berulang (placeholder atau teks hasil sensor)
+    "x_runs": (re.compile(r"[Xx]{10,}"), ""),
+    # Karakter non-teks yang berulang, misalnya garis titik-titik atau strip
+    "repeated_symbols": (re.compile(r"([^\w\s])\1{10,}"), ""),
+    # Baris yang hanya berisi karakter non-teks
+    "symbol_lines": (re.compile(r"^\s*[^\w\s]+\s*$", re.MULTILINE), ""),
+    # Placeholder gambar
+    "figure_placeholders": (re.compile(r"\[Figure\].*?\]"), ""),
+    # HTML tags
+    "html_tags": (re.compile(r"<[^>]+>"), ""),
+    # Whitespace berlebihan di antara paragraf
+    "blank_lines": (re.compile(r"\n\s*\n"), "\n\n"),
+}
+
+DEFAULT_RULES = tuple(CLEANING_RULES)
+
+
+class TextCleaner:
+    """Membersihkan teks dengan aturan terpilih dan membuang hasil yang terlalu pendek"""
+
+    def __init__(self, rules: Iterable[str] = DEFAULT_RULES, min_length: int = 10):
+        unknown = [rule for rule in rules if rule not in CLEANING_RULES]
+        if unknown:
+            raise ValueError(f"Unknown text cleaning rules: {', '.join(unknown)}")
+
+        self.rules = tuple(rule for rule in CLEANING_RULES if rule in set(rules))
+        self.min_length = min_length
+        self._patterns = [CLEANING_RULES[rule] for rule in self.rules]
+
+    def clean(self, text: str) -> str:
+        """Bersihkan satu teks"""
+        if not text or not isinstance(text, str):
+            return text
+
+        for pattern, replacement in self._patterns:
+            text = pattern.sub(replacement, text)
+        return text.strip()
+
+    def clean_or_drop(self, text: str) -> Optional[str]:
+        """Bersihkan teks, None jika hasilnya tidak lebih panjang dari min_length"""
+        cleaned = self.clean(text)
+        if not cleaned or len(cleaned) <= self.min_length:
+            return None
+        return cleaned
+
+    def clean_batch(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """Bersihkan sekumpulan teks, teks yang dibuang bernilai None"""
+        return [self.clean_or_drop(text) for text in texts]
+
+
+_default_cleaner = TextCleaner()
+
+# Cleaner per konfigurasi di dalam worker process
+_worker_cleaners: Dict[Tuple[Tuple[str, ...], int], TextCleaner] = {}
+
+
+def clean_text(text):
+    """
+    Membersihkan teks dari karakter-karakter yang tidak bermakna sebelum disimpan ke Milvus
+    """
+    return _default_cleaner.clean(text)
+
+
+def clean_texts(texts: Sequence[str], rules: Tuple[str, ...], min_length: int) -> List[Optional[str]]:
+    """Entry point worker process: bersihkan satu batch teks"""
+    key = (rules, min_length)
+    cleaner = _worker_cleaners.get(key)
+    if cleaner is None:
+        cleaner = _worker_cleaners[key] = TextCleaner(rules, min_length)
+    return cleaner.clean_batch(texts)
+
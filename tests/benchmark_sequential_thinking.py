@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark latensi per panggilan sequential thinking: backend local (in-process)
+dibandingkan server npx @modelcontextprotocol/server-sequential-thinking lewat stdio.
+Bagian npx dilewati jika npx tidak tersedia.
+
+Pemakaian: python tests/benchmark_sequential_thinking.py [jumlah_panggilan]
+"""
+import asyncio
+import json
+import shutil
+import statistics
+import sys
+import os
+import time
+
+# Tambahkan path root proyek ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.llms.agents.tools.sequential_thinking import SequentialThinkingServer
+
+DEFAULT_CALLS = 200
+WARMUP_CALLS = 5
+
+
+def make_params(i: int) -> dict:
+    return {
+        "thought": f"Analisis kata kunci pencarian untuk query ke-{i}: peraturan pelindungan data pribadi",
+        "thoughtNumber": 1,
+        "totalThoughts": 1,
+        "nextThoughtNeeded": False,
+    }
+
+
+def summarize(name: str, latencies: list):
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    p95 = latencies_ms[min(int(len(latencies_ms) * 0.95), len(latencies_ms) - 1)]
+    print(f"{name:<8} n={len(latencies_ms):<5} mean={statistics.mean(latencies_ms):9.3f} ms  "
+          f"p50={statistics.median(latencies_ms):9.3f} ms  p95={p95:9.3f} ms  max={latencies_ms[-1]:9.3f} ms")
+    return statistics.median(latencies_ms)
+
+
+async def bench_local(calls: int) -> list:
+    server = SequentialThinkingServer()
+    latencies = []
+    for i in range(WARMUP_CALLS + calls):
+        start = time.perf_counter()
+        result = server.process_thought(make_params(i))
+        elapsed = time.perf_counter() - start
+        assert not result["is_error"], result["text"]
+        if i >= WARMUP_CALLS:
+            latencies.append(elapsed)
+    return latencies
+
+
+async def bench_npx(calls: int) -> list:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    npx_path = shutil.which("npx")
+    server_params = StdioServerParameters(
+        command=npx_path,
+        args=["-y", "@modelcontextprotocol/server-sequential-thinking"],
+        env=None
+    )
+
+    latencies = []
+    async with stdio_client(server_params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            tools = await session.list_tools()
+            tool_name = tools.tools[0].name
+            for i in range(WARMUP_CALLS + calls):
+                start = time.perf_counter()
+                result = await session.call_tool(tool_name, make_params(i))
+                elapsed = time.perf_counter() - start
+                json.loads(result.content[0].text)
+                if i >= WARMUP_CALLS:
+                    latencies.append(elapsed)
+    return latencies
+
+
+async def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CALLS
+    print(f"=== Benchmark sequential thinking ({calls} panggilan, {WARMUP_CALLS} warmup) ===")
+
+    local_p50 = summarize("local", await bench_local(calls))
+
+    if not shutil.which("npx"):
+        print("npx tidak ditemukan, benchmark backend mcp dilewati")
+        return
+
+    try:
+        npx_p50 = summarize("mcp", await bench_npx(calls))
+    except Exception as e:
+        print(f"Benchmark backend mcp gagal: {e!r}")
+        return
+
+    print(f"\nLocal lebih cepat {npx_p50 / max(local_p50, 1e-6):.0f}x (p50)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+File untuk menguji MarkdownStreamChunker: section kecil yang digabung tetap mendapat
+section_path yang menaungi semua section di dalamnya.
+Membutuhkan file .env dan koneksi MySQL/Milvus seperti test lainnya (dibuka saat modul ingestion diimpor).
+"""
+import sys
+import os
+import tempfile
+
+# Tambahkan path root proyek ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.llms.agents.chatbot.ingestion_pipeline import MarkdownStreamChunker, common_heading_path
+
+# Pembukaan BAB I cukup panjang untuk menjadi chunk sendiri, sehingga Pasal 1 dan Pasal 2 digabung berdua
+INTRODUCTION = ("Bab ini memuat pengertian istilah yang dipakai dalam peraturan. " * 40)[:settings.chunk_size - 60]
+
+DOCUMENT = f"""# BAB I KETENTUAN UMUM
+
+{INTRODUCTION}
+
+## Pasal 1
+
+Dalam peraturan ini yang dimaksud dengan data pribadi adalah data tentang orang perseorangan.
+
+## Pasal 2
+
+Peraturan ini berlaku untuk setiap orang, badan publik dan organisasi internasional.
+
+# BAB II ASAS
+
+## Pasal 3
+
+Pelindungan data pribadi dilaksanakan berdasarkan asas pelindungan dan kepastian hukum.
+"""
+
+
+def chunk_document(text: str):
+    with tempfile.NamedTemporaryFile("w", suffix=".md", delete=False, encoding="utf-8") as f:
+        f.write(text)
+    try:
+        return list(MarkdownStreamChunker(f.name, material_id="test").iter_chunks())
+    finally:
+        os.unlink(f.name)
+
+
+def test_common_heading_path():
+    print("=== Testing common_heading_path ===")
+    assert common_heading_path(["BAB I", "Pasal 2"], ["BAB I", "Pasal 3"]) == ["BAB I"]
+    assert common_heading_path(["BAB I", "Pasal 2"], ["BAB I", "Pasal 2"]) == ["BAB I", "Pasal 2"]
+    assert common_heading_path(["BAB I"], ["BAB II"]) == []
+    print("OK")
+
+
+def test_merged_sibling_sections():
+    """Pasal 1 dan Pasal 2 digabung dalam satu chunk, path-nya BAB I (bukan hanya Pasal 1)"""
+    print("=== Testing merged sibling sections ===")
+    chunks = chunk_document(DOCUMENT)
+    for chunk in chunks:
+        print(chunk.metadata.section_path, repr(chunk.text[:60]))
+
+    merged = [chunk for chunk in chunks if "Pasal 1" in chunk.text and "Pasal 2" in chunk.text]
+    assert merged, "Pasal 1 dan Pasal 2 seharusnya digabung dalam satu chunk"
+    assert "Bab ini memuat" not in merged[0].text
+    assert merged[0].metadata.section_path == ["BAB I KETENTUAN UMUM"], merged[0].metadata.section_path
+
+    # Section di bawah BAB lain tidak ikut digabung
+    pasal_3 = [chunk for chunk in chunks if "Pasal 3" in chunk.text]
+    assert "Pasal 2" not in pasal_3[0].text
+    assert pasal_3[0].metadata.section_path == ["BAB II ASAS"], pasal_3[0].metadata.section_path
+    print("OK")
+
+
+if __name__ == "__main__":
+    test_common_heading_path()
+    test_merged_sibling_sections()
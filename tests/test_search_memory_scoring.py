@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+File untuk menguji penilaian entri search_memory dengan skor gaya COSINE Milvus
+(field distance berisi similarity, nilai lebih tinggi = lebih mirip).
+Membutuhkan file .env seperti test lainnya, tetapi tidak membutuhkan Milvus.
+"""
+import sys
+import os
+import time
+
+# Tambahkan path root proyek ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.search_memory_maintenance import is_near_duplicate, is_reusable_search_memory, rank_search_memory
+
+NOW = time.time()
+
+
+def fresh_metadata(age: float = 0.0, ttl: float = 86400.0) -> dict:
+    return {"created_at": NOW - age, "expires_at": NOW - age + ttl, "ttl": ttl}
+
+
+def test_near_duplicate():
+    """Similarity tinggi adalah duplikat, similarity rendah tidak pernah digabung"""
+    print("=== Testing is_near_duplicate ===")
+    threshold = settings.search_memory_dedup_similarity
+
+    assert is_near_duplicate(0.98, fresh_metadata(), NOW), "ringkasan hampir sama harus dianggap duplikat"
+    assert is_near_duplicate(threshold, fresh_metadata(), NOW)
+    assert not is_near_duplicate(0.12, fresh_metadata(), NOW), "entri yang tidak terkait tidak boleh digabung"
+    assert not is_near_duplicate(threshold - 0.01, fresh_metadata(), NOW)
+
+    expired = {"created_at": NOW - 100, "expires_at": NOW - 1, "ttl": 99}
+    assert not is_near_duplicate(0.99, expired, NOW), "entri kedaluwarsa tidak dipakai sebagai target merge"
+    print("OK")
+
+
+def test_rank_search_memory():
+    """Hasil paling mirip di urutan pertama, entri tua diberi penalti, entri kedaluwarsa dibuang"""
+    print("=== Testing rank_search_memory ===")
+    results = [
+        {"id": 1, "distance": 0.35, "metadata": fresh_metadata()},
+        {"id": 2, "distance": 0.91, "metadata": fresh_metadata()},
+        {"id": 3, "distance": 0.93, "metadata": fresh_metadata(age=86000)},
+        {"id": 4, "distance": 0.99, "metadata": {"created_at": NOW - 100, "expires_at": NOW - 1, "ttl": 99}},
+    ]
+
+    ranked = rank_search_memory(results, NOW)
+    print([(r["id"], round(r["similarity"], 3)) for r in ranked])
+
+    assert [r["id"] for r in ranked] == [2, 3, 1], "urutan harus similarity (setelah decay) menurun"
+    assert ranked[0]["distance"] == 0.91, "distance dari Milvus tidak diubah"
+    assert ranked[1]["similarity"] < 0.93, "entri tua harus turun skornya"
+    print("OK")
+
+
+def test_reuse_search_memory():
+    """Query yang hampir sama memakai hasil tersimpan, query yang jauh mencari ke internet"""
+    print("=== Testing is_reusable_search_memory ===")
+    close, distant = rank_search_memory([
+        {"id": 1, "distance": 0.95, "metadata": fresh_metadata()},
+        {"id": 2, "distance": 0.12, "metadata": fresh_metadata()},
+    ], NOW)
+
+    assert close["id"] == 1 and is_reusable_search_memory(close), "query yang hampir sama harus memakai memory"
+    assert not is_reusable_search_memory(distant), "query yang tidak terkait tidak boleh memakai memory"
+
+    # Penalti umur menurunkan similarity, entri tua tidak lebih mudah lolos
+    threshold = settings.search_memory_reuse_similarity
+    stale = rank_search_memory([{"id": 3, "distance": threshold, "metadata": fresh_metadata(age=86000)}], NOW)[0]
+    assert not is_reusable_search_memory(stale)
+    print("OK")
+
+
+if __name__ == "__main__":
+    test_near_duplicate()
+    test_rank_search_memory()
+    test_reuse_search_memory()
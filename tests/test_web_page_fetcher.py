@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+File untuk menguji WebPageFetcher dan EphemeralRetriever terhadap server HTTP lokal
+Tidak membutuhkan SearXNG, Ollama maupun file .env
+"""
+import asyncio
+import hashlib
+import re
+import sys
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tambahkan path root proyek ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.web_page_fetcher import WebPageFetcher, extract_main_text, is_public_address
+from app.services.ephemeral_retriever import EphemeralRetriever
+
+PAGE_DELAY = 0.3
+
+PAGES = {
+    "/pdp": """<html><head><title>UU PDP</title><script>var x = 1;</script></head><body>
+        <nav>Beranda | Tentang | Kontak</nav>
+        <article>
+        <h1>Undang-Undang Pelindungan Data Pribadi</h1>
+        <p>Undang-Undang Nomor 27 Tahun 2022 mengatur pelindungan data pribadi warga negara.</p>
+        <p>Pengendali data pribadi wajib memberitahukan kegagalan pelindungan data pribadi
+        paling lambat 3 x 24 jam kepada subjek data dan lembaga.</p>
+        </article>
+        <footer>Hak cipta</footer></body></html>""",
+    "/pajak": """<html><head><title>Pajak</title></head><body>
+        <p>Tarif pajak penghasilan badan ditetapkan sebesar 22 persen untuk tahun pajak berjalan.</p>
+        </body></html>""",
+}
+
+# Redirect untuk menguji pengecekan URL di setiap hop
+REDIRECTS = {
+    "/moved": "/pdp",
+    "/to-file": "file:///etc/passwd",
+    "/to-metadata": "http://169.254.169.254/latest/meta-data/",
+    "/loop": "/loop",
+}
+
+request_count = {"value": 0}
+
+
+class LocalSiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        request_count["value"] += 1
+        if self.path in REDIRECTS:
+            self.send_response(302)
+            self.send_header("Location", REDIRECTS[self.path])
+            self.end_headers()
+            return
+        time.sleep(PAGE_DELAY)
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fake_embed_texts(texts):
+    """Embedding bag-of-words sederhana agar pengujian tidak membutuhkan Ollama"""
+    vectors = []
+    for text in texts:
+        vector = [0.0] * 64
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+async def test_web_page_fetcher():
+    """Fungsi untuk menguji pengambilan halaman paralel, cache disk dan retrieval sementara"""
+    print("=== Testing WebPageFetcher & EphemeralRetriever ===")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LocalSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base_url}/pdp", f"{base_url}/pajak", f"{base_url}/missing"]
+
+    extracted = extract_main_text(PAGES["/pdp"])
+    assert extracted["title"] == "UU PDP"
+    assert "Beranda" not in extracted["text"] and "var x" not in extracted["text"]
+    print("Ekstraksi teks utama: OK")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Server uji berjalan di 127.0.0.1, alamat private diizinkan khusus untuk pengujian ini
+        fetcher = WebPageFetcher(max_concurrency=4, per_host_limit=4, timeout=5, cache_dir=cache_dir,
+                                 allow_private_hosts=True)
+
+        started = time.perf_counter()
+        pages = await fetcher.fetch_many(urls)
+        elapsed = time.perf_counter() - started
+        print(f"Pengambilan pertama: {elapsed:.2f}s untuk {len(urls)} URL")
+        assert elapsed < PAGE_DELAY * len(urls), "halaman harus diambil secara bersamaan"
+        assert [page.ok for page in pages] == [True, True, False]
+
+        count_before = request_count["value"]
+        cached_pages = await fetcher.fetch_many(urls[:2])
+        assert all(page.from_cache for page in cached_pages)
+        assert request_count["value"] == count_before, "halaman dari cache tidak boleh diminta ulang"
+        print("Cache disk: OK")
+
+        # Batas per host: 3 request ke host yang sama dengan limit 1 harus berjalan berurutan
+        serial_fetcher = WebPageFetcher(max_concurrency=4, per_host_limit=1, timeout=5, allow_private_hosts=True)
+        started = time.perf_counter()
+        await serial_fetcher.fetch_many([f"{base_url}/pdp?{i}" for i in range(3)])
+        elapsed = time.perf_counter() - started
+        assert elapsed >= PAGE_DELAY * 3 * 0.9, "batas per host harus dipatuhi"
+        print(f"Batas per host: OK ({elapsed:.2f}s)")
+
+        retriever = EphemeralRetriever(fake_embed_texts, chunk_size=200, chunk_overlap=20)
+        for page in pages:
+            if page.ok:
+                retriever.add_document(page.text, {"url": page.url})
+        passages = retriever.retrieve("kapan kegagalan pelindungan data pribadi wajib diberitahukan", top_k=2)
+        print(f"Passage teratas: {passages[0]['text'][:80]}... (skor {passages[0]['score']:.2f})")
+        assert passages[0]["metadata"]["url"].endswith("/pdp")
+
+        await fetcher.aclose()
+        await serial_fetcher.aclose()
+
+    await check_url_safety(base_url)
+
+    server.shutdown()
+    print("\n=== Testing Selesai ===")
+
+
+class LocalServerFetcher(WebPageFetcher):
+    """Fetcher dengan pengecekan normal, kecuali host server uji yang diizinkan"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    async def _check_url(self, url: str):
+        if not url.startswith(self.base_url + "/"):
+            await super()._check_url(url)
+
+
+async def check_url_safety(base_url: str):
+    """URL hasil pencarian dan tujuan redirect-nya tidak boleh mengarah ke jaringan internal"""
+    assert is_public_address("93.184.216.34")
+    for address in ("127.0.0.1", "10.0.0.5", "192.168.1.1", "169.254.169.254", "::1", "::ffff:127.0.0.1", "fe80::1"):
+        assert not is_public_address(address), address
+
+    fetcher = WebPageFetcher(timeout=5)
+    for url in (f"{base_url}/pdp", "file:///etc/passwd", "http://169.254.169.254/latest/meta-data/",
+                "http://localhost:19530/"):
+        page = await fetcher.fetch(url)
+        print(f"Ditolak: {url} ({page.error})")
+        assert not page.ok and page.error, url
+    await fetcher.aclose()
+
+    local_fetcher = LocalServerFetcher(base_url, timeout=5, max_redirects=3)
+    moved, to_file, to_metadata, loop = await local_fetcher.fetch_many(
+        [f"{base_url}/moved", f"{base_url}/to-file", f"{base_url}/to-metadata", f"{base_url}/loop"]
+    )
+    assert moved.ok and moved.title == "UU PDP", moved.error
+    assert not to_file.ok and "scheme" in to_file.error, to_file.error
+    assert not to_metadata.ok and "non-public" in to_metadata.error, to_metadata.error
+    assert not loop.ok and "redirects" in loop.error, loop.error
+    await local_fetcher.aclose()
+    print("Pengecekan URL dan redirect: OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_web_page_fetcher())